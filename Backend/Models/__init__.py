@@ -2,38 +2,59 @@
 Data models for the Cat Facts API.
 """
 
-from .openAI_model import AIRequest
+from .openAI_model import AIRequest, AIAnswerStatsResponse, AIUsageResponse, UserUsageResponse
 from .cat_facts_models import (
     CatFactResponse,
     CatFactListResponse,
+    TrendingFactResponse,
+    TrendingFactsResponse,
+    CatFactBatchRequest,
+    CatFactBatchItem,
+    CatFactBatchResponse,
     CatFactCreateRequest,
     CatFactCreateResponse,
     CatFactLikeResponse,
     CatFactDeleteResponse,
     HealthCheckResponse,
+    LivenessResponse,
+    ReadinessResponse,
     ErrorResponse,
     SuccessResponse,
     ImportFactsRequest,
     ImportFactsResponse,
     UserSignupRequest,
     UserLoginRequest,
-    AuthResponse
+    AuthResponse,
+    ProfilerArmRequest,
+    ProfilerStatusResponse
 )
 
 __all__ = [
     "AIRequest",
+    "AIAnswerStatsResponse",
+    "AIUsageResponse",
+    "UserUsageResponse",
     "CatFactResponse",
     "CatFactListResponse", 
+    "TrendingFactResponse",
+    "TrendingFactsResponse",
+    "CatFactBatchRequest",
+    "CatFactBatchItem",
+    "CatFactBatchResponse",
     "CatFactCreateRequest",
     "CatFactCreateResponse",
     "CatFactLikeResponse",
     "CatFactDeleteResponse",
     "HealthCheckResponse",
+    "LivenessResponse",
+    "ReadinessResponse",
     "ErrorResponse",
     "SuccessResponse",
     "ImportFactsRequest",
     "ImportFactsResponse",
     "UserSignupRequest",
     "UserLoginRequest",
-    "AuthResponse"
+    "AuthResponse",
+    "ProfilerArmRequest",
+    "ProfilerStatusResponse"
 ] 
\ No newline at end of file
@@ -1,25 +1,55 @@
 """
 Data models for cat facts API endpoints.
+
+Request models validate client input. Response models only describe rows our
+own database produced (already validated on the way in), so services build
+them with ``from_row``, which skips validation entirely.
 """
+import re
 from datetime import datetime
 from typing import List, Optional, Any, Dict
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from constants import VALIDATION_RULES
 
+_MIN_FACT_LENGTH = VALIDATION_RULES["min_fact_length"]
+_MAX_FACT_LENGTH = VALIDATION_RULES["max_fact_length"]
+_USERNAME_PATTERN = re.compile(r'[a-zA-Z0-9_\s]+')
+_object_setattr = object.__setattr__
+
+
+def _clean_fact(v: str) -> str:
+    v = v.strip()
+    if not v:
+        raise ValueError("Fact cannot be empty")
+    if len(v) > _MAX_FACT_LENGTH:
+        raise ValueError(f"Fact too long. Maximum {_MAX_FACT_LENGTH} characters allowed.")
+    if len(v) < _MIN_FACT_LENGTH:
+        raise ValueError(f"Fact too short. Minimum {_MIN_FACT_LENGTH} character required.")
+    return v
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _trusted(cls, values: Dict[str, Any]):
+    """Instantiate ``cls`` from values that are already valid and complete.
+
+    Does what ``model_construct`` does minus its per-field alias and default
+    handling, which makes ``model_construct`` slower than full validation for
+    models this small (see bench_models.py).
+    """
+    instance = cls.__new__(cls)
+    _object_setattr(instance, "__dict__", values)
+    _object_setattr(instance, "__pydantic_fields_set__", set(values))
+    _object_setattr(instance, "__pydantic_extra__", None)
+    _object_setattr(instance, "__pydantic_private__", None)
+    return instance
+
 
 class CatFactBase(BaseModel):
     """Base model for cat fact data."""
     fact: str = Field(..., description="The cat fact text")
-    
-    @validator('fact')
-    def validate_fact(cls, v):
-        if not v or not v.strip():
-            raise ValueError("Fact cannot be empty")
-        if len(v.strip()) > VALIDATION_RULES["max_fact_length"]:
-            raise ValueError(f"Fact too long. Maximum {VALIDATION_RULES['max_fact_length']} characters allowed.")
-        if len(v.strip()) < VALIDATION_RULES["min_fact_length"]:
-            raise ValueError(f"Fact too short. Minimum {VALIDATION_RULES['min_fact_length']} character required.")
-        return v.strip()
 
 
 class CatFactResponse(CatFactBase):
@@ -27,16 +57,32 @@ class CatFactResponse(CatFactBase):
     id: str = Field(..., description="Unique identifier for the fact")
     created_at: datetime = Field(..., description="When the fact was created")
     likes_count: int = Field(default=0, description="Number of likes for this fact")
+    liked_by_me: Optional[bool] = Field(None, description="Whether the authenticated caller likes this fact (omitted for anonymous callers)")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": "123e4567-e89b-12d3-a456-426614174000",
                 "fact": "Cats have over 20 muscles that control their ears.",
                 "created_at": "2024-01-15T10:30:00Z",
-                "likes_count": 5
+                "likes_count": 5,
+                "liked_by_me": True
             }
         }
+    )
+    
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], **extra):
+        """Build from a row our own database returned, without validation."""
+        values = {
+            "fact": row["fact"],
+            "id": str(row["id"]),
+            "created_at": _parse_timestamp(row["created_at"]),
+            "likes_count": row.get("likes_count") or 0,
+            "liked_by_me": None
+        }
+        values.update(extra)
+        return _trusted(cls, values)
 
 
 class CatFactListResponse(BaseModel):
@@ -44,8 +90,8 @@ class CatFactListResponse(BaseModel):
     facts: List[CatFactResponse] = Field(..., description="List of cat facts")
     total_count: int = Field(..., description="Total number of facts")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "facts": [
                     {
@@ -58,28 +104,109 @@ class CatFactListResponse(BaseModel):
                 "total_count": 1
             }
         }
+    )
+
+
+class TrendingFactResponse(CatFactResponse):
+    """A cat fact with its trending score."""
+    trending_score: float = Field(..., description="Time-decayed like count (each like halves in weight every half-life)")
+
+
+class TrendingFactsResponse(BaseModel):
+    """Response model for trending facts."""
+    facts: List[TrendingFactResponse] = Field(..., description="Trending facts, hottest first")
+    total_count: int = Field(..., description="Number of facts returned")
+    half_life_hours: float = Field(..., description="Half-life of a like's contribution to the score")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "facts": [
+                    {
+                        "id": "123e4567-e89b-12d3-a456-426614174000",
+                        "fact": "Cats have over 20 muscles that control their ears.",
+                        "created_at": "2024-01-15T10:30:00Z",
+                        "likes_count": 5,
+                        "trending_score": 3.7
+                    }
+                ],
+                "total_count": 1,
+                "half_life_hours": 6
+            }
+        }
+    )
+
+
+class CatFactBatchRequest(BaseModel):
+    """Request model for fetching several cat facts by ID."""
+    ids: List[str] = Field(..., description="Fact IDs to resolve, in the order results should be returned")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "ids": [
+                    "123e4567-e89b-12d3-a456-426614174000",
+                    "00000000-0000-0000-0000-000000000000"
+                ]
+            }
+        }
+    )
+
+
+class CatFactBatchItem(BaseModel):
+    """A single result of a batch lookup."""
+    id: str = Field(..., description="The requested fact ID")
+    status: str = Field(..., description="'found', 'not_found' or 'invalid_id'")
+    fact: Optional[CatFactResponse] = Field(None, description="The fact, when found")
+
+
+class CatFactBatchResponse(BaseModel):
+    """Response model for a batch lookup; results follow request order."""
+    results: List[CatFactBatchItem] = Field(..., description="One result per requested ID")
+    found_count: int = Field(..., description="Number of IDs that resolved to a fact")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "results": [
+                    {
+                        "id": "123e4567-e89b-12d3-a456-426614174000",
+                        "status": "found",
+                        "fact": {
+                            "id": "123e4567-e89b-12d3-a456-426614174000",
+                            "fact": "Cats have over 20 muscles that control their ears.",
+                            "created_at": "2024-01-15T10:30:00Z",
+                            "likes_count": 5
+                        }
+                    },
+                    {
+                        "id": "00000000-0000-0000-0000-000000000000",
+                        "status": "not_found",
+                        "fact": None
+                    }
+                ],
+                "found_count": 1
+            }
+        }
+    )
 
 
 class CatFactCreateRequest(BaseModel):
     """Request model for creating a new cat fact."""
     fact: str = Field(..., description="The cat fact to add")
     
-    @validator('fact')
-    def validate_fact(cls, v):
-        if not v or not v.strip():
-            raise ValueError("Fact cannot be empty")
-        if len(v.strip()) > VALIDATION_RULES["max_fact_length"]:
-            raise ValueError(f"Fact too long. Maximum {VALIDATION_RULES['max_fact_length']} characters allowed.")
-        if len(v.strip()) < VALIDATION_RULES["min_fact_length"]:
-            raise ValueError(f"Fact too short. Minimum {VALIDATION_RULES['min_fact_length']} character required.")
-        return v.strip()
+    @field_validator('fact')
+    @classmethod
+    def validate_fact(cls, v: str) -> str:
+        return _clean_fact(v)
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "fact": "Cats spend 70% of their lives sleeping."
             }
         }
+    )
 
 
 class CatFactCreateResponse(BaseModel):
@@ -89,8 +216,8 @@ class CatFactCreateResponse(BaseModel):
     status: str = Field(..., description="Status of the operation")
     data: Optional[CatFactResponse] = Field(None, description="Created fact data if successful")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "message": "Fact added successfully",
@@ -103,20 +230,26 @@ class CatFactCreateResponse(BaseModel):
                 }
             }
         }
+    )
 
 
 class CatFactLikeResponse(BaseModel):
     """Response model for liking/unliking a cat fact."""
     success: bool = Field(..., description="Whether the operation was successful")
     message: str = Field(..., description="Response message")
+    liked: Optional[bool] = Field(None, description="Whether the caller now likes the fact")
+    likes_count: Optional[int] = Field(None, description="The fact's like count after the operation")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
-                "message": "Fact liked successfully"
+                "message": "Fact liked successfully",
+                "liked": True,
+                "likes_count": 6
             }
         }
+    )
 
 
 class CatFactDeleteResponse(BaseModel):
@@ -124,13 +257,14 @@ class CatFactDeleteResponse(BaseModel):
     success: bool = Field(..., description="Whether the operation was successful")
     message: str = Field(..., description="Response message")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "message": "Fact deleted successfully"
             }
         }
+    )
 
 
 class HealthCheckResponse(BaseModel):
@@ -140,8 +274,8 @@ class HealthCheckResponse(BaseModel):
     backend: str = Field(..., description="Backend type")
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Health check timestamp")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "status": "healthy",
                 "database": "connected",
@@ -149,6 +283,46 @@ class HealthCheckResponse(BaseModel):
                 "timestamp": "2024-01-15T10:30:00Z"
             }
         }
+    )
+
+
+class LivenessResponse(BaseModel):
+    """Response model for the liveness probe."""
+    status: str = Field(..., description="Always 'alive' while the process can serve requests")
+    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Probe timestamp")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "status": "alive",
+                "timestamp": "2024-01-15T10:30:00Z"
+            }
+        }
+    )
+
+
+class ReadinessResponse(BaseModel):
+    """Response model for the readiness probe."""
+    status: str = Field(..., description="'ready' or 'not_ready'")
+    checks: Dict[str, str] = Field(..., description="Status of startup and each dependency")
+    catalog_size: int = Field(default=0, description="Number of facts held in the warm catalog")
+    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Probe timestamp")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "status": "ready",
+                "checks": {
+                    "startup": "complete",
+                    "database": "connected",
+                    "catalog": "connected",
+                    "ai_service": "connected"
+                },
+                "catalog_size": 10,
+                "timestamp": "2024-01-15T10:30:00Z"
+            }
+        }
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -157,14 +331,15 @@ class ErrorResponse(BaseModel):
     detail: Optional[str] = Field(None, description="Additional error details")
     status_code: int = Field(..., description="HTTP status code")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "error": "Database error",
                 "detail": "Connection failed",
                 "status_code": 500
             }
         }
+    )
 
 
 class SuccessResponse(BaseModel):
@@ -172,13 +347,14 @@ class SuccessResponse(BaseModel):
     message: str = Field(..., description="Success message")
     data: Optional[Dict[str, Any]] = Field(None, description="Response data")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "message": "Operation completed successfully",
                 "data": {"id": "123"}
             }
         }
+    )
 
 
 class ImportFactsRequest(BaseModel):
@@ -190,12 +366,13 @@ class ImportFactsRequest(BaseModel):
         description="Number of facts to import"
     )
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "num_facts": 5
             }
         }
+    )
 
 
 class ImportFactsResponse(BaseModel):
@@ -205,8 +382,8 @@ class ImportFactsResponse(BaseModel):
     requested_count: int = Field(..., description="Number of facts requested")
     message: str = Field(..., description="Response message")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "imported_count": 5,
@@ -214,6 +391,7 @@ class ImportFactsResponse(BaseModel):
                 "message": "Successfully imported 5 facts"
             }
         }
+    )
 
 
 # User Authentication Models
@@ -223,44 +401,49 @@ class UserSignupRequest(BaseModel):
     email: str = Field(..., description="Email address")
     password: str = Field(..., description="Password for the account")
     
-    @validator('username')
-    def validate_username(cls, v):
-        if not v or not v.strip():
+    @field_validator('username')
+    @classmethod
+    def validate_username(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
             raise ValueError("Username cannot be empty")
-        if len(v.strip()) < 2:
+        if len(v) < 2:
             raise ValueError("Username must be at least 2 characters long")
-        if len(v.strip()) > 50:
+        if len(v) > 50:
             raise ValueError("Username must be no more than 50 characters long")
-        import re
-        if not re.match(r'^[a-zA-Z0-9_\s]+$', v.strip()):
+        if not _USERNAME_PATTERN.fullmatch(v):
             raise ValueError("Username can only contain letters, numbers, spaces, and underscores")
-        return v.strip()
+        return v
     
-    @validator('email')
-    def validate_email(cls, v):
-        if not v or not v.strip():
+    @field_validator('email')
+    @classmethod
+    def validate_email(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
             raise ValueError("Email cannot be empty")
         # Simple email validation
         if '@' not in v or '.' not in v:
             raise ValueError("Invalid email format")
-        return v.strip().lower()
+        return v.lower()
     
-    @validator('password')
-    def validate_password(cls, v):
+    @field_validator('password')
+    @classmethod
+    def validate_password(cls, v: str) -> str:
         if not v:
             raise ValueError("Password cannot be empty")
         if len(v) < 6:
             raise ValueError("Password must be at least 6 characters long")
         return v
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "username": "john_doe",
                 "email": "john@example.com",
                 "password": "password123"
             }
         }
+    )
 
 
 class UserLoginRequest(BaseModel):
@@ -268,13 +451,14 @@ class UserLoginRequest(BaseModel):
     username: str = Field(..., description="Username or email")
     password: str = Field(..., description="Password")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "username": "john_doe",
                 "password": "password123"
             }
         }
+    )
 
 
 class UserResponse(BaseModel):
@@ -284,8 +468,8 @@ class UserResponse(BaseModel):
     email: str = Field(..., description="Email address")
     auth_provider: str = Field(..., description="Authentication provider")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": "123e4567-e89b-12d3-a456-426614174000",
                 "username": "john_doe",
@@ -293,6 +477,7 @@ class UserResponse(BaseModel):
                 "auth_provider": "local"
             }
         }
+    )
 
 
 class AuthResponse(BaseModel):
@@ -302,8 +487,8 @@ class AuthResponse(BaseModel):
     user: Optional[UserResponse] = Field(None, description="User data if successful")
     token: Optional[str] = Field(None, description="Authentication token if successful")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "success": True,
                 "message": "Login successful",
@@ -315,4 +500,49 @@ class AuthResponse(BaseModel):
                 },
                 "token": "jwt_token_here"
             }
-        } 
\ No newline at end of file
+        }
+    )
+
+# Admin Models
+class ProfilerArmRequest(BaseModel):
+    """Request model for arming the on-demand profiler."""
+    route: Optional[str] = Field(None, description="Only profile requests whose path starts with this")
+    requests: Optional[int] = Field(None, ge=1, description="Stop after this many matching requests")
+    seconds: Optional[float] = Field(None, gt=0, description="Stop after this many seconds")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "route": "/catfacts/top",
+                "requests": 50,
+                "seconds": 60
+            }
+        }
+    )
+
+
+class ProfilerStatusResponse(BaseModel):
+    """Response model for the profiler state."""
+    armed: bool = Field(..., description="Whether a profiling window is open")
+    route: Optional[str] = Field(None, description="Path prefix being profiled")
+    requests_limit: Optional[int] = Field(None, description="Requests the window covers")
+    requests_profiled: int = Field(..., description="Requests counted into the window so far")
+    seconds_remaining: float = Field(..., description="Seconds until the window closes")
+    samples: int = Field(..., description="Stack samples taken")
+    output: Optional[str] = Field(None, description="Folded-stack file of the current or last window")
+    recent_profiles: List[str] = Field(default_factory=list, description="Profile files in the output directory")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "armed": True,
+                "route": "/catfacts/top",
+                "requests_limit": 50,
+                "requests_profiled": 12,
+                "seconds_remaining": 48.2,
+                "samples": 310,
+                "output": "data/profiles/profile-20240115T103000-4242-1.folded",
+                "recent_profiles": []
+            }
+        }
+    )
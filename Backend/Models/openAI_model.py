@@ -1,29 +1,34 @@
 """
 Data models for OpenAI API interactions.
 """
-from typing import Optional
-from pydantic import BaseModel, Field, validator
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from constants import VALIDATION_RULES
 
+_MAX_QUESTION_LENGTH = VALIDATION_RULES["max_fact_length"]
+
 
 class AIRequest(BaseModel):
     """Request model for AI chat endpoint."""
     question: str = Field(..., description="The question to ask the AI assistant")
     
-    @validator('question')
-    def validate_question(cls, v):
-        if not v or not v.strip():
+    @field_validator('question')
+    @classmethod
+    def validate_question(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
             raise ValueError("Question cannot be empty")
-        if len(v.strip()) > VALIDATION_RULES["max_fact_length"]:
-            raise ValueError(f"Question too long. Maximum {VALIDATION_RULES['max_fact_length']} characters allowed.")
-        return v.strip()
+        if len(v) > _MAX_QUESTION_LENGTH:
+            raise ValueError(f"Question too long. Maximum {_MAX_QUESTION_LENGTH} characters allowed.")
+        return v
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "question": "How often should I feed my cat?"
             }
         }
+    )
 
 
 class AIResponse(BaseModel):
@@ -31,10 +36,118 @@ class AIResponse(BaseModel):
     answer: str = Field(..., description="The AI assistant's response")
     model_used: str = Field(..., description="The AI model used for the response")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        # model_used is a field, not pydantic API
+        protected_namespaces=(),
+        json_schema_extra={
             "example": {
                 "answer": "Adult cats should be fed 2-3 times per day with appropriate portion sizes.",
                 "model_used": "gpt-3.5-turbo"
             }
-        }
\ No newline at end of file
+        }
+    )
+
+
+class AnswerSourceStats(BaseModel):
+    """Answer counts and averages for one answer source."""
+    count: int = Field(..., description="Completed answers from this source")
+    avg_first_token_ms: float = Field(..., description="Average time to the first answer text")
+    avg_total_ms: float = Field(..., description="Average time to the end of the answer")
+    avg_tokens: Optional[float] = Field(None, description="Average OpenAI tokens per answer, when reported")
+
+
+class AIAnswerStatsResponse(BaseModel):
+    """Response model for how chat answers were produced on this worker."""
+    answers: int = Field(..., description="Completed answers")
+    bypass_rate: float = Field(..., description="Share answered without OpenAI (precomputed FAQ or fact catalog)")
+    grounded_rate: float = Field(..., description="Share answered by OpenAI with catalog facts as context")
+    estimated_saved_ms: Optional[float] = Field(
+        None, description="Answer time saved by bypassed answers versus the average model answer"
+    )
+    estimated_saved_tokens: Optional[int] = Field(
+        None, description="OpenAI tokens saved by bypassed answers versus the average model answer"
+    )
+    sources: Dict[str, AnswerSourceStats] = Field(..., description="Per-source stats (faq, catalog, grounded, model)")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "answers": 240,
+                "bypass_rate": 0.425,
+                "grounded_rate": 0.183,
+                "estimated_saved_ms": 234600.0,
+                "estimated_saved_tokens": 18870,
+                "sources": {
+                    "faq": {"count": 40, "avg_first_token_ms": 0.1, "avg_total_ms": 0.1, "avg_tokens": None},
+                    "catalog": {"count": 62, "avg_first_token_ms": 0.4, "avg_total_ms": 0.5, "avg_tokens": None},
+                    "grounded": {"count": 44, "avg_first_token_ms": 610.2, "avg_total_ms": 2480.7, "avg_tokens": 231.0},
+                    "model": {"count": 94, "avg_first_token_ms": 540.8, "avg_total_ms": 2300.5, "avg_tokens": 185.0}
+                }
+            }
+        }
+    )
+
+
+class TokenUsage(BaseModel):
+    """OpenAI token and request counts."""
+    prompt_tokens: int = Field(..., description="Prompt tokens")
+    completion_tokens: int = Field(..., description="Completion tokens")
+    total_tokens: int = Field(..., description="Prompt plus completion tokens")
+    requests: int = Field(..., description="OpenAI requests")
+
+
+class UserTokenUsage(TokenUsage):
+    """Token usage of one user (``user:<id>``, or ``ip:<address>`` for anonymous callers)."""
+    user: str = Field(..., description="Usage key")
+
+
+class AIUsageResponse(BaseModel):
+    """Response model for aggregated OpenAI token usage across workers."""
+    since: str = Field(..., description="First UTC day included (YYYY-MM-DD)")
+    totals: TokenUsage = Field(..., description="Usage over the whole period")
+    by_day: Dict[str, TokenUsage] = Field(..., description="Usage per UTC day")
+    by_model: Dict[str, TokenUsage] = Field(..., description="Usage per OpenAI model")
+    top_users: List[UserTokenUsage] = Field(..., description="Heaviest users by total tokens")
+    users: int = Field(..., description="Distinct users in the period")
+    flushed_at: Optional[float] = Field(None, description="Unix time of this worker's last flush")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "since": "2024-01-09",
+                "totals": {"prompt_tokens": 91200, "completion_tokens": 148800, "total_tokens": 240000, "requests": 1200},
+                "by_day": {
+                    "2024-01-15": {"prompt_tokens": 13000, "completion_tokens": 21000, "total_tokens": 34000, "requests": 170}
+                },
+                "by_model": {
+                    "gpt-3.5-turbo": {"prompt_tokens": 91200, "completion_tokens": 148800, "total_tokens": 240000, "requests": 1200}
+                },
+                "top_users": [
+                    {"user": "user:7d0c2f9e", "prompt_tokens": 4100, "completion_tokens": 6900, "total_tokens": 11000, "requests": 52}
+                ],
+                "users": 310,
+                "flushed_at": 1705314600.0
+            }
+        }
+    )
+
+
+class UserUsageResponse(BaseModel):
+    """Response model for the caller's own token usage today."""
+    day: str = Field(..., description="Current UTC day (YYYY-MM-DD)")
+    tokens_used: int = Field(..., description="Tokens used today")
+    daily_quota: Optional[int] = Field(None, description="Daily token quota, if one is set")
+    tokens_remaining: Optional[int] = Field(None, description="Tokens left today, if a quota is set")
+    resets_in_seconds: int = Field(..., description="Seconds until the quota resets (UTC midnight)")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "day": "2024-01-15",
+                "tokens_used": 1840,
+                "daily_quota": 20000,
+                "tokens_remaining": 18160,
+                "resets_in_seconds": 36000
+            }
+        }
+    )
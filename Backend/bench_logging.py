@@ -0,0 +1,68 @@
+"""
+Microbenchmarks for the logging pipeline.
+
+Measures what one log call costs the calling (request) thread: a disabled
+DEBUG call, an INFO call dropped by sampling, an INFO call handed to the
+background listener (with the listener competing for the GIL and with it
+parked), and the old synchronous StreamHandler with an f-string for
+comparison. The listener's own per-record cost is reported separately.
+Handlers write to os.devnull so only logging overhead counts.
+
+Usage: python bench_logging.py [--number N]
+"""
+import argparse
+import logging
+import os
+import time
+import timeit
+
+import log_pipeline
+
+FACT_ID = "123e4567-e89b-12d3-a456-426614174000"
+
+
+def bench(name: str, call, number: int):
+    best = min(timeit.repeat(call, number=number, repeat=5))
+    print(f"{name:<34}  {best / number * 1e6:7.2f} µs/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000, help="Calls per timing run")
+    args = parser.parse_args()
+    devnull = open(os.devnull, "w")
+
+    # Baseline: what config.setup_logging used to install
+    legacy = logging.getLogger("bench.legacy")
+    legacy.propagate = False
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    legacy.addHandler(handler)
+    legacy.setLevel(logging.INFO)
+    bench("sync StreamHandler, f-string", lambda: legacy.info(f"Retrieved fact by ID: {FACT_ID}"), args.number)
+
+    log_pipeline.setup(
+        level="INFO",
+        handlers=[logging.StreamHandler(devnull)],
+        sample_rates={"bench.sampled": 0.0}
+    )
+    kept = logging.getLogger("bench.kept")
+    sampled = logging.getLogger("bench.sampled")
+    bench("disabled DEBUG", lambda: kept.debug("Retrieved fact by ID: %s", FACT_ID), args.number)
+    bench("INFO dropped by sampling", lambda: sampled.info("Retrieved fact by ID: %s", FACT_ID), args.number)
+    bench("INFO enqueued, listener busy", lambda: kept.info("Retrieved fact by ID: %s", FACT_ID), args.number)
+
+    # Caller-side cost alone: park the listener so records just accumulate,
+    # then time how long the background thread takes to drain them
+    listener = log_pipeline._listener
+    listener.stop()
+    bench("INFO enqueued, listener parked", lambda: kept.info("Retrieved fact by ID: %s", FACT_ID), args.number)
+    backlog = listener.queue.qsize()
+    started = time.perf_counter()
+    listener.start()
+    log_pipeline.shutdown()
+    print(f"{'listener drain (background)':<34}  {(time.perf_counter() - started) / backlog * 1e6:7.2f} µs/record")
+
+
+if __name__ == "__main__":
+    main()
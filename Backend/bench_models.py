@@ -0,0 +1,63 @@
+"""
+Microbenchmarks for the API models.
+
+Times each model's hot construction path, and for response models compares
+full validation against the trusted ``from_row`` path used for database rows.
+
+Usage: python bench_models.py [--number N]
+"""
+import argparse
+import timeit
+
+from Models import (
+    AIRequest,
+    CatFactCreateRequest,
+    CatFactListResponse,
+    CatFactResponse,
+    TrendingFactResponse,
+    UserSignupRequest
+)
+
+ROW = {
+    "id": "123e4567-e89b-12d3-a456-426614174000",
+    "fact": "Cats have over 20 muscles that control their ears.",
+    "created_at": "2024-01-15T10:30:00.123456+00:00",
+    "updated_at": "2024-01-15T10:30:00.123456+00:00",
+    "likes_count": 5
+}
+PAGE = [dict(ROW, id=f"123e4567-e89b-12d3-a456-{i:012d}") for i in range(100)]
+
+CASES = [
+    ("CatFactResponse (validated)", lambda: CatFactResponse(**ROW, liked_by_me=True)),
+    ("CatFactResponse.model_construct", lambda: CatFactResponse.model_construct(**ROW, liked_by_me=True)),
+    ("CatFactResponse.from_row", lambda: CatFactResponse.from_row(ROW, liked_by_me=True)),
+    ("TrendingFactResponse (validated)", lambda: TrendingFactResponse(**ROW, trending_score=3.7)),
+    ("TrendingFactResponse.from_row", lambda: TrendingFactResponse.from_row(ROW, trending_score=3.7)),
+    ("CatFactListResponse, 100 validated", lambda: CatFactListResponse(
+        facts=[CatFactResponse(**row) for row in PAGE], total_count=len(PAGE)
+    )),
+    ("CatFactListResponse, 100 from_row", lambda: CatFactListResponse(
+        facts=[CatFactResponse.from_row(row) for row in PAGE], total_count=len(PAGE)
+    )),
+    ("CatFactCreateRequest", lambda: CatFactCreateRequest(fact="  Cats sleep for 70% of their lives.  ")),
+    ("UserSignupRequest", lambda: UserSignupRequest(
+        username=" john_doe ", email="John@Example.com", password="password123"
+    )),
+    ("AIRequest", lambda: AIRequest(question="How often should I feed my cat?")),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Calls per timing run")
+    args = parser.parse_args()
+
+    width = max(len(name) for name, _ in CASES)
+    for name, case in CASES:
+        number = max(1, args.number // 100) if "100" in name else args.number
+        best = min(timeit.repeat(case, number=number, repeat=5))
+        print(f"{name:<{width}}  {best / number * 1e6:9.2f} µs/op")
+
+
+if __name__ == "__main__":
+    main()
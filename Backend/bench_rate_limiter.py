@@ -0,0 +1,86 @@
+"""
+Microbenchmarks for the per-client rate limiter.
+
+Times ``TokenBucketLimiter.acquire`` on its hot path (a known client with
+tokens left), a known client being refused, and a first request from a new
+client, both with room left and with a full limiter evicting its least
+recently seen client. The full per-request check the middleware runs (route
+match, client key, acquire) is timed as well.
+
+Usage: python bench_rate_limiter.py [--number N]
+"""
+import argparse
+import timeit
+
+from middleware.rate_limiter import RateLimitMiddleware, RouteGroup, TokenBucketLimiter, client_ip
+
+REPEAT = 5
+MAX_KEYS = 10000
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/catfacts/random",
+    "client": ("203.0.113.7", 52814),
+    "headers": [(b"x-forwarded-for", b"198.51.100.23, 10.0.0.1")],
+}
+
+
+def bench(name: str, call, number: int):
+    best = min(timeit.repeat(call, number=number, repeat=REPEAT))
+    print(f"{name:<38}  {best / number * 1e6:7.2f} µs/call")
+
+
+def new_clients(number: int):
+    """A distinct key per call, built up front so key formatting is not timed."""
+    return iter([f"catfacts:ip:198.51.{i // 256 % 256}.{i % 256}#{i}" for i in range(number * REPEAT)]).__next__
+
+
+def full_limiter() -> TokenBucketLimiter:
+    limiter = TokenBucketLimiter(rate=10, burst=20, max_keys=MAX_KEYS)
+    for i in range(MAX_KEYS):
+        limiter.acquire(f"catfacts:ip:seed-{i}", now=0.0)
+    return limiter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000, help="Calls per timing run")
+    args = parser.parse_args()
+
+    # Refills faster than the benchmark can drain it, so every call is allowed
+    allowed = TokenBucketLimiter(rate=1e9, burst=1e9, max_keys=MAX_KEYS)
+    for i in range(MAX_KEYS - 1):
+        allowed.acquire(f"catfacts:ip:seed-{i}")
+    bench("known client, allowed", lambda: allowed.acquire("catfacts:ip:203.0.113.7"), args.number)
+
+    refused = TokenBucketLimiter(rate=1e-9, burst=1, max_keys=MAX_KEYS)
+    refused.acquire("catfacts:ip:203.0.113.7")
+    bench("known client, refused", lambda: refused.acquire("catfacts:ip:203.0.113.7"), args.number)
+
+    roomy = TokenBucketLimiter(rate=10, burst=20, max_keys=args.number * REPEAT + 1)
+    next_key = new_clients(args.number)
+    bench("new client, under max_keys", lambda: roomy.acquire(next_key()), args.number)
+
+    evicting = full_limiter()
+    next_key = new_clients(args.number)
+    bench("new client, evicting LRU client", lambda: evicting.acquire(next_key()), args.number)
+    assert len(evicting) == MAX_KEYS
+
+    # What RateLimitMiddleware.__call__ does before handing the request on, with
+    # main.py's route groups (an anonymous GET falls through to the last one)
+    groups = [
+        RouteGroup("likes", r"^/catfacts/[^/]+/like$", ["POST", "DELETE"], TokenBucketLimiter(rate=1e9, burst=1e9)),
+        RouteGroup("ai", r"^/api/ask-ai$", ["POST"], TokenBucketLimiter(rate=1e9, burst=1e9)),
+        RouteGroup("catfacts", r"^/catfacts", ["GET", "POST", "DELETE"], TokenBucketLimiter(rate=1e9, burst=1e9)),
+    ]
+    middleware = RateLimitMiddleware(None, groups, key_func=lambda scope: f"ip:{client_ip(scope, True)}")
+
+    def check():
+        group = middleware._group_for(SCOPE["method"], SCOPE["path"])
+        return group.limiter.acquire(f"{group.name}:{middleware.key_func(SCOPE)}")
+
+    bench("middleware check (match, key, acquire)", check, args.number)
+
+
+if __name__ == "__main__":
+    main()
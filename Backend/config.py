@@ -3,9 +3,12 @@ Configuration management for the Cat Facts API.
 """
 import os
 import logging
+import tempfile
 from typing import Optional
 from dotenv import load_dotenv
 
+import log_pipeline
+
 # Load environment variables
 load_dotenv()
 
@@ -33,6 +36,34 @@ class Config:
     OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", 256))
     OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", 0.7))
     
+    # AI Catalog Bypass Configuration (confident catalog matches answer without OpenAI,
+    # weaker ones become grounding context; confidences are in [0, 1])
+    AI_BYPASS_ENABLED: bool = os.getenv("AI_BYPASS_ENABLED", "True").lower() == "true"
+    AI_BYPASS_ANSWER_CONFIDENCE: float = float(os.getenv("AI_BYPASS_ANSWER_CONFIDENCE", 0.9))
+    AI_BYPASS_ANSWER_MIN_TERMS: int = int(os.getenv("AI_BYPASS_ANSWER_MIN_TERMS", 2))
+    AI_BYPASS_CONTEXT_CONFIDENCE: float = float(os.getenv("AI_BYPASS_CONTEXT_CONFIDENCE", 0.2))
+    AI_BYPASS_CONTEXT_FACTS: int = int(os.getenv("AI_BYPASS_CONTEXT_FACTS", 3))
+    
+    # Precomputed FAQ Answers Configuration (written by precompute_faq.py; empty path disables)
+    FAQ_STORE_PATH: str = os.getenv("FAQ_STORE_PATH", "data/faq_answers.json")
+    FAQ_RELOAD_SECONDS: float = float(os.getenv("FAQ_RELOAD_SECONDS", 30))
+    FAQ_WORKERS: int = int(os.getenv("FAQ_WORKERS", 4))
+    FAQ_REQUESTS_PER_MINUTE: float = float(os.getenv("FAQ_REQUESTS_PER_MINUTE", 60))
+    # Log each chat question (as a "question" field) so frequent ones can be mined for the FAQ
+    AI_LOG_QUESTIONS: bool = os.getenv("AI_LOG_QUESTIONS", "False").lower() == "true"
+    
+    # AI Usage Metering Configuration (token counters flushed to daily JSONL files named after
+    # AI_USAGE_STORE_PATH and shared by workers; a daily quota of 0 means unlimited)
+    AI_USAGE_STORE_PATH: str = os.getenv("AI_USAGE_STORE_PATH", "data/ai_usage.jsonl")
+    AI_USAGE_FLUSH_SECONDS: float = float(os.getenv("AI_USAGE_FLUSH_SECONDS", 10))
+    AI_USAGE_RETENTION_DAYS: int = int(os.getenv("AI_USAGE_RETENTION_DAYS", 31))
+    AI_USER_DAILY_TOKEN_QUOTA: int = int(os.getenv("AI_USER_DAILY_TOKEN_QUOTA", 0))
+    
+    # AI Streaming Configuration (answer text is flushed at FLUSH_BYTES or after FLUSH_MS, whichever comes first)
+    AI_STREAM_FLUSH_BYTES: int = int(os.getenv("AI_STREAM_FLUSH_BYTES", 256))
+    AI_STREAM_FLUSH_MS: float = float(os.getenv("AI_STREAM_FLUSH_MS", 50))
+    AI_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("AI_STREAM_HEARTBEAT_SECONDS", 15))
+    
     # CORS Configuration
     ALLOWED_ORIGINS: list = os.getenv("ALLOWED_ORIGINS", "*").split(",")
     ALLOWED_CREDENTIALS: bool = True
@@ -42,6 +73,9 @@ class Config:
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_JSON: bool = os.getenv("LOG_JSON", "True").lower() == "true"
+    # Fraction of INFO/DEBUG records kept per logger (or package prefix), e.g. "database=0.01,uvicorn.access=0.1"
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "database.supabase_db=0.01")
     
     # Validation Rules
     MAX_FACT_LENGTH: int = int(os.getenv("MAX_FACT_LENGTH", 1000))
@@ -49,6 +83,122 @@ class Config:
     MAX_IMPORT_FACTS: int = int(os.getenv("MAX_IMPORT_FACTS", 100))
     DEFAULT_IMPORT_FACTS: int = int(os.getenv("DEFAULT_IMPORT_FACTS", 5))
     
+    # Password Hashing Configuration
+    PASSWORD_HASH_ALGORITHM: str = os.getenv("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256")
+    PASSWORD_HASH_TARGET_MS: int = int(os.getenv("PASSWORD_HASH_TARGET_MS", 100))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_CONCURRENCY: int = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", 8))
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 2.0))
+    
+    # Access Token Configuration
+    AUTH_TOKEN_SECRET: Optional[str] = os.getenv("AUTH_TOKEN_SECRET")
+    # Development only: sign with a random per-process secret when AUTH_TOKEN_SECRET is unset
+    AUTH_ALLOW_RANDOM_SECRET: bool = os.getenv("AUTH_ALLOW_RANDOM_SECRET", "False").lower() == "true"
+    AUTH_TOKEN_TTL_SECONDS: int = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", 86400))
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
+    AUTH_REVOCATION_REFRESH_SECONDS: int = int(os.getenv("AUTH_REVOCATION_REFRESH_SECONDS", 60))
+    
+    # Rate Limiting Configuration ("<requests per second>,<burst>" per route group)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMIT_MAX_CLIENTS: int = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 10000))
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "False").lower() == "true"
+    RATE_LIMIT_CATFACTS: str = os.getenv("RATE_LIMIT_CATFACTS", "10,40")
+    RATE_LIMIT_LIKES: str = os.getenv("RATE_LIMIT_LIKES", "2,10")
+    RATE_LIMIT_AI: str = os.getenv("RATE_LIMIT_AI", "0.2,5")
+    
+    # Outbound HTTP Configuration (shared keep-alive pools, one per upstream host)
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.0))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", 30.0))
+    HTTP_POOL_TIMEOUT: float = float(os.getenv("HTTP_POOL_TIMEOUT", 5.0))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60.0))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 10))
+    HTTP_MAX_CONNECTIONS_SUPABASE: int = int(os.getenv("HTTP_MAX_CONNECTIONS_SUPABASE", 20))
+    HTTP_MAX_CONNECTIONS_OPENAI: int = int(os.getenv("HTTP_MAX_CONNECTIONS_OPENAI", 20))
+    HTTP_MAX_CONNECTIONS_CATFACTS: int = int(os.getenv("HTTP_MAX_CONNECTIONS_CATFACTS", 2))
+    
+    # Resilience Configuration (per-request deadline budgets, read retries, per-upstream breakers)
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", 10))
+    REQUEST_DEADLINE_AI_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_AI_SECONDS", 60))
+    REQUEST_DEADLINE_IMPORT_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_IMPORT_SECONDS", 120))
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", 3))
+    RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("RETRY_BASE_DELAY_SECONDS", 0.1))
+    RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("RETRY_MAX_DELAY_SECONDS", 1.0))
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+    BREAKER_RESET_SECONDS: float = float(os.getenv("BREAKER_RESET_SECONDS", 30))
+    
+    # Catalog Cache Configuration
+    CATALOG_TTL_SECONDS: float = float(os.getenv("CATALOG_TTL_SECONDS", 30))
+    CATALOG_SNAPSHOT_PATH: str = os.getenv("CATALOG_SNAPSHOT_PATH", "data/catalog.snapshot")
+    CATALOG_SNAPSHOT_INTERVAL_SECONDS: float = float(os.getenv("CATALOG_SNAPSHOT_INTERVAL_SECONDS", 300))
+    CATALOG_SYNC_INTERVAL_SECONDS: float = float(os.getenv("CATALOG_SYNC_INTERVAL_SECONDS", 2))
+    CATALOG_SYNC_BATCH_SIZE: int = int(os.getenv("CATALOG_SYNC_BATCH_SIZE", 500))
+    CATALOG_SYNC_OVERLAP_SECONDS: float = float(os.getenv("CATALOG_SYNC_OVERLAP_SECONDS", 5))
+    
+    # Top-liked Leaderboard Configuration (entries beyond LEADERBOARD_MAX_N are slack)
+    LEADERBOARD_MAX_N: int = int(os.getenv("LEADERBOARD_MAX_N", 50))
+    LEADERBOARD_CAPACITY: int = int(os.getenv("LEADERBOARD_CAPACITY", 100))
+    LEADERBOARD_RECONCILE_SECONDS: float = float(os.getenv("LEADERBOARD_RECONCILE_SECONDS", 60))
+    
+    # Trending Configuration (likes decay exponentially with this half-life)
+    TRENDING_HALF_LIFE_HOURS: float = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 6))
+    TRENDING_HISTORY_HALF_LIVES: float = float(os.getenv("TRENDING_HISTORY_HALF_LIVES", 10))
+    TRENDING_MAX_N: int = int(os.getenv("TRENDING_MAX_N", 50))
+    TRENDING_CAPACITY: int = int(os.getenv("TRENDING_CAPACITY", 100))
+    TRENDING_POLL_SECONDS: float = float(os.getenv("TRENDING_POLL_SECONDS", 5))
+    
+    # No-repeat Random Facts Configuration (LRU bound on tracked users/sessions)
+    RANDOM_NO_REPEAT_MAX_VIEWERS: int = int(os.getenv("RANDOM_NO_REPEAT_MAX_VIEWERS", 10000))
+    
+    # Per-user Liked Facts Cache (for liked_by_me)
+    LIKED_FACTS_CACHE_USERS: int = int(os.getenv("LIKED_FACTS_CACHE_USERS", 10000))
+    LIKED_FACTS_CACHE_TTL_SECONDS: float = float(os.getenv("LIKED_FACTS_CACHE_TTL_SECONDS", 30))
+    
+    # Batch Lookup Configuration
+    BATCH_MAX_IDS: int = int(os.getenv("BATCH_MAX_IDS", 100))
+    
+    # Live Updates (Server-Sent Events) Configuration
+    SSE_MAX_SUBSCRIBERS: int = int(os.getenv("SSE_MAX_SUBSCRIBERS", 5000))
+    SSE_QUEUE_SIZE: int = int(os.getenv("SSE_QUEUE_SIZE", 64))
+    SSE_HEARTBEAT_SECONDS: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+    SSE_REPLAY_SIZE: int = int(os.getenv("SSE_REPLAY_SIZE", 256))
+    SSE_RETRY_MS: int = int(os.getenv("SSE_RETRY_MS", 3000))
+    
+    # Bulk Loader Configuration (defaults for load_facts.py)
+    LOADER_BATCH_SIZE: int = int(os.getenv("LOADER_BATCH_SIZE", 1000))
+    LOADER_WRITERS: int = int(os.getenv("LOADER_WRITERS", 4))
+    LOADER_CHECKPOINT_PATH: str = os.getenv("LOADER_CHECKPOINT_PATH", "data/load_facts.checkpoint.json")
+    
+    # Multi-worker Serving Configuration (workers share one memory-mapped catalog)
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", 1))
+    SHARED_CATALOG_DIR: str = os.getenv(
+        "SHARED_CATALOG_DIR",
+        os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "meowlogy")
+    )
+    
+    # Tracing Configuration (Server-Timing header plus optional export of sampled traces)
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", 0.05))
+    TRACE_SERVER_TIMING: bool = os.getenv("TRACE_SERVER_TIMING", "True").lower() == "true"
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_FILE_PATH: str = os.getenv("TRACE_FILE_PATH", "data/traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318")
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "meowlogy-api")
+    TRACE_EXPORT_BATCH_SIZE: int = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", 512))
+    TRACE_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", 5))
+
+    # Admin Configuration (admin endpoints and headers are disabled while the key is unset)
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
+
+    # On-demand Profiler Configuration (folded stacks for flamegraph.pl / speedscope)
+    PROFILER_OUTPUT_DIR: str = os.getenv("PROFILER_OUTPUT_DIR", "data/profiles")
+    PROFILER_INTERVAL_MS: float = float(os.getenv("PROFILER_INTERVAL_MS", 5))
+    PROFILER_MAX_SECONDS: float = float(os.getenv("PROFILER_MAX_SECONDS", 120))
+    PROFILER_MAX_REQUESTS: int = int(os.getenv("PROFILER_MAX_REQUESTS", 1000))
+
+    # Health Check Configuration
+    READINESS_CACHE_SECONDS: float = float(os.getenv("READINESS_CACHE_SECONDS", 5))
+    READINESS_AI_CACHE_SECONDS: float = float(os.getenv("READINESS_AI_CACHE_SECONDS", 60))
+    
     @classmethod
     def validate(cls) -> bool:
         """Validate that all required configuration is present."""
@@ -62,6 +212,9 @@ class Config:
             if not var_value:
                 missing_vars.append(var_name)
         
+        if not cls.AUTH_TOKEN_SECRET and not cls.AUTH_ALLOW_RANDOM_SECRET:
+            missing_vars.append("AUTH_TOKEN_SECRET")
+        
         if missing_vars:
             logging.error(f"Missing required environment variables: {', '.join(missing_vars)}")
             return False
@@ -70,16 +223,41 @@ class Config:
     
     @classmethod
     def setup_logging(cls):
-        """Setup logging configuration."""
-        logging.basicConfig(
-            level=getattr(logging, cls.LOG_LEVEL.upper()),
-            format=cls.LOG_FORMAT,
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler("app.log") if cls.DEBUG else logging.NullHandler()
-            ]
+        """Setup logging configuration (handlers run on a background thread)."""
+        log_pipeline.setup(
+            level=cls.LOG_LEVEL,
+            handlers=log_pipeline.default_handlers("app.log" if cls.DEBUG else None),
+            json_output=cls.LOG_JSON,
+            text_format=cls.LOG_FORMAT,
+            sample_rates=log_pipeline.parse_sample_rates(cls.LOG_SAMPLE_RATES)
         )
     
+    @classmethod
+    def get_rate_limits(cls) -> dict:
+        """Get rate limit settings keyed by route group."""
+        return {
+            "likes": cls.RATE_LIMIT_LIKES,
+            "ai": cls.RATE_LIMIT_AI,
+            "catfacts": cls.RATE_LIMIT_CATFACTS,
+        }
+    
+    @classmethod
+    def get_http_pool_limits(cls) -> dict:
+        """Get the maximum connections per upstream HTTP pool."""
+        return {
+            "supabase": cls.HTTP_MAX_CONNECTIONS_SUPABASE,
+            "openai": cls.HTTP_MAX_CONNECTIONS_OPENAI,
+            "catfacts": cls.HTTP_MAX_CONNECTIONS_CATFACTS,
+        }
+    
+    @classmethod
+    def get_request_deadlines(cls) -> list:
+        """Deadline budgets (path prefix, seconds) for routes that outlive the default."""
+        return [
+            ("/api/ask-ai", cls.REQUEST_DEADLINE_AI_SECONDS),
+            ("/import-facts", cls.REQUEST_DEADLINE_IMPORT_SECONDS),
+        ]
+    
     @classmethod
     def get_cors_config(cls) -> dict:
         """Get CORS configuration dictionary."""
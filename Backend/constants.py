@@ -37,6 +37,13 @@ CAT_CARE_SYSTEM_PROMPT = (
     "Feel free to sprinkle in cat puns or playful language to make the experience fun and welcoming."
 )
 
+# Answers served straight from the fact catalog, and grounding for the model
+CATALOG_ANSWER_TEMPLATE = "Meow! Here's what our cat facts say: {fact}"
+CATALOG_CONTEXT_PROMPT = (
+    "These facts from our catalog may help answer the question. "
+    "Use them where relevant and do not contradict them:\n"
+)
+
 # External API Configuration
 CAT_FACTS_API_URL = "https://catfact.ninja/fact"
 CAT_FACTS_API_DELAY = 0.5  # seconds between requests
@@ -45,6 +52,7 @@ CAT_FACTS_API_DELAY = 0.5  # seconds between requests
 CAT_FACTS_TABLE = "cat_facts"
 FACT_LIKES_TABLE = "fact_likes"
 USERS_TABLE = "users"
+REVOKED_TOKENS_TABLE = "revoked_tokens"
 
 # Error Messages
 ERROR_MESSAGES = {
@@ -52,6 +60,7 @@ ERROR_MESSAGES = {
     "fact_not_found": "Fact not found",
     "fact_empty": "Fact cannot be empty",
     "openai_key_missing": "OpenAI API key not set",
+    "auth_secret_missing": "AUTH_TOKEN_SECRET must be set (or AUTH_ALLOW_RANDOM_SECRET=true for local development)",
     "supabase_credentials_missing": "SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables",
     "no_facts_found": "No facts found in database",
     "duplicate_fact": "Fact already exists",
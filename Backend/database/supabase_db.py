@@ -2,20 +2,20 @@ import os
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from supabase import create_client, Client
-import uuid
 import logging
-import hashlib
-import secrets
 from constants import (
     SUPABASE_URL, 
     SUPABASE_ANON_KEY, 
     CAT_FACTS_TABLE, 
     FACT_LIKES_TABLE,
     USERS_TABLE,
+    REVOKED_TOKENS_TABLE,
     ERROR_MESSAGES,
     SUCCESS_MESSAGES
 )
 from exceptions import DatabaseException, ConfigurationException
+from http_client import http_clients
+from tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -30,13 +30,27 @@ class SupabaseCatFactsDB:
         
         try:
             self.client: Client = create_client(self.supabase_url, self.supabase_key)
+            self._use_shared_pool()
             logger.info(SUCCESS_MESSAGES["database_connected"])
         except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {e}")
+            logger.error("Failed to initialize Supabase client: %s", e)
             raise DatabaseException(f"Failed to connect to Supabase: {e}")
         
         self.init_db()
     
+    def _use_shared_pool(self):
+        """Route PostgREST traffic through the shared, tuned Supabase HTTP pool."""
+        postgrest = self.client.postgrest
+        session = postgrest.session
+        shared = http_clients.get(
+            "supabase",
+            base_url=str(session.base_url),
+            headers=dict(session.headers)
+        )
+        if shared is not session:
+            postgrest.session = shared
+            session.close()
+    
     def init_db(self):
         """Initialize the database tables (this would be done via Supabase dashboard in production)"""
         # Note: In production, you would create these tables via Supabase dashboard
@@ -93,27 +107,28 @@ class SupabaseCatFactsDB:
         FOR EACH ROW EXECUTE FUNCTION update_likes_count();
         """
     
+    @traced("db")
     def insert_fact(self, fact: str) -> Dict[str, Any]:
         """Insert a new cat fact, returns result with status and data"""
         try:
             # Check if fact already exists
             existing = self.client.table(CAT_FACTS_TABLE).select('id').eq('fact', fact).execute()
             if existing.data:
-                logger.warning(f"Attempted to insert duplicate fact: {fact[:50]}...")
+                logger.warning("Attempted to insert duplicate fact: %s...", fact[:50])
                 return {
                     "success": False,
                     "message": ERROR_MESSAGES["duplicate_fact"],
                     "status": "duplicate"
                 }
             
-            # Insert new fact
+            # Insert new fact; created_at/updated_at come from the database clock,
+            # which is what the change feed compares against
             result = self.client.table(CAT_FACTS_TABLE).insert({
-                'fact': fact,
-                'created_at': datetime.utcnow().isoformat()
+                'fact': fact
             }).execute()
             
             if result.data:
-                logger.info(f"Successfully inserted fact: {fact[:50]}...")
+                logger.info("Successfully inserted fact: %s...", fact[:50])
                 return {
                     "success": True,
                     "message": SUCCESS_MESSAGES["fact_added"],
@@ -129,29 +144,87 @@ class SupabaseCatFactsDB:
                 }
                 
         except Exception as e:
-            logger.error(f"Database error while inserting fact: {e}")
+            logger.error("Database error while inserting fact: %s", e)
             return {
                 "success": False,
                 "message": f"Database error: {str(e)}",
                 "status": "error"
             }
     
+    @traced("db")
+    def upsert_facts(self, facts: List[str]) -> int:
+        """Insert many facts in one statement, skipping ones that already exist; returns how many were new"""
+        try:
+            # ON CONFLICT DO NOTHING returns only the rows actually inserted
+            result = self.client.table(CAT_FACTS_TABLE).upsert(
+                [{'fact': fact} for fact in facts],
+                on_conflict='fact',
+                ignore_duplicates=True
+            ).execute()
+            inserted = len(result.data or [])
+            logger.info("Bulk upserted %d facts (%d new)", len(facts), inserted)
+            return inserted
+        except Exception as e:
+            logger.error("Error bulk upserting %d facts: %s", len(facts), e)
+            raise DatabaseException(f"Failed to upsert facts: {e}")
+    
+    @traced("db")
     def get_all_facts(self) -> List[Dict[str, Any]]:
         """Get all active cat facts from the database"""
         try:
             result = self.client.table(CAT_FACTS_TABLE)\
-                .select('id, fact, created_at, likes_count')\
+                .select('id, fact, created_at, likes_count, updated_at')\
                 .eq('is_active', True)\
                 .order('created_at', desc=True)\
                 .execute()
             
             facts = result.data if result.data else []
-            logger.info(f"Retrieved {len(facts)} facts from database")
+            logger.info("Retrieved %d facts from database", len(facts))
             return facts
         except Exception as e:
-            logger.error(f"Error fetching facts: {e}")
+            logger.error("Error fetching facts: %s", e)
             raise DatabaseException(f"Failed to fetch facts: {e}")
     
+    @traced("db")
+    def get_latest_fact_change(self) -> Optional[str]:
+        """Get the newest ``updated_at`` in ``cat_facts`` (a starting change-feed watermark)"""
+        try:
+            result = self.client.table(CAT_FACTS_TABLE)\
+                .select('updated_at')\
+                .order('updated_at', desc=True)\
+                .limit(1)\
+                .execute()
+            return result.data[0]['updated_at'] if result.data else None
+        except Exception as e:
+            logger.error("Error fetching latest fact change: %s", e)
+            raise DatabaseException(f"Failed to fetch latest fact change: {e}")
+    
+    @traced("db")
+    def get_fact_changes(self, since: str, after_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Get facts (including soft-deleted ones) changed at or after ``since``, oldest first.
+        
+        ``after_id`` continues a page: rows at exactly ``since`` are only returned
+        when their ID sorts after it.
+        """
+        try:
+            query = self.client.table(CAT_FACTS_TABLE)\
+                .select('id, fact, created_at, likes_count, is_active, updated_at')
+            if after_id is None:
+                query = query.gte('updated_at', since)
+            else:
+                quoted = self._quote_filter_value(since)
+                query = query.or_(f"updated_at.gt.{quoted},and(updated_at.eq.{quoted},id.gt.{after_id})")
+            result = query\
+                .order('updated_at')\
+                .order('id')\
+                .limit(limit)\
+                .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error fetching fact changes since %s: %s", since, e)
+            raise DatabaseException(f"Failed to fetch fact changes: {e}")
+    
+    @traced("db")
     def get_random_fact(self) -> Optional[Dict[str, Any]]:
         """Get a random cat fact from the database"""
         try:
@@ -177,9 +250,10 @@ class SupabaseCatFactsDB:
                 return fact
                 
         except Exception as e:
-            logger.error(f"Error fetching random fact: {e}")
+            logger.error("Error fetching random fact: %s", e)
             raise DatabaseException(f"Failed to fetch random fact: {e}")
     
+    @traced("db")
     def fact_exists(self, fact: str) -> bool:
         """Check if a fact already exists in the database"""
         try:
@@ -190,68 +264,102 @@ class SupabaseCatFactsDB:
                 .execute()
             
             exists = len(result.data) > 0
-            logger.debug(f"Fact existence check for '{fact[:30]}...': {exists}")
+            logger.debug("Fact existence check for '%s...': %s", fact[:30], exists)
             return exists
         except Exception as e:
-            logger.error(f"Error checking fact existence: {e}")
+            logger.error("Error checking fact existence: %s", e)
             raise DatabaseException(f"Failed to check fact existence: {e}")
     
-    def like_fact(self, fact_id: str, user_id: str = None) -> Dict[str, Any]:
-        """Like a fact (for future use)"""
+    @traced("db")
+    def like_fact(self, fact_id: str, user_id: str) -> Dict[str, Any]:
+        """Like a fact on behalf of a user; liking twice is a no-op"""
         try:
-            # For now, we'll use a simple approach without user authentication
-            # In the future, you can integrate with Supabase Auth
-            temp_user_id = user_id or str(uuid.uuid4())
-            
-            result = self.client.table(FACT_LIKES_TABLE).insert({
+            # ON CONFLICT DO NOTHING: only a genuinely new like is returned (and counted by the trigger)
+            result = self.client.table(FACT_LIKES_TABLE).upsert({
                 'fact_id': fact_id,
-                'user_id': temp_user_id
-            }).execute()
+                'user_id': user_id
+            }, on_conflict='fact_id,user_id', ignore_duplicates=True).execute()
             
-            if result.data:
-                logger.info(f"Successfully liked fact: {fact_id}")
-                return {
-                    "success": True,
-                    "message": SUCCESS_MESSAGES["fact_liked"]
-                }
-            else:
-                logger.error(f"Failed to like fact: {fact_id}")
-                return {
-                    "success": False,
-                    "message": ERROR_MESSAGES["failed_to_like_fact"]
-                }
+            logger.info("User %s liked fact: %s", user_id, fact_id)
+            return {
+                "success": True,
+                "message": SUCCESS_MESSAGES["fact_liked"],
+                "added": bool(result.data)
+            }
                 
         except Exception as e:
-            logger.error(f"Error liking fact {fact_id}: {e}")
+            logger.error("Error liking fact %s: %s", fact_id, e)
             return {
                 "success": False,
                 "message": f"Error liking fact: {str(e)}"
             }
     
-    def unlike_fact(self, fact_id: str, user_id: str = None) -> Dict[str, Any]:
-        """Unlike a fact (for future use)"""
+    @traced("db")
+    def unlike_fact(self, fact_id: str, user_id: str) -> Dict[str, Any]:
+        """Remove a user's like; unliking a fact that is not liked is a no-op"""
         try:
-            temp_user_id = user_id or str(uuid.uuid4())
-            
             result = self.client.table(FACT_LIKES_TABLE)\
                 .delete()\
                 .eq('fact_id', fact_id)\
-                .eq('user_id', temp_user_id)\
+                .eq('user_id', user_id)\
                 .execute()
             
-            logger.info(f"Successfully unliked fact: {fact_id}")
+            logger.info("User %s unliked fact: %s", user_id, fact_id)
             return {
                 "success": True,
-                "message": SUCCESS_MESSAGES["fact_unliked"]
+                "message": SUCCESS_MESSAGES["fact_unliked"],
+                "removed": bool(result.data)
             }
                 
         except Exception as e:
-            logger.error(f"Error unliking fact {fact_id}: {e}")
+            logger.error("Error unliking fact %s: %s", fact_id, e)
             return {
                 "success": False,
                 "message": f"Error unliking fact: {str(e)}"
             }
     
+    @traced("db")
+    def get_liked_fact_ids(self, user_id: str) -> List[str]:
+        """Get the IDs of every fact a user has liked (served by idx_fact_likes_user_id)"""
+        try:
+            result = self.client.table(FACT_LIKES_TABLE)\
+                .select('fact_id')\
+                .eq('user_id', user_id)\
+                .execute()
+            return [row['fact_id'] for row in result.data or []]
+        except Exception as e:
+            logger.error("Error fetching liked facts for user %s: %s", user_id, e)
+            raise DatabaseException(f"Failed to fetch liked facts: {e}")
+    
+    @traced("db")
+    def get_likes_since(self, since: str, after_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Get likes created at or after ``since``, oldest first (keyset-paged like ``get_fact_changes``)"""
+        try:
+            query = self.client.table(FACT_LIKES_TABLE).select('id, fact_id, created_at')
+            if after_id is None:
+                query = query.gte('created_at', since)
+            else:
+                quoted = self._quote_filter_value(since)
+                query = query.or_(f"created_at.gt.{quoted},and(created_at.eq.{quoted},id.gt.{after_id})")
+            result = query\
+                .order('created_at')\
+                .order('id')\
+                .limit(limit)\
+                .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error fetching likes since %s: %s", since, e)
+            raise DatabaseException(f"Failed to fetch likes: {e}")
+    
+    @traced("db")
+    def ping(self):
+        """Run the cheapest possible query; raises DatabaseException when Supabase is unreachable."""
+        try:
+            self.client.table(CAT_FACTS_TABLE).select('id').limit(1).execute()
+        except Exception as e:
+            raise DatabaseException(f"Supabase ping failed: {e}")
+    
+    @traced("db")
     def get_fact_by_id(self, fact_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific fact by ID"""
         try:
@@ -263,89 +371,106 @@ class SupabaseCatFactsDB:
             
             fact = result.data[0] if result.data else None
             if fact:
-                logger.info(f"Retrieved fact by ID: {fact_id}")
+                logger.info("Retrieved fact by ID: %s", fact_id)
             else:
-                logger.warning(f"Fact not found with ID: {fact_id}")
+                logger.warning("Fact not found with ID: %s", fact_id)
             return fact
         except Exception as e:
-            logger.error(f"Error fetching fact by ID {fact_id}: {e}")
+            logger.error("Error fetching fact by ID %s: %s", fact_id, e)
             raise DatabaseException(f"Failed to fetch fact by ID: {e}")
     
+    @traced("db")
+    def get_top_liked_facts(self, limit: int) -> List[Dict[str, Any]]:
+        """Get the most-liked active facts (served by idx_cat_facts_top_liked)"""
+        try:
+            result = self.client.table(CAT_FACTS_TABLE)\
+                .select('id, fact, created_at, likes_count')\
+                .eq('is_active', True)\
+                .gt('likes_count', 0)\
+                .order('likes_count', desc=True)\
+                .order('id')\
+                .limit(limit)\
+                .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error fetching top liked facts: %s", e)
+            raise DatabaseException(f"Failed to fetch top liked facts: {e}")
+    
+    @traced("db")
+    def get_facts_by_ids(self, fact_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get the active facts among ``fact_ids`` in a single query (unordered)"""
+        if not fact_ids:
+            return []
+        try:
+            result = self.client.table(CAT_FACTS_TABLE)\
+                .select('id, fact, created_at, likes_count')\
+                .in_('id', fact_ids)\
+                .eq('is_active', True)\
+                .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error fetching %d facts by ID: %s", len(fact_ids), e)
+            raise DatabaseException(f"Failed to fetch facts by ID: {e}")
+    
+    @traced("db")
     def delete_fact(self, fact_id: str) -> Dict[str, Any]:
         """Soft delete a fact (set is_active to False)"""
         try:
+            # updated_at is stamped by the cat_facts_set_updated_at trigger
             result = self.client.table(CAT_FACTS_TABLE)\
-                .update({'is_active': False, 'updated_at': datetime.utcnow().isoformat()})\
+                .update({'is_active': False})\
                 .eq('id', fact_id)\
                 .execute()
             
             if result.data:
-                logger.info(f"Successfully deleted fact: {fact_id}")
+                logger.info("Successfully deleted fact: %s", fact_id)
                 return {
                     "success": True,
                     "message": SUCCESS_MESSAGES["fact_deleted"]
                 }
             else:
-                logger.warning(f"Attempted to delete non-existent fact: {fact_id}")
+                logger.warning("Attempted to delete non-existent fact: %s", fact_id)
                 return {
                     "success": False,
                     "message": ERROR_MESSAGES["fact_not_found"]
                 }
                 
         except Exception as e:
-            logger.error(f"Error deleting fact {fact_id}: {e}")
+            logger.error("Error deleting fact %s: %s", fact_id, e)
             return {
                 "success": False,
                 "message": f"Error deleting fact: {str(e)}"
             }
     
     # User Authentication Methods
-    def _hash_password(self, password: str) -> str:
-        """Hash a password using SHA-256 with salt."""
-        salt = secrets.token_hex(16)
-        hash_obj = hashlib.sha256()
-        hash_obj.update((password + salt).encode('utf-8'))
-        return f"{salt}${hash_obj.hexdigest()}"
+    @staticmethod
+    def _unique_violation_column(error: Exception) -> Optional[str]:
+        """Return which users column a unique-violation error is about, if any."""
+        if getattr(error, 'code', None) != '23505' and 'duplicate key' not in str(error):
+            return None
+        text = " ".join(str(part) for part in (
+            getattr(error, 'message', ''), getattr(error, 'details', ''), error
+        ))
+        # Match the constraint/column names rather than user-supplied values
+        if 'users_username_key' in text or '(username)' in text:
+            return 'username'
+        if 'users_email_key' in text or '(email)' in text:
+            return 'email'
+        return None
     
-    def _verify_password(self, password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash."""
-        try:
-            salt, hash_value = hashed_password.split('$', 1)
-            hash_obj = hashlib.sha256()
-            hash_obj.update((password + salt).encode('utf-8'))
-            return hash_obj.hexdigest() == hash_value
-        except Exception:
-            return False
+    @staticmethod
+    def _quote_filter_value(value: str) -> str:
+        """Quote a value for use inside a PostgREST or=() filter."""
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
     
-    def create_user(self, username: str, email: str, password: str) -> Dict[str, Any]:
-        """Create a new user in the database."""
+    @traced("db")
+    def create_user(self, username: str, email: str, password_hash: str) -> Dict[str, Any]:
+        """Create a new user with a single insert, relying on unique constraints for duplicates."""
         try:
-            # Check if username already exists
-            existing_username = self.client.table(USERS_TABLE).select('id').eq('username', username).execute()
-            if existing_username.data:
-                return {
-                    "success": False,
-                    "message": "Username already exists",
-                    "status": "duplicate_username"
-                }
-            
-            # Check if email already exists
-            existing_email = self.client.table(USERS_TABLE).select('id').eq('email', email.lower()).execute()
-            if existing_email.data:
-                return {
-                    "success": False,
-                    "message": "Email already exists",
-                    "status": "duplicate_email"
-                }
-            
-            # Hash password
-            hashed_password = self._hash_password(password)
-            
-            # Insert new user
             result = self.client.table(USERS_TABLE).insert({
                 'username': username,
                 'email': email.lower(),
-                'password_hash': hashed_password,
+                'password_hash': password_hash,
                 'auth_provider': 'local'
             }).execute()
             
@@ -353,7 +478,7 @@ class SupabaseCatFactsDB:
                 user_data = result.data[0]
                 # Remove password from response
                 user_data.pop('password_hash', None)
-                logger.info(f"Successfully created user: {username}")
+                logger.info("Successfully created user: %s", username)
                 return {
                     "success": True,
                     "message": "User created successfully",
@@ -369,55 +494,86 @@ class SupabaseCatFactsDB:
                 }
                 
         except Exception as e:
-            logger.error(f"Database error while creating user: {e}")
-            return {
-                "success": False,
-                "message": f"Database error: {str(e)}",
-                "status": "error"
-            }
-    
-    def authenticate_user(self, username: str, password: str) -> Dict[str, Any]:
-        """Authenticate a user with username/email and password."""
-        try:
-            # Try to find user by username or email
-            # First try username
-            result = self.client.table(USERS_TABLE).select('*').eq('username', username).execute()
-            
-            # If not found by username, try email
-            if not result.data:
-                result = self.client.table(USERS_TABLE).select('*').eq('email', username.lower()).execute()
-            
-            if not result.data:
+            duplicate = self._unique_violation_column(e)
+            if duplicate == 'username':
                 return {
                     "success": False,
-                    "message": "Invalid username or password",
-                    "status": "invalid_credentials"
+                    "message": "Username already exists",
+                    "status": "duplicate_username"
                 }
-            
-            user = result.data[0]
-            
-            # Verify password
-            if not self._verify_password(password, user['password_hash']):
+            if duplicate == 'email':
                 return {
                     "success": False,
-                    "message": "Invalid username or password",
-                    "status": "invalid_credentials"
+                    "message": "Email already exists",
+                    "status": "duplicate_email"
                 }
-            
-            # Remove password from response
-            user.pop('password_hash', None)
-            logger.info(f"Successfully authenticated user: {user['username']}")
-            return {
-                "success": True,
-                "message": "Authentication successful",
-                "status": "success",
-                "data": user
-            }
-                
-        except Exception as e:
-            logger.error(f"Database error while authenticating user: {e}")
+            logger.error("Database error while creating user: %s", e)
             return {
                 "success": False,
                 "message": f"Database error: {str(e)}",
                 "status": "error"
-            }
\ No newline at end of file
+            }
+    
+    @traced("db")
+    def get_user_for_login(self, username: str) -> Optional[Dict[str, Any]]:
+        """Get a user row, including its password hash, by username or email in one query."""
+        try:
+            # Emails are stored lowercased, so both branches are plain unique-index lookups
+            result = self.client.table(USERS_TABLE)\
+                .select('id, username, email, auth_provider, password_hash')\
+                .or_(
+                    f"username.eq.{self._quote_filter_value(username)},"
+                    f"email.eq.{self._quote_filter_value(username.lower())}"
+                )\
+                .limit(2)\
+                .execute()
+            
+            rows = result.data or []
+            # A username match wins over someone else's email that happens to look the same
+            for row in rows:
+                if row['username'] == username:
+                    return row
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error("Database error while looking up user: %s", e)
+            raise DatabaseException(f"Failed to look up user: {e}")
+    
+    @traced("db")
+    def update_password_hash(self, user_id: str, password_hash: str) -> bool:
+        """Replace a user's stored password hash."""
+        try:
+            result = self.client.table(USERS_TABLE)\
+                .update({'password_hash': password_hash})\
+                .eq('id', user_id)\
+                .execute()
+            return bool(result.data)
+        except Exception as e:
+            logger.error("Database error while updating password hash for %s: %s", user_id, e)
+            return False
+
+    
+    @traced("db")
+    def get_revoked_token_ids(self) -> List[str]:
+        """Get the IDs of revoked access tokens that have not expired yet."""
+        try:
+            result = self.client.table(REVOKED_TOKENS_TABLE)\
+                .select('jti')\
+                .gt('expires_at', datetime.utcnow().isoformat())\
+                .execute()
+            return [row['jti'] for row in result.data or []]
+        except Exception as e:
+            logger.error("Error fetching revoked tokens: %s", e)
+            raise DatabaseException(f"Failed to fetch revoked tokens: {e}")
+    
+    @traced("db")
+    def revoke_token(self, jti: str, expires_at: datetime) -> bool:
+        """Record a revoked access token until it would have expired."""
+        try:
+            result = self.client.table(REVOKED_TOKENS_TABLE).upsert({
+                'jti': jti,
+                'expires_at': expires_at.isoformat()
+            }).execute()
+            return bool(result.data)
+        except Exception as e:
+            logger.error("Error revoking token %s: %s", jti, e)
+            return False
\ No newline at end of file
@@ -15,18 +15,42 @@ CREATE TABLE IF NOT EXISTS cat_facts (
 CREATE TABLE IF NOT EXISTS fact_likes (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
     fact_id UUID REFERENCES cat_facts(id) ON DELETE CASCADE,
-    user_id UUID, -- Will be used when you add authentication
+    user_id UUID, -- Authenticated user (JWT sub); one like per user per fact
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     UNIQUE(fact_id, user_id)
 );
 
--- Enable Row Level Security on both tables
+-- Create users table (emails are stored lowercased so login can use a plain index lookup)
+CREATE TABLE IF NOT EXISTS users (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    username TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password_hash TEXT,
+    auth_provider TEXT DEFAULT 'local',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    CONSTRAINT users_username_key UNIQUE (username),
+    CONSTRAINT users_email_key UNIQUE (email),
+    CONSTRAINT users_email_lowercase CHECK (email = lower(email))
+);
+
+-- Create revoked_tokens table (signed access tokens revoked before expiry)
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Enable Row Level Security on all tables
 ALTER TABLE cat_facts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE fact_likes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE users ENABLE ROW LEVEL SECURITY;
+ALTER TABLE revoked_tokens ENABLE ROW LEVEL SECURITY;
 
 -- Create policies to allow all operations for now (you can restrict this later)
 CREATE POLICY "Allow all operations on cat_facts" ON cat_facts FOR ALL USING (true);
 CREATE POLICY "Allow all operations on fact_likes" ON fact_likes FOR ALL USING (true);
+CREATE POLICY "Allow all operations on users" ON users FOR ALL USING (true);
+CREATE POLICY "Allow all operations on revoked_tokens" ON revoked_tokens FOR ALL USING (true);
 
 -- Create function to update likes_count automatically
 CREATE OR REPLACE FUNCTION update_likes_count()
@@ -49,6 +73,21 @@ CREATE TRIGGER update_likes_count_trigger
     AFTER INSERT OR DELETE ON fact_likes
     FOR EACH ROW EXECUTE FUNCTION update_likes_count();
 
+-- Keep cat_facts.updated_at current on every update (including the likes_count
+-- updates above) so readers can sync incrementally from an updated_at watermark
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cat_facts_set_updated_at ON cat_facts;
+CREATE TRIGGER cat_facts_set_updated_at
+    BEFORE UPDATE ON cat_facts
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
 -- Create function to get random fact (for better performance)
 CREATE OR REPLACE FUNCTION get_random_fact()
 RETURNS TABLE (
@@ -70,8 +109,19 @@ $$ LANGUAGE plpgsql;
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_cat_facts_active ON cat_facts(is_active);
 CREATE INDEX IF NOT EXISTS idx_cat_facts_created_at ON cat_facts(created_at DESC);
+-- Change feed: (updated_at, id) keyset pagination, soft-deleted rows included
+CREATE INDEX IF NOT EXISTS idx_cat_facts_updated_at ON cat_facts(updated_at, id);
+-- Top-liked leaderboard reconcile: ORDER BY likes_count DESC, id over active facts
+CREATE INDEX IF NOT EXISTS idx_cat_facts_top_liked ON cat_facts(likes_count DESC, id) WHERE is_active = TRUE;
 CREATE INDEX IF NOT EXISTS idx_fact_likes_fact_id ON fact_likes(fact_id);
 CREATE INDEX IF NOT EXISTS idx_fact_likes_user_id ON fact_likes(user_id);
+-- Trending: like insert stream, keyset-paged by (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_fact_likes_created_at ON fact_likes(created_at, id);
+-- users_username_key and users_email_key back the single "username OR email" login
+-- lookup (BitmapOr over two unique indexes); this one guards databases created
+-- before emails were normalized and keeps case-insensitive email lookups indexed
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email));
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
 
 -- Insert some sample cat facts
 INSERT INTO cat_facts (fact) VALUES
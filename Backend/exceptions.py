@@ -40,4 +40,13 @@ class FactNotFoundException(CatFactsException):
 
 class DuplicateFactException(CatFactsException):
     """Exception raised when trying to add a duplicate fact."""
-    pass 
\ No newline at end of file
+    pass 
+
+class ServiceOverloadedException(CatFactsException):
+    """Exception raised when a bounded resource has no capacity left."""
+    pass
+
+
+class AuthenticationException(CatFactsException):
+    """Exception raised when an access token is missing or invalid."""
+    pass
@@ -0,0 +1,118 @@
+"""
+Shared outbound HTTP connection pools.
+
+Every outbound integration (Supabase, OpenAI, the external cat facts API) gets
+one long-lived ``httpx.Client`` per upstream host, so keep-alive connections
+and TLS sessions are reused across requests instead of being rebuilt on hot
+paths. Pool sizes and timeouts come from ``config``; HTTP/2 is used when the
+``h2`` package is installed. Each client sends through a
+``resilience.ResilientTransport`` (request deadlines, retries for idempotent
+reads, and a circuit breaker per upstream).
+"""
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import resilience
+from config import config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HTTPClientPool:
+    """Registry of shared ``httpx.Client`` instances, one per upstream."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.Client] = {}
+        self._warm_up_urls: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=config.HTTP_CONNECT_TIMEOUT,
+            read=config.HTTP_READ_TIMEOUT,
+            write=config.HTTP_READ_TIMEOUT,
+            pool=config.HTTP_POOL_TIMEOUT
+        )
+
+    def get(
+        self,
+        name: str,
+        base_url: str = "",
+        headers: Optional[dict] = None,
+        warm_up_url: Optional[str] = None
+    ) -> httpx.Client:
+        """Get (creating on first use) the shared client for an upstream."""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                max_connections = config.get_http_pool_limits().get(name, config.HTTP_MAX_CONNECTIONS)
+                transport = httpx.HTTPTransport(
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+                    ),
+                    http2=config.HTTP2_ENABLED and HTTP2_AVAILABLE
+                )
+                client = httpx.Client(
+                    base_url=base_url,
+                    headers=headers,
+                    timeout=self.timeout,
+                    transport=resilience.ResilientTransport(
+                        transport,
+                        resilience.breaker(
+                            name,
+                            failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+                            reset_seconds=config.BREAKER_RESET_SECONDS
+                        ),
+                        resilience.RetryPolicy(
+                            max_attempts=config.RETRY_MAX_ATTEMPTS,
+                            base_delay=config.RETRY_BASE_DELAY_SECONDS,
+                            max_delay=config.RETRY_MAX_DELAY_SECONDS
+                        )
+                    )
+                )
+                self._clients[name] = client
+                if warm_up_url or base_url:
+                    self._warm_up_urls[name] = warm_up_url or base_url
+                logger.info(f"Created shared HTTP pool '{name}' (max_connections={max_connections})")
+        return client
+
+    def warm_up(self):
+        """Open one connection per upstream so the first real request skips the TLS handshake."""
+        for name, url in list(self._warm_up_urls.items()):
+            parts = urlsplit(url)
+            origin = f"{parts.scheme}://{parts.netloc}/"
+            try:
+                # Any response (even 404/401) leaves a warm keep-alive connection behind
+                self._clients[name].head(origin)
+                logger.info(f"Warmed up HTTP pool '{name}'")
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to warm up HTTP pool '{name}': {e}")
+
+    def close(self):
+        """Close every shared client."""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._warm_up_urls.clear()
+
+
+# Global pool registry
+http_clients = HTTPClientPool()
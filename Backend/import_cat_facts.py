@@ -1,4 +1,4 @@
-import requests
+import httpx
 import time
 import logging
 import os
@@ -15,6 +15,8 @@ else:
     print("Make sure you have a .env file with SUPABASE_URL and SUPABASE_ANON_KEY")
 
 from database.supabase_db import SupabaseCatFactsDB
+from http_client import http_clients
+import resilience
 from constants import (
     CAT_FACTS_API_URL, 
     CAT_FACTS_API_DELAY, 
@@ -29,25 +31,26 @@ logger = logging.getLogger(__name__)
 def fetch_cat_fact():
     """Fetch a single cat fact from the API"""
     try:
-        response = requests.get(CAT_FACTS_API_URL)
+        response = http_clients.get("catfacts", warm_up_url=CAT_FACTS_API_URL).get(CAT_FACTS_API_URL)
         response.raise_for_status()
         data = response.json()
         fact = data.get("fact")
         logger.debug(f"Fetched fact from external API: {fact[:50]}...")
         return fact
-    except requests.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         logger.error(f"Error fetching cat fact from {CAT_FACTS_API_URL}: {e}")
         raise ExternalAPIException(f"Failed to fetch cat fact: {e}")
 
-def import_cat_facts(num_facts=VALIDATION_RULES["default_import_facts"]):
-    """Import cat facts from the API into the database"""
-    try:
-        db = SupabaseCatFactsDB()
-        logger.info(SUCCESS_MESSAGES["database_connected"])
-    except Exception as e:
-        logger.error(f"Error connecting to Supabase: {e}")
-        logger.error("Please make sure your SUPABASE_URL and SUPABASE_ANON_KEY are set in your .env file")
-        raise DatabaseException(f"Failed to connect to database: {e}")
+def import_cat_facts(num_facts=VALIDATION_RULES["default_import_facts"], db: SupabaseCatFactsDB = None):
+    """Import cat facts from the API into the database, reusing ``db`` when given"""
+    if db is None:
+        try:
+            db = SupabaseCatFactsDB()
+            logger.info(SUCCESS_MESSAGES["database_connected"])
+        except Exception as e:
+            logger.error(f"Error connecting to Supabase: {e}")
+            logger.error("Please make sure your SUPABASE_URL and SUPABASE_ANON_KEY are set in your .env file")
+            raise DatabaseException(f"Failed to connect to database: {e}")
     
     logger.info(f"Fetching {num_facts} cat facts from {CAT_FACTS_API_URL}...")
     print("-" * 50)
@@ -57,9 +60,9 @@ def import_cat_facts(num_facts=VALIDATION_RULES["default_import_facts"]):
     max_attempts = num_facts * 3  # Allow some retries for duplicates
     
     while facts_imported < num_facts and attempts < max_attempts:
+        attempts += 1
         try:
             fact = fetch_cat_fact()
-            attempts += 1
             
             # Try to insert the fact
             result = db.insert_fact(fact)
@@ -73,6 +76,10 @@ def import_cat_facts(num_facts=VALIDATION_RULES["default_import_facts"]):
             time.sleep(CAT_FACTS_API_DELAY)
             
         except ExternalAPIException as e:
+            left = resilience.remaining()
+            if left is not None and left <= 1:
+                logger.error(f"Attempt {attempts}: Failed to fetch fact, out of time: {e}")
+                break
             logger.error(f"Attempt {attempts}: Failed to fetch fact, retrying... Error: {e}")
             time.sleep(1)
             continue
@@ -0,0 +1,356 @@
+"""
+Bulk loader for curated fact files.
+
+Streams facts from local CSV or JSONL files of any size through a generator
+pipeline (read -> normalize/validate -> batch) and upserts each batch with one
+INSERT ... ON CONFLICT DO NOTHING, so facts already in the database are
+skipped rather than failing the batch. Up to ``--writers`` batches are in
+flight at once; reading pauses while they are all busy, so memory stays flat.
+
+Progress is checkpointed to a JSON file as the byte offset up to which every
+batch has been written. An interrupted run started again with the same
+arguments resumes from there. Batches that were in flight when it stopped are
+sent again, which is harmless because the upsert ignores existing facts.
+
+CSV files need a header row containing ``--column``. JSONL lines may be
+objects (the fact is read from ``--column``) or bare JSON strings.
+
+Usage: python load_facts.py FILE [FILE ...] [--batch-size N] [--writers N]
+                            [--checkpoint PATH] [--restart] [--rejects PATH]
+"""
+import argparse
+import csv
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import config
+from constants import VALIDATION_RULES
+from database.supabase_db import SupabaseCatFactsDB
+from exceptions import DatabaseException
+
+logger = logging.getLogger(__name__)
+
+MIN_FACT_LENGTH = VALIDATION_RULES["min_fact_length"]
+MAX_FACT_LENGTH = VALIDATION_RULES["max_fact_length"]
+
+
+class Record:
+    """One input record: its byte range in the file, its fact, or why it was rejected."""
+
+    __slots__ = ("offset", "end_offset", "fact", "reason", "raw")
+
+    def __init__(self, offset: int, end_offset: int, fact: Optional[str] = None,
+                 reason: Optional[str] = None, raw: Any = None):
+        self.offset = offset
+        self.end_offset = end_offset
+        self.fact = fact
+        self.reason = reason
+        self.raw = raw
+
+
+# -- Pipeline stages ----------------------------------------------------------
+
+def _lines(f, position: List[int]) -> Iterator[str]:
+    """Decode a binary file line by line, keeping ``position[0]`` at the end of the last line read."""
+    for raw in f:
+        position[0] += len(raw)
+        yield raw.decode("utf-8", errors="replace")
+
+
+def read_jsonl(f, start: int, column: str) -> Iterator[Record]:
+    position = [start]
+    offset = start
+    for line in _lines(f, position):
+        if line.strip():
+            try:
+                value = json.loads(line)
+            except ValueError:
+                yield Record(offset, position[0], reason="malformed_json", raw=line.rstrip("\n"))
+            else:
+                if isinstance(value, dict):
+                    value = value.get(column)
+                if isinstance(value, str):
+                    yield Record(offset, position[0], fact=value)
+                else:
+                    yield Record(offset, position[0], reason="missing_fact", raw=line.rstrip("\n"))
+        offset = position[0]
+
+
+def read_csv(f, start: int, column: str, header: List[str]) -> Iterator[Record]:
+    try:
+        index = header.index(column)
+    except ValueError:
+        raise SystemExit(f"CSV header has no '{column}' column: {header}")
+    position = [start]
+    # csv.reader pulls exactly the lines of one record (quoted newlines included), so
+    # position is the end of the record just returned
+    offset = start
+    for row in csv.reader(_lines(f, position)):
+        if len(row) > index:
+            yield Record(offset, position[0], fact=row[index])
+        elif row:
+            yield Record(offset, position[0], reason="missing_fact", raw=row)
+        offset = position[0]
+
+
+def read_records(path: str, start: int, column: str) -> Iterator[Record]:
+    """Records from ``path`` starting at byte ``start`` (0, or a checkpointed offset)."""
+    is_csv = path.lower().endswith(".csv")
+    with open(path, "rb") as f:
+        header = None
+        if is_csv:
+            header = next(csv.reader([f.readline().decode("utf-8-sig")]), [])
+            start = max(start, f.tell())
+        f.seek(start)
+        if is_csv:
+            yield from read_csv(f, start, column, header)
+        else:
+            yield from read_jsonl(f, start, column)
+
+
+def normalize(records: Iterator[Record]) -> Iterator[Record]:
+    """Collapse whitespace and apply the same length rules as the API."""
+    for record in records:
+        if record.fact is not None:
+            fact = " ".join(record.fact.split())
+            if not fact:
+                record.reason = "empty"
+            elif len(fact) < MIN_FACT_LENGTH:
+                record.reason = "too_short"
+            elif len(fact) > MAX_FACT_LENGTH:
+                record.reason = "too_long"
+            if record.reason:
+                record.raw, record.fact = record.fact, None
+            else:
+                record.fact = fact
+        yield record
+
+
+def batches(records: Iterator[Record], size: int, on_reject) -> Iterator[Tuple[List[str], int, int]]:
+    """``(facts, records consumed, end offset)`` per batch; rejects go to ``on_reject``."""
+    facts: List[str] = []
+    consumed = 0
+    end_offset = 0
+    for record in records:
+        consumed += 1
+        end_offset = record.end_offset
+        if record.reason:
+            on_reject(record)
+        else:
+            facts.append(record.fact)
+        if len(facts) >= size:
+            yield facts, consumed, end_offset
+            facts, consumed = [], 0
+    if consumed:
+        yield facts, consumed, end_offset
+
+
+# -- Checkpoint ---------------------------------------------------------------
+
+class Checkpoint:
+    """Per-file resume offsets, rewritten atomically."""
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                self.files = json.load(f).get("files", {})
+
+    @staticmethod
+    def _identity(path: str) -> Dict[str, Any]:
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def start_offset(self, path: str) -> Tuple[int, bool]:
+        """``(offset to resume from, whether the file is already done)``."""
+        entry = self.files.get(path)
+        if entry is None:
+            return 0, False
+        if {"size": entry.get("size"), "mtime": entry.get("mtime")} != self._identity(path):
+            logger.warning("%s changed since it was checkpointed; loading it from the start", path)
+            return 0, False
+        return entry["offset"], entry.get("done", False)
+
+    def save(self, path: str, offset: int, done: bool = False):
+        self.files[path] = {"offset": offset, "done": done, **self._identity(path)}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"files": self.files}, f, indent=2)
+        os.replace(temporary, self.path)
+
+
+# -- Loader -------------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.records = 0
+        self.inserted = 0
+        self.existing = 0
+        self.rejects: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add_batch(self, records: int, sent: int, inserted: int):
+        with self._lock:
+            self.records += records
+            self.inserted += inserted
+            self.existing += sent - inserted
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (
+            f"{self.records:,} records in {elapsed:,.1f}s ({self.records / elapsed:,.0f}/s), "
+            f"{self.inserted:,} inserted ({self.inserted / elapsed:,.0f}/s), "
+            f"{self.existing:,} already present, {sum(self.rejects.values()):,} rejected"
+        )
+
+
+class BulkLoader:
+    """Feeds batches to a pool of writers and advances the checkpoint in file order."""
+
+    def __init__(self, db: SupabaseCatFactsDB, checkpoint: Checkpoint, batch_size: int, writers: int,
+                 retries: int = 5, rejects_file=None, progress_seconds: float = 5.0):
+        self.db = db
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.writers = writers
+        self.retries = retries
+        self.rejects_file = rejects_file
+        self.progress_seconds = progress_seconds
+        self.stats = Stats()
+
+    def _reject(self, path: str, record: Record):
+        self.stats.rejects[record.reason] += 1
+        if self.rejects_file is not None:
+            entry = {"file": path, "offset": record.offset, "reason": record.reason, "raw": record.raw}
+            self.rejects_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _write(self, facts: List[str]) -> int:
+        """Upsert one batch, backing off between attempts (safe: existing facts are ignored)."""
+        for attempt in range(1, self.retries + 1):
+            try:
+                return self.db.upsert_facts(facts) if facts else 0
+            except DatabaseException as e:
+                if attempt == self.retries:
+                    raise
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+                logger.warning("Batch of %d failed (attempt %d), retrying in %.1fs: %s",
+                               len(facts), attempt, delay, e)
+                time.sleep(delay)
+
+    def load_file(self, path: str, column: str):
+        start, done = self.checkpoint.start_offset(path)
+        if done:
+            print(f"{path}: already loaded, skipping (use --restart to load it again)")
+            return
+        if start:
+            print(f"{path}: resuming at byte {start:,}")
+
+        pending = {}
+        finished: Dict[int, int] = {}
+        next_to_commit = 0
+        last_progress = time.monotonic()
+        records = normalize(read_records(path, start, column))
+
+        with ThreadPoolExecutor(max_workers=self.writers, thread_name_prefix="loader") as pool:
+            def drain(block: bool):
+                nonlocal next_to_commit
+                completed, _ = wait(list(pending), return_when=FIRST_COMPLETED, timeout=None if block else 0)
+                for future in completed:
+                    sequence, consumed, sent, end_offset = pending.pop(future)
+                    self.stats.add_batch(consumed, sent, future.result())
+                    finished[sequence] = end_offset
+                # Only advance past batches whose predecessors are all written
+                offset = None
+                while next_to_commit in finished:
+                    offset = finished.pop(next_to_commit)
+                    next_to_commit += 1
+                if offset is not None:
+                    self.checkpoint.save(path, offset)
+
+            try:
+                on_reject = functools.partial(self._reject, path)
+                for sequence, (facts, consumed, end_offset) in enumerate(
+                    batches(records, self.batch_size, on_reject)
+                ):
+                    while len(pending) >= self.writers * 2:
+                        drain(block=True)
+                    pending[pool.submit(self._write, facts)] = (sequence, consumed, len(facts), end_offset)
+                    drain(block=False)
+                    if time.monotonic() - last_progress >= self.progress_seconds:
+                        print(self.stats.line(), flush=True)
+                        last_progress = time.monotonic()
+                while pending:
+                    drain(block=True)
+            except BaseException:
+                # Let in-flight batches finish so the checkpoint covers as much as possible
+                for future in list(pending):
+                    future.cancel()
+                while pending:
+                    try:
+                        drain(block=True)
+                    except Exception:
+                        break
+                raise
+        self.checkpoint.save(path, os.path.getsize(path), done=True)
+
+    def report(self):
+        print(self.stats.line())
+        if self.stats.rejects:
+            print("Rejected records by reason:")
+            for reason, count in self.stats.rejects.most_common():
+                print(f"  {reason:<16} {count:,}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="+", help="CSV (.csv) or JSONL files to load")
+    parser.add_argument("--column", default="fact", help="CSV column / JSON key holding the fact")
+    parser.add_argument("--batch-size", type=int, default=config.LOADER_BATCH_SIZE, help="Facts per upsert")
+    parser.add_argument("--writers", type=int, default=config.LOADER_WRITERS, help="Parallel upserts")
+    parser.add_argument("--checkpoint", default=config.LOADER_CHECKPOINT_PATH, help="Resume state file")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and load from the start")
+    parser.add_argument("--rejects", help="Write rejected records to this JSONL file")
+    args = parser.parse_args()
+    config.setup_logging()
+
+    rejects_file = open(args.rejects, "a", encoding="utf-8") if args.rejects else None
+    loader = BulkLoader(
+        SupabaseCatFactsDB(),
+        Checkpoint(args.checkpoint, restart=args.restart),
+        batch_size=max(1, args.batch_size),
+        writers=max(1, args.writers),
+        rejects_file=rejects_file
+    )
+    try:
+        for path in args.files:
+            loader.load_file(os.path.abspath(path), args.column)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
+    except DatabaseException as e:
+        print(f"Giving up after repeated database errors: {e}", file=sys.stderr)
+        print("Run the same command again to resume", file=sys.stderr)
+        return 1
+    finally:
+        loader.report()
+        if rejects_file is not None:
+            rejects_file.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
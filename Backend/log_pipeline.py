@@ -0,0 +1,169 @@
+"""
+Non-blocking structured logging.
+
+Request-path code only builds a ``LogRecord`` and puts it on an in-process
+queue; formatting (``msg % args``), JSON encoding and the actual writes
+happen on a ``QueueListener`` thread. The stock ``QueueHandler`` formats the
+message before enqueueing, which would keep that cost on the caller, so
+``DeferredQueueHandler`` enqueues the record untouched.
+
+High-volume success logs can be sampled per logger: ``LOG_SAMPLE_RATES``
+maps logger names (or package prefixes) to the fraction of INFO/DEBUG
+records kept. Warnings and errors are never sampled. Kept records carry
+their ``sample_rate`` so aggregators can re-weight counts.
+
+Use ``%``-style arguments (``logger.info("Retrieved %d facts", n)``), not
+f-strings, so disabled levels and sampled-out records never format anything.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_UNKNOWN_CALLER = ("(unknown file)", 0, "(unknown function)", None)
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse ``"name=rate,name=rate"`` into a dict (bad entries are ignored)."""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra=`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+def _resolve_rate(name: str, rates: Dict[str, float]) -> float:
+    """The rate for ``name`` or its nearest configured ancestor package."""
+    while name:
+        if name in rates:
+            return rates[name]
+        name = name.rpartition(".")[0]
+    return 1.0
+
+
+class PipelineLogger(logging.Logger):
+    """Logger class installed by ``setup``.
+
+    Keeps only ``sample_rate`` of its INFO and DEBUG calls, deciding in
+    ``isEnabledFor`` before a ``LogRecord`` is built, so a sampled-out call
+    costs about as much as a disabled level. It also skips the caller lookup
+    (a stack walk per record), since neither output format prints file or line.
+    """
+
+    rates: Dict[str, float] = {}
+
+    def __init__(self, name: str, level: int = logging.NOTSET):
+        super().__init__(name, level)
+        self.sample_rate = _resolve_rate(name, self.rates)
+
+    def isEnabledFor(self, level: int) -> bool:
+        if level <= logging.INFO and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        return logging.Logger.isEnabledFor(self, level)
+
+    def findCaller(self, stack_info: bool = False, stacklevel: int = 1):
+        if stack_info:
+            return super().findCaller(stack_info, stacklevel + 1)
+        return _UNKNOWN_CALLER
+
+    def makeRecord(self, *args, **kwargs) -> logging.LogRecord:
+        record = super().makeRecord(*args, **kwargs)
+        if self.sample_rate < 1.0 and record.levelno <= logging.INFO:
+            record.sample_rate = self.sample_rate
+        return record
+
+
+def _install_logger_class(rates: Dict[str, float]):
+    """Make every logger, existing and future, a ``PipelineLogger`` with its configured rate."""
+    PipelineLogger.rates = rates
+    logging.setLoggerClass(PipelineLogger)
+    for name, existing in list(logging.root.manager.loggerDict.items()):
+        if type(existing) is logging.Logger:
+            # Module loggers are created at import time, before logging is configured
+            existing.__class__ = PipelineLogger
+        if isinstance(existing, PipelineLogger):
+            existing.sample_rate = _resolve_rate(name, rates)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Enqueues records as-is, leaving all formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put_nowait(record)
+
+
+def setup(level: str, handlers: List[logging.Handler], json_output: bool = True, text_format: str = None,
+          sample_rates: Dict[str, float] = None):
+    """Route the root logger through a background queue listener (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+    formatter = JsonFormatter() if json_output else logging.Formatter(text_format)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    _install_logger_class(sample_rates or {})
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level.upper()))
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued on normal interpreter exit
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """Stop the listener thread after draining the queue."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def default_handlers(log_file: Optional[str] = None) -> List[logging.Handler]:
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    return handlers
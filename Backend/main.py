@@ -1,33 +1,61 @@
 """
 Main FastAPI application for the Cat Facts API.
 """
+import asyncio
+import hmac
 import logging
-from fastapi import FastAPI, Form, HTTPException, Depends
+from fastapi import FastAPI, Form, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi import status
-from typing import List
+from typing import Any, Dict, List, Optional
 
 # Import our modules
 from config import config
+from http_client import http_clients
 from database.supabase_db import SupabaseCatFactsDB
-from services import CatFactsService, AIService
+from middleware import (
+    ProfilingMiddleware, RateLimitMiddleware, ResilienceMiddleware, RouteGroup, TokenBucketLimiter,
+    TracedRoute, TracingMiddleware
+)
+from middleware.rate_limiter import client_ip, parse_limit
+from profiler import SamplingProfiler
+import resilience
+import tracing
+from services import CatFactsService, AIService, AuthService, PasswordHashingService, TokenService, HealthService
+from services.ai_stream import AnswerStream
+from services.fact_catalog import FactCatalog
+from services.fact_events import FactEventBroadcaster
+from services.faq_store import FAQStore
+from services.shared_catalog import SharedFactCatalog
+from services.token_service import extract_bearer_token
+from services.usage_meter import UsageMeter, seconds_until_reset, today
 from Models import (
     CatFactResponse,
     CatFactListResponse,
+    CatFactBatchRequest,
+    CatFactBatchResponse,
+    TrendingFactsResponse,
     CatFactCreateRequest,
     CatFactCreateResponse,
     CatFactLikeResponse,
     CatFactDeleteResponse,
     HealthCheckResponse,
+    LivenessResponse,
+    ReadinessResponse,
     AIRequest,
+    AIAnswerStatsResponse,
+    AIUsageResponse,
+    UserUsageResponse,
     ErrorResponse,
     SuccessResponse,
     ImportFactsRequest,
     ImportFactsResponse,
     UserSignupRequest,
     UserLoginRequest,
-    AuthResponse
+    AuthResponse,
+    ProfilerArmRequest,
+    ProfilerStatusResponse
 )
 from exceptions import (
     CatFactsException,
@@ -37,7 +65,9 @@ from exceptions import (
     ConfigurationException,
     ExternalAPIException,
     FactNotFoundException,
-    DuplicateFactException
+    DuplicateFactException,
+    ServiceOverloadedException,
+    AuthenticationException
 )
 
 # Setup logging
@@ -52,6 +82,49 @@ app = FastAPI(
     docs_url="/docs" if config.DEBUG else None,
     redoc_url="/redoc" if config.DEBUG else None
 )
+# Time endpoint bodies separately from parsing/serialization for Server-Timing
+app.router.route_class = TracedRoute
+
+# Route groups share one token-bucket limiter each; first match wins
+RATE_LIMIT_ROUTES = {
+    "likes": (r"^/catfacts/[^/]+/like$", ["POST", "DELETE"]),
+    "ai": (r"^/api/ask-ai$", ["POST"]),
+    "catfacts": (r"^/catfacts", ["GET", "POST", "DELETE"]),
+}
+
+
+def rate_limit_key(scope) -> str:
+    """Rate limit authenticated users by user ID and everyone else by IP."""
+    if token_service is not None:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                token = extract_bearer_token(value.decode("latin-1"))
+                if token:
+                    try:
+                        return f"user:{token_service.verify(token)['sub']}"
+                    except AuthenticationException:
+                        pass
+                break
+    return f"ip:{client_ip(scope, config.RATE_LIMIT_TRUST_FORWARDED)}"
+
+
+# Middleware, in the order added below: each add_middleware call wraps everything added
+# before it, so a request passes through them from the bottom of this list up:
+#   Profiling -> Tracing -> Resilience -> CORS -> RateLimit -> routes
+
+# Rate limiting middleware setup (innermost, inside CORS so 429s still carry CORS headers)
+if config.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        groups=[
+            RouteGroup(name, pattern, methods, TokenBucketLimiter(
+                *parse_limit(config.get_rate_limits()[name]),
+                max_keys=config.RATE_LIMIT_MAX_CLIENTS
+            ))
+            for name, (pattern, methods) in RATE_LIMIT_ROUTES.items()
+        ],
+        key_func=rate_limit_key
+    )
 
 # CORS middleware setup
 app.add_middleware(
@@ -59,9 +132,42 @@ app.add_middleware(
     **config.get_cors_config()
 )
 
+# Deadline budgets for outbound calls, plus staleness headers on last-known-good responses
+app.add_middleware(
+    ResilienceMiddleware,
+    default_seconds=config.REQUEST_DEADLINE_SECONDS,
+    route_seconds=config.get_request_deadlines()
+)
+
+# Tracing middleware setup (inside the profiler, outside everything else it times)
+app.add_middleware(
+    TracingMiddleware,
+    sample_rate=config.TRACE_SAMPLE_RATE,
+    server_timing=config.TRACE_SERVER_TIMING
+)
+
+# On-demand profiler; idle until an admin arms it (added last so it is outermost and sees whole requests)
+profiler = SamplingProfiler(
+    config.PROFILER_OUTPUT_DIR,
+    interval=config.PROFILER_INTERVAL_MS / 1000,
+    max_seconds=config.PROFILER_MAX_SECONDS,
+    max_requests=config.PROFILER_MAX_REQUESTS
+)
+app.add_middleware(
+    ProfilingMiddleware,
+    profiler=profiler,
+    admin_key=config.ADMIN_API_KEY
+)
+
 # Global service instances
 cat_facts_service: CatFactsService = None
 ai_service: AIService = None
+auth_service: AuthService = None
+token_service: TokenService = None
+usage_meter: UsageMeter = None
+background_tasks: List[asyncio.Task] = []
+health_service = HealthService()
+fact_events = FactEventBroadcaster()
 
 
 def get_cat_facts_service() -> CatFactsService:
@@ -74,6 +180,72 @@ def get_cat_facts_service() -> CatFactsService:
     return cat_facts_service
 
 
+def get_auth_service() -> AuthService:
+    """Dependency to get auth service."""
+    if auth_service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Auth service not initialized"
+        )
+    return auth_service
+
+
+def _verify_bearer(authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Claims of the bearer token in ``authorization``; ``None`` without one.
+
+    Raises ``AuthenticationException`` for an expired, revoked or malformed token.
+    """
+    token = extract_bearer_token(authorization)
+    if token is None or token_service is None:
+        return None
+    return token_service.verify(token)
+
+
+def get_optional_user(authorization: Optional[str] = Header(None)) -> Optional[Dict[str, Any]]:
+    """Dependency returning the token claims of the caller, if authenticated.
+
+    A bad token is treated as no token, so a stale session left in the browser
+    still gets the anonymous response instead of a 401.
+    """
+    try:
+        return _verify_bearer(authorization)
+    except AuthenticationException as e:
+        logger.info("Ignoring invalid bearer token on an optional-auth route: %s", e)
+        return None
+
+
+def get_current_user(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Dependency requiring a valid access token; verified locally without the database."""
+    try:
+        user = _verify_bearer(authorization)
+    except AuthenticationException as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return user
+
+
+def user_id(user: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The caller's user ID from verified token claims, if any."""
+    return user["sub"] if user else None
+
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Dependency guarding admin endpoints; they do not exist unless ADMIN_API_KEY is set."""
+    if not config.ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_key is None or not hmac.compare_digest(x_admin_key.encode(), config.ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key")
+
+
 def get_ai_service() -> AIService:
     """Dependency to get AI service."""
     if ai_service is None:
@@ -84,32 +256,117 @@ def get_ai_service() -> AIService:
     return ai_service
 
 
+def get_usage_meter() -> UsageMeter:
+    """Dependency to get the AI token usage meter."""
+    if usage_meter is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI usage metering not enabled"
+        )
+    return usage_meter
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
-    global cat_facts_service, ai_service
+    global cat_facts_service, ai_service, auth_service, token_service, usage_meter
     
     try:
         # Validate configuration
         if not config.validate():
             logger.error("Configuration validation failed")
+            health_service.mark_failed("configuration_invalid")
             return
         
+        # Sampled traces go to a file or an OTLP collector from a background thread
+        tracing.configure_exporter(
+            config.TRACE_EXPORTER,
+            service_name=config.TRACE_SERVICE_NAME,
+            file_path=config.TRACE_FILE_PATH,
+            otlp_endpoint=config.TRACE_OTLP_ENDPOINT,
+            batch_size=config.TRACE_EXPORT_BATCH_SIZE,
+            interval=config.TRACE_EXPORT_INTERVAL_SECONDS
+        )
+        background_tasks.append(asyncio.create_task(tracing.run_loop_lag_monitor()))
+        
         # Initialize database and services
         db = SupabaseCatFactsDB()
-        cat_facts_service = CatFactsService(db)
+        # Pre-forked workers share one memory-mapped catalog instead of one copy each
+        catalog = SharedFactCatalog() if config.WEB_CONCURRENCY > 1 else FactCatalog()
+        cat_facts_service = CatFactsService(db, catalog)
+        
+        # Password hashing runs in a process pool tuned to the target latency
+        hashing = PasswordHashingService()
+        await hashing.calibrate()
+        
+        # Access tokens are verified locally; only revocations come from the database
+        token_service = TokenService(revocation_loader=db.get_revoked_token_ids)
+        background_tasks.append(asyncio.create_task(token_service.run_revocation_refresh()))
+        auth_service = AuthService(db, hashing, token_service)
         
         # Initialize AI service if API key is available
         if config.OPENAI_API_KEY:
-            ai_service = AIService()
+            # Token counters live in memory; a background task batches them to the shared
+            # store and reads back other workers' usage, so quota checks never do I/O
+            if config.AI_USAGE_STORE_PATH:
+                usage_meter = UsageMeter(
+                    config.AI_USAGE_STORE_PATH,
+                    daily_quota=config.AI_USER_DAILY_TOKEN_QUOTA,
+                    retention_days=config.AI_USAGE_RETENTION_DAYS
+                )
+                await asyncio.to_thread(usage_meter.flush)
+                background_tasks.append(asyncio.create_task(usage_meter.run_flusher(config.AI_USAGE_FLUSH_SECONDS)))
+            # Precomputed FAQ answers and questions the fact catalog already answers
+            # skip the OpenAI round trip
+            faq_store = FAQStore(config.FAQ_STORE_PATH, config.FAQ_RELOAD_SECONDS) if config.FAQ_STORE_PATH else None
+            ai_service = AIService(retriever=cat_facts_service.search_facts, faq_store=faq_store, meter=usage_meter)
             logger.info("AI service initialized successfully")
         else:
             logger.warning("OpenAI API key not set - AI features will be disabled")
         
+        # Readiness probes are cached so orchestrator polling never hammers dependencies
+        health_service.add_probe("database", db.ping, config.READINESS_CACHE_SECONDS)
+        health_service.add_probe("catalog", cat_facts_service.ensure_warm, config.READINESS_CACHE_SECONDS)
+        if ai_service is not None:
+            health_service.add_probe(
+                "ai_service", ai_service.ping, config.READINESS_AI_CACHE_SECONDS, required=False
+            )
+        
+        # Warm-up: serve from the on-disk snapshot if there is one and reconcile in the
+        # background, otherwise preload from the database before reporting ready
+        snapshot_path = config.CATALOG_SNAPSHOT_PATH
+        if snapshot_path and cat_facts_service.restore_snapshot(snapshot_path):
+            background_tasks.append(asyncio.create_task(cat_facts_service.reconcile_in_background()))
+        else:
+            try:
+                await asyncio.to_thread(cat_facts_service.warm_up)
+            except Exception as e:
+                logger.warning(f"Catalog warm-up failed, readiness will retry: {e}")
+        # Keep the catalog current from the updated_at change feed instead of full reloads,
+        # and push the same changes to live-update subscribers
+        cat_facts_service.sync.add_listener(fact_events.publish)
+        background_tasks.append(asyncio.create_task(cat_facts_service.sync.run()))
+        try:
+            await asyncio.to_thread(cat_facts_service.reconcile_leaderboard)
+        except Exception as e:
+            logger.warning(f"Leaderboard warm-up failed, it will load on first use: {e}")
+        background_tasks.append(asyncio.create_task(
+            cat_facts_service.run_leaderboard_reconcile(config.LEADERBOARD_RECONCILE_SECONDS)
+        ))
+        # Rebuilds trending scores from like history on its first pass, then follows new likes
+        background_tasks.append(asyncio.create_task(cat_facts_service.trending.run()))
+        if snapshot_path:
+            background_tasks.append(asyncio.create_task(cat_facts_service.run_snapshot_writer(
+                snapshot_path, config.CATALOG_SNAPSHOT_INTERVAL_SECONDS
+            )))
+        await asyncio.to_thread(http_clients.warm_up)
+        health_service.mark_started()
+        
         logger.info("Application startup completed successfully")
         
     except Exception as e:
         logger.error(f"Failed to initialize application: {e}")
+        health_service.mark_failed("initialization_failed")
         raise
 
 
@@ -117,6 +374,22 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown."""
     logger.info("Application shutting down")
+    for task in background_tasks:
+        task.cancel()
+    if cat_facts_service is not None and config.CATALOG_SNAPSHOT_PATH:
+        try:
+            cat_facts_service.save_snapshot(config.CATALOG_SNAPSHOT_PATH)
+        except Exception as e:
+            logger.warning(f"Failed to write catalog snapshot on shutdown: {e}")
+    if usage_meter is not None:
+        await asyncio.to_thread(usage_meter.flush)
+    if auth_service is not None:
+        auth_service.hashing.shutdown()
+    if tracing.exporter is not None:
+        tracing.exporter.shutdown()
+    if profiler.armed:
+        await asyncio.to_thread(profiler.disarm)
+    http_clients.close()
 
 
 @app.get("/", response_model=SuccessResponse)
@@ -130,25 +403,47 @@ async def root():
 
 @app.get("/health", response_model=HealthCheckResponse)
 async def health_check():
-    """Health check endpoint."""
-    db_status = "connected" if cat_facts_service else "disconnected"
-    ai_status = "connected" if ai_service else "disconnected"
+    """Health check endpoint (summary of the readiness probe)."""
+    readiness = await health_service.readiness()
     
     return HealthCheckResponse(
-        status="healthy",
-        database=db_status,
-        backend="Supabase",
-        ai_service=ai_status
+        status="healthy" if readiness["ready"] else "unhealthy",
+        database=readiness["checks"].get("database", "disconnected"),
+        backend="Supabase"
+    )
+
+
+@app.get("/health/live", response_model=LivenessResponse)
+async def liveness():
+    """Liveness probe: the process is up and its event loop is responsive."""
+    return LivenessResponse(status="alive")
+
+
+@app.get("/health/ready", response_model=ReadinessResponse)
+async def readiness(response: Response):
+    """Readiness probe: warm-up finished and required dependencies are reachable."""
+    result = await health_service.readiness()
+    if not result["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    return ReadinessResponse(
+        status="ready" if result["ready"] else "not_ready",
+        checks={
+            **result["checks"],
+            **{f"{name}_breaker": state for name, state in resilience.breaker_states().items()}
+        },
+        catalog_size=len(cat_facts_service.catalog) if cat_facts_service else 0
     )
 
 
 @app.get("/catfacts", response_model=CatFactListResponse)
 async def get_all_facts(
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
     service: CatFactsService = Depends(get_cat_facts_service)
 ):
     """Get all cat facts from the database."""
     try:
-        facts = service.get_all_facts()
+        facts = service.get_all_facts(user_id(user))
         return CatFactListResponse(
             facts=facts,
             total_count=len(facts)
@@ -167,13 +462,151 @@ async def get_all_facts(
         )
 
 
+@app.get("/catfacts/stream")
+async def stream_fact_updates(
+    last_event_id: Optional[str] = Header(None),
+    service: CatFactsService = Depends(get_cat_facts_service)
+):
+    """Server-Sent Events feed of fact_added, fact_deleted and likes_changed events."""
+    try:
+        subscriber = fact_events.subscribe()
+    except ServiceOverloadedException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    return StreamingResponse(
+        fact_events.stream(subscriber, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/catfacts/top", response_model=CatFactListResponse)
+async def get_top_facts(
+    n: int = Query(10, description="Number of facts to return"),
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
+    service: CatFactsService = Depends(get_cat_facts_service)
+):
+    """Get the most-liked cat facts."""
+    try:
+        facts = service.get_top_facts(n, user_id(user))
+        return CatFactListResponse(
+            facts=facts,
+            total_count=len(facts)
+        )
+    except ValidationException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except DatabaseException as e:
+        logger.error(f"Database error in get_top_facts: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in get_top_facts: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+
+@app.get("/catfacts/trending", response_model=TrendingFactsResponse)
+async def get_trending_facts(
+    n: int = Query(10, description="Number of facts to return"),
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
+    service: CatFactsService = Depends(get_cat_facts_service)
+):
+    """Get the facts with the most recent like activity (exponentially time-decayed)."""
+    try:
+        facts = service.get_trending_facts(n, user_id(user))
+        return TrendingFactsResponse(
+            facts=facts,
+            total_count=len(facts),
+            half_life_hours=config.TRENDING_HALF_LIFE_HOURS
+        )
+    except ValidationException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except DatabaseException as e:
+        logger.error(f"Database error in get_trending_facts: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in get_trending_facts: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+
+def batch_lookup(service: CatFactsService, ids: List[str], user: Optional[Dict[str, Any]]) -> CatFactBatchResponse:
+    """Shared body of the GET and POST batch endpoints."""
+    try:
+        return service.get_facts_by_ids(ids, user_id(user))
+    except ValidationException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except DatabaseException as e:
+        logger.error(f"Database error in batch lookup: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in batch lookup: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+
+@app.get("/catfacts/batch", response_model=CatFactBatchResponse)
+async def get_facts_batch(
+    ids: str = Query(..., description="Comma-separated fact IDs"),
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
+    service: CatFactsService = Depends(get_cat_facts_service)
+):
+    """Get several cat facts by ID in one request; results follow request order."""
+    return batch_lookup(service, [fact_id.strip() for fact_id in ids.split(",") if fact_id.strip()], user)
+
+
+@app.post("/catfacts/batch", response_model=CatFactBatchResponse)
+async def post_facts_batch(
+    request: CatFactBatchRequest,
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
+    service: CatFactsService = Depends(get_cat_facts_service)
+):
+    """Same as ``GET /catfacts/batch`` for ID lists too long for a query string."""
+    return batch_lookup(service, request.ids, user)
+
+
 @app.get("/catfacts/random", response_model=CatFactResponse)
 async def get_random_fact(
+    no_repeat: bool = Query(True, description="Avoid facts this user or session has already seen"),
+    session_id: Optional[str] = Query(None, max_length=64, description="Session key for anonymous no-repeat"),
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
     service: CatFactsService = Depends(get_cat_facts_service)
 ):
     """Get a random cat fact from the database."""
+    viewer = None
+    if no_repeat:
+        if user is not None:
+            viewer = f"user:{user['sub']}"
+        elif session_id:
+            viewer = f"session:{session_id}"
     try:
-        fact = service.get_random_fact()
+        fact = service.get_random_fact(viewer, user_id(user))
         if fact:
             return fact
         else:
@@ -234,11 +667,12 @@ async def add_fact(
 @app.post("/catfacts/{fact_id}/like", response_model=CatFactLikeResponse)
 async def like_fact(
     fact_id: str,
+    user: Dict[str, Any] = Depends(get_current_user),
     service: CatFactsService = Depends(get_cat_facts_service)
 ):
-    """Like a cat fact."""
+    """Like a cat fact as the authenticated user (idempotent)."""
     try:
-        result = service.like_fact(fact_id)
+        result = service.like_fact(fact_id, user["sub"])
         return result
     except DatabaseException as e:
         logger.error(f"Database error in like_fact: {e}")
@@ -257,11 +691,12 @@ async def like_fact(
 @app.delete("/catfacts/{fact_id}/like", response_model=CatFactLikeResponse)
 async def unlike_fact(
     fact_id: str,
+    user: Dict[str, Any] = Depends(get_current_user),
     service: CatFactsService = Depends(get_cat_facts_service)
 ):
-    """Unlike a cat fact."""
+    """Remove the authenticated user's like from a cat fact (idempotent)."""
     try:
-        result = service.unlike_fact(fact_id)
+        result = service.unlike_fact(fact_id, user["sub"])
         return result
     except DatabaseException as e:
         logger.error(f"Database error in unlike_fact: {e}")
@@ -280,11 +715,12 @@ async def unlike_fact(
 @app.get("/catfacts/{fact_id}", response_model=CatFactResponse)
 async def get_fact_by_id(
     fact_id: str,
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
     service: CatFactsService = Depends(get_cat_facts_service)
 ):
     """Get a specific cat fact by ID."""
     try:
-        fact = service.get_fact_by_id(fact_id)
+        fact = service.get_fact_by_id(fact_id, user_id(user))
         if fact:
             return fact
         else:
@@ -334,19 +770,38 @@ async def delete_fact(
 @app.post("/api/ask-ai")
 async def ask_ai(
     request: AIRequest,
+    http_request: Request,
+    accept: Optional[str] = Header(None),
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user),
     service: AIService = Depends(get_ai_service)
 ):
-    """Ask AI for cat care advice with streaming response."""
-    try:
-        def stream():
-            try:
-                for chunk in service.generate_response_stream(request):
-                    yield chunk
-            except Exception as e:
-                logger.error(f"Error in AI streaming: {e}")
-                yield f"Error: {str(e)}"
+    """Ask AI for cat care advice with streaming response.
 
-        return StreamingResponse(stream(), media_type="text/plain")
+    Clients sending ``Accept: text/event-stream`` get typed ``token``/``done``/``error``
+    events; everyone else gets the plain text body.
+    """
+    # Anonymous callers are metered (and limited) per client IP
+    usage_key = f"user:{user['sub']}" if user else f"ip:{client_ip(http_request.scope, config.RATE_LIMIT_TRUST_FORWARDED)}"
+    if usage_meter is not None and usage_meter.over_quota(usage_key):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Daily AI token quota exceeded",
+            headers={"Retry-After": str(seconds_until_reset())}
+        )
+    try:
+        stream = AnswerStream(
+            service.stream_events(request, usage_key),
+            flush_bytes=config.AI_STREAM_FLUSH_BYTES,
+            flush_seconds=config.AI_STREAM_FLUSH_MS / 1000,
+            heartbeat_seconds=config.AI_STREAM_HEARTBEAT_SECONDS
+        )
+        if accept and "text/event-stream" in accept:
+            return StreamingResponse(
+                stream.sse(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        return StreamingResponse(stream.plain(), media_type="text/plain")
         
     except AIServiceException as e:
         logger.error(f"AI service error in ask_ai: {e}")
@@ -362,6 +817,22 @@ async def ask_ai(
         )
 
 
+@app.get("/api/usage", response_model=UserUsageResponse)
+async def get_my_usage(
+    user: Dict[str, Any] = Depends(get_current_user),
+    meter: UsageMeter = Depends(get_usage_meter)
+):
+    """The caller's OpenAI token usage today and what is left of the daily quota."""
+    usage_key = f"user:{user['sub']}"
+    return UserUsageResponse(
+        day=today(),
+        tokens_used=meter.used_today(usage_key),
+        daily_quota=meter.daily_quota or None,
+        tokens_remaining=meter.remaining_today(usage_key),
+        resets_in_seconds=seconds_until_reset()
+    )
+
+
 @app.post("/import-facts", response_model=ImportFactsResponse)
 async def import_facts(
     request: ImportFactsRequest,
@@ -373,7 +844,7 @@ async def import_facts(
         
         # This is a simplified version - in a real app, you'd want to make this async
         # and run it in a background task
-        import_cat_facts(request.num_facts)
+        import_cat_facts(request.num_facts, db=service.db)
         
         return ImportFactsResponse(
             success=True,
@@ -394,11 +865,11 @@ async def import_facts(
 @app.post("/auth/signup", response_model=AuthResponse)
 async def signup(
     request: UserSignupRequest,
-    service: CatFactsService = Depends(get_cat_facts_service)
+    service: AuthService = Depends(get_auth_service)
 ):
     """Sign up a new user."""
     try:
-        result = service.db.create_user(
+        result = await service.signup(
             username=request.username,
             email=request.email,
             password=request.password
@@ -408,7 +879,8 @@ async def signup(
             return AuthResponse(
                 success=True,
                 message=result["message"],
-                user=result["data"]
+                user=result["data"],
+                token=result.get("token")
             )
         else:
             if result["status"] in ["duplicate_username", "duplicate_email"]:
@@ -424,6 +896,13 @@ async def signup(
                 
     except HTTPException:
         raise
+    except ServiceOverloadedException as e:
+        logger.warning(f"Password hashing overloaded in signup: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Unexpected error in signup: {e}")
         raise HTTPException(
@@ -435,11 +914,11 @@ async def signup(
 @app.post("/auth/login", response_model=AuthResponse)
 async def login(
     request: UserLoginRequest,
-    service: CatFactsService = Depends(get_cat_facts_service)
+    service: AuthService = Depends(get_auth_service)
 ):
     """Login a user."""
     try:
-        result = service.db.authenticate_user(
+        result = await service.login(
             username=request.username,
             password=request.password
         )
@@ -448,7 +927,8 @@ async def login(
             return AuthResponse(
                 success=True,
                 message=result["message"],
-                user=result["data"]
+                user=result["data"],
+                token=result.get("token")
             )
         else:
             raise HTTPException(
@@ -458,6 +938,13 @@ async def login(
                 
     except HTTPException:
         raise
+    except ServiceOverloadedException as e:
+        logger.warning(f"Password hashing overloaded in login: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Unexpected error in login: {e}")
         raise HTTPException(
@@ -466,6 +953,55 @@ async def login(
         )
 
 
+@app.post("/auth/logout", response_model=SuccessResponse)
+async def logout(
+    user: Dict[str, Any] = Depends(get_current_user),
+    service: AuthService = Depends(get_auth_service)
+):
+    """Revoke the caller's access token."""
+    if not service.logout(user):
+        logger.warning(f"Token {user['jti']} revoked locally but not persisted")
+    return SuccessResponse(message="Logged out successfully")
+
+
+@app.post("/admin/profiler", response_model=ProfilerStatusResponse, dependencies=[Depends(require_admin)])
+async def arm_profiler(request: ProfilerArmRequest):
+    """Arm the sampling profiler for the next N requests and/or T seconds (this worker only)."""
+    return ProfilerStatusResponse(
+        **profiler.arm(request.route, request.requests, request.seconds),
+        recent_profiles=profiler.recent_profiles()
+    )
+
+
+@app.get("/admin/profiler", response_model=ProfilerStatusResponse, dependencies=[Depends(require_admin)])
+async def get_profiler_status():
+    """Current profiling window and the profiles written so far."""
+    return ProfilerStatusResponse(**profiler.status(), recent_profiles=profiler.recent_profiles())
+
+
+@app.delete("/admin/profiler", response_model=ProfilerStatusResponse, dependencies=[Depends(require_admin)])
+async def disarm_profiler():
+    """Close the profiling window early and write its folded stacks."""
+    await asyncio.to_thread(profiler.disarm)
+    return ProfilerStatusResponse(**profiler.status(), recent_profiles=profiler.recent_profiles())
+
+
+@app.get("/admin/ai-stats", response_model=AIAnswerStatsResponse, dependencies=[Depends(require_admin)])
+async def get_ai_stats(service: AIService = Depends(get_ai_service)):
+    """Catalog bypass rate and estimated savings for chat answers (this worker only)."""
+    return AIAnswerStatsResponse(**service.stats.snapshot())
+
+
+@app.get("/admin/ai-usage", response_model=AIUsageResponse, dependencies=[Depends(require_admin)])
+async def get_ai_usage(
+    days: int = Query(7, ge=1, le=366, description="UTC days to include, today included"),
+    top: int = Query(20, ge=1, le=1000, description="Heaviest users to list"),
+    meter: UsageMeter = Depends(get_usage_meter)
+):
+    """OpenAI token usage by day, model and user, across all workers (as of their last flush)."""
+    return AIUsageResponse(**meter.summary(days, top))
+
+
 # Global exception handlers
 @app.exception_handler(CatFactsException)
 async def cat_facts_exception_handler(request, exc):
@@ -506,5 +1042,7 @@ if __name__ == "__main__":
         host=config.HOST,
         port=config.PORT,
         reload=config.DEBUG,
-        log_level=config.LOG_LEVEL.lower()
+        log_level=config.LOG_LEVEL.lower(),
+        # Let uvicorn's loggers propagate into our queue-based pipeline
+        log_config=None
     ) 
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""
+ASGI middleware for the Cat Facts API.
+"""
+
+from .profiling import ProfilingMiddleware
+from .rate_limiter import RateLimitMiddleware, RouteGroup, TokenBucketLimiter
+from .resilience import ResilienceMiddleware
+from .tracing import TracedRoute, TracingMiddleware
+
+__all__ = [
+    "ProfilingMiddleware",
+    "RateLimitMiddleware",
+    "ResilienceMiddleware",
+    "RouteGroup",
+    "TokenBucketLimiter",
+    "TracedRoute",
+    "TracingMiddleware"
+]
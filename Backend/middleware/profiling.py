@@ -0,0 +1,64 @@
+"""
+Request hooks for the on-demand sampling profiler (see ``profiler.py``).
+
+While the profiler is disarmed and no admin key is configured, a request
+costs one attribute check. With ``ADMIN_API_KEY`` set, a request carrying
+``X-Profile: <n>`` and a matching ``X-Admin-Key`` arms the profiler for
+itself and the next ``n - 1`` requests on the same path; the response names
+the profile file in ``X-Profile-Output``.
+"""
+import hmac
+import os
+
+from profiler import SamplingProfiler
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that counts requests into an armed profiling window."""
+
+    def __init__(self, app, profiler: SamplingProfiler, admin_key: str = ""):
+        self.app = app
+        self.profiler = profiler
+        self.admin_key = admin_key.encode("latin-1")
+
+    def _requested(self, scope) -> int:
+        """Requests to profile from ``X-Profile``, if the caller proved the admin key."""
+        count = key = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                count = value
+            elif name == b"x-admin-key":
+                key = value
+        if count is None or key is None or not hmac.compare_digest(key, self.admin_key):
+            return 0
+        try:
+            return max(1, int(count))
+        except ValueError:
+            return 1
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.profiler.armed or self.admin_key):
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        if self.admin_key and not self.profiler.armed:
+            requested = self._requested(scope)
+            if requested:
+                self.profiler.arm(route=path, requests=requested)
+        if not self.profiler.request_started(path):
+            return await self.app(scope, receive, send)
+
+        output = os.path.basename(self.profiler.status()["output"] or "")
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start" and output:
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", ()), (b"x-profile-output", output.encode("latin-1"))]
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            self.profiler.request_finished()
@@ -0,0 +1,129 @@
+"""
+Per-client rate limiting with token buckets.
+
+Each route group owns a ``TokenBucketLimiter`` holding one bucket per client
+key in an LRU-ordered dict capped at ``max_keys``. Evicting the least recently
+seen client is safe: an idle bucket refills to full anyway, which is exactly
+the state a fresh bucket starts in.
+"""
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Pattern, Tuple
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by client, bounded by LRU eviction."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, last_refill]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def acquire(self, key: str, now: float = None) -> float:
+        """Take one token for ``key``; return 0 if allowed, else seconds until allowed."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            bucket[0] = tokens if tokens < self.burst else self.burst
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RouteGroup:
+    """A named set of routes sharing one limiter."""
+
+    def __init__(self, name: str, pattern: str, methods: Iterable[str], limiter: TokenBucketLimiter):
+        self.name = name
+        self.pattern: Pattern = re.compile(pattern)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.limiter = limiter
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and self.pattern.match(path) is not None
+
+
+def client_ip(scope, trust_forwarded: bool = False) -> str:
+    """Best-effort client address for an ASGI scope."""
+    if trust_forwarded:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.split(b",", 1)[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware returning ``429`` with ``Retry-After`` once a client's bucket is empty."""
+
+    def __init__(
+        self,
+        app,
+        groups: List[RouteGroup],
+        key_func: Callable[[dict], str] = client_ip
+    ):
+        self.app = app
+        self.groups = groups
+        self.key_func = key_func
+
+    def _group_for(self, method: str, path: str) -> Optional[RouteGroup]:
+        for group in self.groups:
+            if group.matches(method, path):
+                return group
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        group = self._group_for(scope["method"], scope["path"])
+        if group is not None:
+            retry_after = group.limiter.acquire(f"{group.name}:{self.key_func(scope)}")
+            if retry_after:
+                return await self._reject(send, group.name, retry_after)
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(send, group_name: str, retry_after: float):
+        body = json.dumps({"detail": f"Rate limit exceeded for {group_name}"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def parse_limit(value: str) -> Tuple[float, float]:
+    """Parse a ``"<rate per second>,<burst>"`` setting; ``ValueError`` unless both are positive."""
+    rate, _, burst = value.partition(",")
+    rate = float(rate)
+    burst = float(burst) if burst else max(1.0, rate)
+    # A zero rate would divide by zero when computing Retry-After; NaN fails both checks
+    if not rate > 0:
+        raise ValueError(f"Rate limit {value!r}: rate must be a positive number of requests per second")
+    if not burst >= 1:
+        raise ValueError(f"Rate limit {value!r}: burst must be at least 1")
+    return rate, burst
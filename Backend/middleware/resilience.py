@@ -0,0 +1,50 @@
+"""
+Per-request deadline budgets for the ASGI app.
+
+``ResilienceMiddleware`` starts each request's ``resilience.Budget`` (the
+first matching path prefix in ``route_seconds`` wins, else
+``default_seconds``), which caps every outbound call the request makes. When
+a handler served last-known-good data (``resilience.mark_stale``), the
+response gets ``Age: <seconds>`` and ``Warning: 110 - "Response is Stale"``.
+"""
+from typing import List, Tuple
+
+import resilience
+
+
+class ResilienceMiddleware:
+    """Starts each request's deadline budget and reports stale responses."""
+
+    def __init__(self, app, default_seconds: float, route_seconds: List[Tuple[str, float]] = ()):
+        self.app = app
+        self.default_seconds = default_seconds
+        self.route_seconds = list(route_seconds)
+
+    def _budget_for(self, path: str) -> float:
+        for prefix, seconds in self.route_seconds:
+            if path.startswith(prefix):
+                return seconds
+        return self.default_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        budget, token = resilience.start_budget(self._budget_for(scope["path"]))
+
+        async def send_with_staleness(message):
+            if message["type"] == "http.response.start" and budget.stale_age is not None:
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", ()),
+                        (b"age", str(int(budget.stale_age)).encode("latin-1")),
+                        (b"warning", b'110 - "Response is Stale"'),
+                    ]
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_staleness)
+        finally:
+            resilience.end_budget(token)
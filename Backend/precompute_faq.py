@@ -0,0 +1,244 @@
+"""
+Offline precomputation of answers to frequent chat questions.
+
+Questions come from a text file (one per line, ``#`` comments allowed)
+and/or are mined from JSON request logs written with ``AI_LOG_QUESTIONS``
+enabled (the ``--top`` most frequent normalized questions asked at least
+``--min-count`` times). Each question is answered through
+``AIService.generate_response`` by a pool of ``--workers`` threads and stored
+in the FAQ answer file the API serves from.
+
+Requests are paced to ``--rpm`` per minute across all workers. A 429 from
+OpenAI pauses every worker for its ``Retry-After`` (or an exponential
+backoff) before the question is retried; other failures are retried a few
+times and then reported. The answer file is rewritten after every answer, so
+an interrupted run loses nothing and a second run only generates what is
+missing.
+
+Entries generated with a different model, system prompt or sampling settings
+are regenerated; ``--force`` regenerates everything.
+
+Usage: python precompute_faq.py [--questions FILE] [--from-logs LOG [LOG ...]]
+                                [--top N] [--min-count N] [--workers N]
+                                [--rpm N] [--store PATH] [--force]
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+import openai
+
+from config import config
+from Models.openAI_model import AIRequest
+from services.ai_service import AIService
+from services.faq_store import FAQStore, normalize_question
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+# -- Question sources ---------------------------------------------------------
+
+def read_question_file(path: str) -> Iterable[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            question = line.strip()
+            if question and not question.startswith("#"):
+                yield question
+
+
+def mine_logs(paths: List[str], top: int, min_count: int) -> List[str]:
+    """The ``top`` most asked questions in JSON log files (first wording seen for each)."""
+    counts: Counter = Counter()
+    wording: Dict[str, str] = {}
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if '"question"' not in line:
+                    continue
+                try:
+                    question = json.loads(line).get("question")
+                except ValueError:
+                    continue
+                if not isinstance(question, str) or not question.strip():
+                    continue
+                key = normalize_question(question)
+                counts[key] += 1
+                wording.setdefault(key, question.strip())
+    return [wording[key] for key, count in counts.most_common(top) if count >= min_count]
+
+
+# -- Pacing -------------------------------------------------------------------
+
+class RequestPacer:
+    """Spaces requests to a per-minute budget and pauses everyone after a 429."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    def wait(self):
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot, self._paused_until)
+            self._next_slot = slot + self.interval
+        while True:
+            delay = slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # A 429 seen by another worker while we slept holds us back too: take a
+            # fresh slot after the pause so the waiting workers do not all fire at once
+            with self._lock:
+                if self._paused_until <= time.monotonic():
+                    return
+                slot = max(self._next_slot, self._paused_until)
+                self._next_slot = slot + self.interval
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._next_slot = max(self._next_slot, self._paused_until)
+
+
+def _retry_after(error: openai.APIStatusError) -> Optional[float]:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+# -- Generation ---------------------------------------------------------------
+
+class FAQPrecomputer:
+    """Answers questions on a bounded worker pool and saves them into a ``FAQStore``."""
+
+    def __init__(self, service: AIService, store: FAQStore, pacer: RequestPacer, workers: int):
+        self.service = service
+        self.store = store
+        self.pacer = pacer
+        self.workers = workers
+        self.started = time.monotonic()
+        self.generated = 0
+        self.skipped = 0
+        self.failed: List[str] = []
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def pending(self, questions: Iterable[str], force: bool) -> List[str]:
+        """Distinct questions without a current answer (all of them with ``force``)."""
+        entries = self.store.entries()
+        unique: Dict[str, str] = {}
+        for question in questions:
+            unique.setdefault(normalize_question(question), question)
+        todo = []
+        for key, question in unique.items():
+            entry = entries.get(key)
+            if not force and entry is not None and entry.get("fingerprint") == self.service.fingerprint:
+                self.skipped += 1
+            else:
+                todo.append(question)
+        return todo
+
+    def _answer(self, question: str) -> str:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.pacer.wait()
+            try:
+                return self.service.generate_response(AIRequest(question=question))
+            except openai.RateLimitError as e:
+                with self._lock:
+                    self.rate_limited += 1
+                delay = _retry_after(e) or min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                logger.warning("Rate limited by OpenAI; pausing all workers for %.1fs", delay)
+                self.pacer.pause(delay)
+                error: Exception = e
+            except (openai.APIConnectionError, openai.InternalServerError) as e:
+                delay = random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempt - 1)))
+                logger.warning("Attempt %d for %r failed (%s); retrying in %.1fs", attempt, question, e, delay)
+                time.sleep(delay)
+                error = e
+        raise error
+
+    def _process(self, question: str):
+        answer = self._answer(question)
+        self.store.put(question, answer, self.service.fingerprint)
+        # Saved as we go so an interrupted run keeps what it paid for
+        self.store.save()
+        with self._lock:
+            self.generated += 1
+
+    def run(self, questions: List[str]):
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="faq")
+        try:
+            futures = {pool.submit(self._process, question): question for question in questions}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error("Giving up on %r: %s", futures[future], e)
+                    self.failed.append(futures[future])
+        finally:
+            # On interrupt, drop queued questions instead of answering them all first
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        print(
+            f"{self.generated} answers generated, {self.skipped} already current, "
+            f"{len(self.failed)} failed, {self.rate_limited} rate-limit pauses in {elapsed:.1f}s "
+            f"({len(self.store)} answers in {self.store.path})"
+        )
+        for question in self.failed:
+            print(f"  failed: {question}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", help="Text file with one question per line")
+    parser.add_argument("--from-logs", nargs="+", default=[], metavar="LOG", help="JSON log files to mine")
+    parser.add_argument("--top", type=int, default=200, help="Most frequent logged questions to answer")
+    parser.add_argument("--min-count", type=int, default=3, help="Minimum times a logged question was asked")
+    parser.add_argument("--workers", type=int, default=config.FAQ_WORKERS, help="Concurrent OpenAI requests")
+    parser.add_argument("--rpm", type=float, default=config.FAQ_REQUESTS_PER_MINUTE, help="Requests per minute")
+    parser.add_argument("--store", default=config.FAQ_STORE_PATH, help="FAQ answer file")
+    parser.add_argument("--force", action="store_true", help="Regenerate answers that are still current")
+    args = parser.parse_args()
+    config.setup_logging()
+
+    if not args.questions and not args.from_logs:
+        parser.error("give --questions and/or --from-logs")
+    if not args.store:
+        parser.error("no answer file: set FAQ_STORE_PATH or pass --store")
+
+    questions: List[str] = []
+    if args.questions:
+        questions.extend(read_question_file(args.questions))
+    if args.from_logs:
+        questions.extend(mine_logs(args.from_logs, args.top, args.min_count))
+
+    store = FAQStore(args.store, reload_seconds=float("inf"))
+    precomputer = FAQPrecomputer(AIService(), store, RequestPacer(args.rpm), max(1, args.workers))
+    todo = precomputer.pending(questions, args.force)
+    print(f"{len(todo)} questions to answer ({precomputer.skipped} already current)")
+    try:
+        precomputer.run(todo)
+    except KeyboardInterrupt:
+        print("Interrupted; answers so far are saved, run again to finish", file=sys.stderr)
+        return 130
+    finally:
+        precomputer.report()
+    return 1 if precomputer.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+On-demand sampling profiler for production debugging.
+
+Disarmed, the profiler is a boolean check per request and no thread runs.
+Once armed (by an admin endpoint or header, see ``middleware/profiling.py``)
+a daemon thread samples every thread's Python stack with
+``sys._current_frames()`` every ``interval`` seconds and counts identical
+stacks. When the window ends the counts are written in the "folded" format
+(``thread;outer;...;inner <count>``) that flamegraph.pl, speedscope and
+inferno read directly.
+
+A window is the next ``requests`` requests and/or the next ``seconds``
+seconds, optionally limited to paths starting with ``route``. With a
+request or route limit, samples are only taken while a matching request is
+in flight. Concurrent requests on other routes share the event loop, so
+they can appear in those samples too. Profiles are per worker process.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads parked waiting for work; counting them would drown the CPU samples
+_IDLE_LEAVES = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+    ("handlers.py", "dequeue"),
+    ("tracing.py", "_run"),
+})
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """Stack-sampling profiler armed for a bounded window."""
+
+    def __init__(self, output_dir: str, interval: float = 0.005, max_seconds: float = 120, max_requests: int = 1000):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_requests = max_requests
+        self.armed = False
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stacks: Counter = Counter()
+        self._route: Optional[str] = None
+        self._request_limit: Optional[int] = None
+        self._deadline = 0.0
+        self._started = 0
+        self._active = 0
+        self._samples = 0
+        self._output: Optional[str] = None
+        self._windows = 0
+        self.last_output: Optional[str] = None
+
+    def arm(self, route: str = None, requests: int = None, seconds: float = None) -> Dict[str, Any]:
+        """Start a profiling window; a window already running is left as is."""
+        with self._lock:
+            if self.armed:
+                return self._status()
+            requests = min(requests, self.max_requests) if requests else None
+            seconds = min(seconds, self.max_seconds) if seconds else self.max_seconds
+            self._route = route
+            self._request_limit = requests
+            self._deadline = time.monotonic() + seconds
+            self._started = self._active = self._samples = 0
+            self._stacks = Counter()
+            self._windows += 1
+            stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+            self._output = os.path.join(
+                self.output_dir, f"profile-{stamp}-{os.getpid()}-{self._windows}.folded"
+            )
+            self.armed = True
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+            logger.warning(
+                "Profiler armed (route=%s, requests=%s, seconds=%g)", route or "*", requests or "-", seconds
+            )
+            return self._status()
+
+    def disarm(self) -> Optional[str]:
+        """End the current window early and write what was collected."""
+        thread = self._thread
+        with self._lock:
+            if not self.armed:
+                return None
+            self.armed = False
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        return self.last_output
+
+    def request_started(self, path: str) -> bool:
+        """Count a request into the window; returns whether it was counted."""
+        with self._lock:
+            if not self.armed or (self._route and not path.startswith(self._route)):
+                return False
+            if self._request_limit is not None and self._started >= self._request_limit:
+                return False
+            self._started += 1
+            self._active += 1
+            return True
+
+    def request_finished(self):
+        with self._lock:
+            self._active -= 1
+            if self._request_limit is not None and self._started >= self._request_limit and not self._active:
+                # Last counted request is done; the sampler thread writes the profile
+                self.armed = False
+
+    def _should_sample(self) -> bool:
+        if self._route is None and self._request_limit is None:
+            return True
+        return self._active > 0
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while self.armed and time.monotonic() < self._deadline:
+            if self._should_sample():
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = self._stack(frame)
+                    if stack is None:
+                        continue
+                    name = names.get(thread_id)
+                    if name is None:
+                        thread = threading._active.get(thread_id)
+                        name = names[thread_id] = thread.name if thread else f"thread-{thread_id}"
+                    self._stacks[(name,) + stack] += 1
+                self._samples += 1
+            time.sleep(self.interval)
+        with self._lock:
+            self.armed = False
+            # Snapshot the window so a re-arm during the write cannot swap it out
+            window = (self._output, self._stacks, self._samples, self._started)
+        self._write(*window)
+
+    @staticmethod
+    def _stack(frame) -> Optional[Tuple[str, ...]]:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+            return None
+        labels: List[str] = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def _write(self, output: str, stacks: Counter, samples: int, requests: int):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(output, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        self.last_output = output
+        logger.warning(
+            "Profiler wrote %s (%d samples, %d requests, %d distinct stacks)",
+            output, samples, requests, len(stacks)
+        )
+
+    def _status(self) -> Dict[str, Any]:
+        return {
+            "armed": self.armed,
+            "route": self._route,
+            "requests_limit": self._request_limit,
+            "requests_profiled": self._started,
+            "seconds_remaining": round(max(0.0, self._deadline - time.monotonic()), 1) if self.armed else 0.0,
+            "samples": self._samples,
+            "output": self._output if self.armed else self.last_output,
+        }
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._status()
+
+    def recent_profiles(self, limit: int = 20) -> List[str]:
+        """Newest profile files in the output directory."""
+        try:
+            names = [name for name in os.listdir(self.output_dir) if name.endswith(".folded")]
+        except FileNotFoundError:
+            return []
+        return sorted(names, reverse=True)[:limit]
@@ -0,0 +1,275 @@
+"""
+Deadlines, retries and circuit breakers for outbound calls.
+
+Every shared HTTP client (see ``http_client.py``) sends through a
+``ResilientTransport``, so Supabase, OpenAI and the external cat facts API
+all get the same treatment without touching their client libraries:
+
+- **Deadlines.** ``ResilienceMiddleware`` (``middleware/resilience.py``)
+  gives each request a ``Budget`` held in a context variable (which follows
+  ``asyncio.to_thread`` and the threadpool). An outbound call's connect/read/write/pool timeouts are capped
+  at the budget left when it starts, and a call with no budget left fails
+  with ``DeadlineExceeded`` before touching the network. Background loops
+  have no budget and keep the client defaults.
+- **Retries.** Idempotent reads (``GET``/``HEAD``) are retried on transport
+  errors and 429/502/503/504 with full-jitter exponential backoff, never
+  sleeping past the deadline. Writes are sent once, and so is a call made
+  from the event loop thread (a sync client used inside an ``async def``
+  endpoint), where sleeping would stall every request on the worker.
+- **Circuit breakers.** One ``CircuitBreaker`` per upstream counts
+  consecutive transport errors and 5xx responses. Once open, calls fail
+  immediately with ``CircuitOpenError`` until ``reset_seconds`` have passed,
+  then a single trial call decides whether to close it again.
+
+Both errors subclass ``httpx.TransportError`` so existing ``httpx`` error
+handling (and the libraries wrapping ``httpx``) treat them as failed calls.
+
+A request served from last-known-good data calls ``mark_stale``; see
+``middleware/resilience.py`` for the response headers that produces.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """Raised when a request's deadline budget is spent before an outbound call."""
+
+
+# -- Deadline budgets ---------------------------------------------------------
+
+class Budget:
+    """Per-request deadline and staleness marker."""
+
+    __slots__ = ("deadline", "stale_age")
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+        self.stale_age: Optional[float] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+
+_current_budget: contextvars.ContextVar[Optional[Budget]] = contextvars.ContextVar("budget", default=None)
+
+
+def start_budget(seconds: float) -> Tuple[Budget, contextvars.Token]:
+    """Give the current context a deadline ``seconds`` from now; reset the token when done."""
+    budget = Budget(seconds)
+    return budget, _current_budget.set(budget)
+
+
+def end_budget(token: contextvars.Token):
+    _current_budget.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or ``None`` outside a request."""
+    budget = _current_budget.get()
+    return budget.remaining() if budget is not None else None
+
+
+def _on_event_loop() -> bool:
+    """Whether the calling thread is running an asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def mark_stale(age_seconds: float):
+    """Flag the current response as served from data ``age_seconds`` old."""
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.stale_age = max(budget.stale_age or 0.0, age_seconds)
+
+
+def _clamp_timeouts(request: httpx.Request):
+    """Cap the request's timeouts at the budget left, failing fast when none is."""
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0.0:
+        raise DeadlineExceeded("Request deadline exceeded", request=request)
+    timeouts = request.extensions.get("timeout") or {}
+    request.extensions["timeout"] = {
+        key: left if timeouts.get(key) is None else min(timeouts[key], left)
+        for key in ("connect", "read", "write", "pool")
+    }
+
+
+# -- Circuit breakers ---------------------------------------------------------
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being refused (a pending trial counts as open)."""
+        return self.state != self.CLOSED and not (
+            self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds
+        )
+
+    def before_call(self, request: httpx.Request = None):
+        """Raise ``CircuitOpenError`` unless a call may go through now."""
+        if self.state == self.CLOSED:
+            return
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                # Let exactly one trial call through
+                self.state = self.HALF_OPEN
+                return
+            if self.state != self.CLOSED:
+                raise CircuitOpenError(f"Circuit breaker for '{self.name}' is open", request=request)
+
+    def release_trial(self):
+        """Give back a half-open trial slot whose call ended without an upstream verdict."""
+        if self.state != self.HALF_OPEN:
+            return
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # opened_at is unchanged, so the next call gets the trial
+                self.state = self.OPEN
+
+    def record_success(self):
+        if self.state == self.CLOSED and not self.failures:
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.warning("Circuit breaker for '%s' closed", self.name)
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                logger.warning(
+                    "Circuit breaker for '%s' opened after %d consecutive failures", self.name, self.failures
+                )
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name: str, failure_threshold: int = 5, reset_seconds: float = 30.0) -> CircuitBreaker:
+    """Get (creating on first use) the breaker for an upstream."""
+    existing = _breakers.get(name)
+    if existing is not None:
+        return existing
+    with _breakers_lock:
+        return _breakers.setdefault(name, CircuitBreaker(name, failure_threshold, reset_seconds))
+
+
+def is_open(name: str) -> bool:
+    """Whether the named upstream's breaker is refusing calls (``False`` if it has none yet)."""
+    existing = _breakers.get(name)
+    return existing is not None and existing.is_open
+
+
+def breaker_states() -> Dict[str, str]:
+    return {name: b.state for name, b in _breakers.items()}
+
+
+# -- Transport ----------------------------------------------------------------
+
+class RetryPolicy:
+    """Bounded full-jitter exponential backoff."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.1, max_delay: float = 1.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """Wraps a transport with deadline clamping, retries and a circuit breaker."""
+
+    def __init__(self, transport: httpx.BaseTransport, breaker: CircuitBreaker, retry: RetryPolicy):
+        self.transport = transport
+        self.breaker = breaker
+        self.retry = retry
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempts = self.retry.max_attempts if request.method in IDEMPOTENT_METHODS else 1
+        attempt = 0
+        while True:
+            attempt += 1
+            # Fail on the deadline before taking what may be the breaker's only trial slot
+            _clamp_timeouts(request)
+            self.breaker.before_call(request)
+            try:
+                response = self.transport.handle_request(request)
+            except (CircuitOpenError, DeadlineExceeded):
+                self.breaker.release_trial()
+                raise
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                if not self._backoff(attempt, attempts):
+                    raise
+                continue
+            except BaseException:
+                # Not the upstream's verdict (a bug, cancellation): don't leave the breaker half open
+                self.breaker.release_trial()
+                raise
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if response.status_code in RETRY_STATUSES and self._backoff(attempt, attempts):
+                response.close()
+                continue
+            return response
+
+    def _backoff(self, attempt: int, attempts: int) -> bool:
+        """Sleep before the next attempt; ``False`` when out of attempts or budget, or on the event loop."""
+        if attempt >= attempts or self.breaker.is_open or _on_event_loop():
+            return False
+        delay = self.retry.delay(attempt)
+        left = remaining()
+        if left is not None and delay >= left:
+            return False
+        time.sleep(delay)
+        return True
+
+    def close(self):
+        self.transport.close()
@@ -0,0 +1,40 @@
+"""
+Production entry point: pre-forks WEB_CONCURRENCY uvicorn workers.
+
+Workers share the fact catalog through a memory-mapped snapshot in
+SHARED_CATALOG_DIR (see services/shared_catalog.py), so adding workers scales
+throughput with cores without multiplying catalog memory or Supabase polling.
+"""
+import logging
+import sys
+
+import uvicorn
+
+from config import config
+from services.shared_catalog import reset_shared_files
+
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    config.setup_logging()
+    
+    if config.WEB_CONCURRENCY > 1 and not config.AUTH_TOKEN_SECRET:
+        # A per-process random secret would make each worker reject the others' tokens
+        sys.exit("AUTH_TOKEN_SECRET must be set when running more than one worker (WEB_CONCURRENCY > 1)")
+    
+    if config.WEB_CONCURRENCY > 1:
+        # Snapshot/control files left behind by a previous run
+        reset_shared_files(config.SHARED_CATALOG_DIR)
+    
+    logger.info(f"Starting {config.WEB_CONCURRENCY} worker(s) on {config.HOST}:{config.PORT}")
+    uvicorn.run(
+        "main:app",
+        host=config.HOST,
+        port=config.PORT,
+        workers=config.WEB_CONCURRENCY,
+        log_level=config.LOG_LEVEL.lower(),
+        # Let uvicorn's loggers propagate into our queue-based pipeline
+        log_config=None,
+        proxy_headers=True
+    )
@@ -4,8 +4,16 @@ Services layer for business logic.
 
 from .cat_facts_service import CatFactsService
 from .ai_service import AIService
+from .auth_service import AuthService
+from .password_hasher import PasswordHashingService
+from .token_service import TokenService
+from .health_service import HealthService
 
 __all__ = [
     "CatFactsService",
-    "AIService"
+    "AIService",
+    "AuthService",
+    "PasswordHashingService",
+    "TokenService",
+    "HealthService"
 ] 
\ No newline at end of file
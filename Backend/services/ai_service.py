@@ -2,58 +2,161 @@
 Service layer for AI operations.
 """
 import logging
+import time
 import openai
-from typing import Generator
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
 from Models.openAI_model import AIRequest
+from config import config
+from http_client import http_clients
+from services.answer_stats import AnswerStats
+from services.faq_store import FAQStore, answer_fingerprint
+from services.usage_meter import UsageMeter
+from tracing import traced
 from constants import (
     OPENAI_API_KEY, 
     OPENAI_MODEL, 
     OPENAI_MAX_TOKENS, 
     OPENAI_TEMPERATURE,
     CAT_CARE_SYSTEM_PROMPT,
+    CATALOG_ANSWER_TEMPLATE,
+    CATALOG_CONTEXT_PROMPT,
     ERROR_MESSAGES
 )
 
 logger = logging.getLogger(__name__)
 
+# (question, k) -> up to k (confidence, matched question terms, fact row) hits, best first
+Retriever = Callable[[str, int], List[Tuple[float, float, Dict[str, Any]]]]
+
 
 class AIService:
     """Service class for AI operations."""
     
-    def __init__(self):
-        """Initialize the AI service with OpenAI client."""
+    def __init__(self, retriever: Optional[Retriever] = None, faq_store: Optional[FAQStore] = None,
+                 meter: Optional[UsageMeter] = None):
+        """Initialize the AI service with OpenAI client, an optional catalog retriever, FAQ answers and token meter."""
         if not OPENAI_API_KEY:
             raise ValueError(ERROR_MESSAGES["openai_key_missing"])
         
-        self.client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        self.client = openai.OpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=http_clients.get("openai", warm_up_url="https://api.openai.com"),
+            timeout=http_clients.timeout,
+            # Retries, deadlines and the circuit breaker live in the shared transport
+            max_retries=0
+        )
         self.model = OPENAI_MODEL
         self.max_tokens = OPENAI_MAX_TOKENS
         self.temperature = OPENAI_TEMPERATURE
         self.system_prompt = CAT_CARE_SYSTEM_PROMPT
+        self.retriever = retriever if config.AI_BYPASS_ENABLED else None
+        self.faq_store = faq_store
+        self.meter = meter
+        # Precomputed answers only count while generated with these exact settings
+        self.fingerprint = answer_fingerprint(self.model, self.system_prompt, self.max_tokens, self.temperature)
+        self.stats = AnswerStats()
+    
+    @traced("ai")
+    def ping(self):
+        """Check that the configured model is reachable with our credentials."""
+        self.client.models.retrieve(self.model)
+    
+    def _route(self, question: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Pick the answer source for a question and the catalog facts it uses."""
+        if self.retriever is None:
+            return "model", []
+        try:
+            hits = self.retriever(question, config.AI_BYPASS_CONTEXT_FACTS)
+        except Exception as e:
+            # Retrieval is an optimization; the model can still answer
+            logger.warning("Fact retrieval failed, asking the model: %s", e)
+            return "model", []
+        # One shared word is never enough to answer with a fact verbatim
+        if hits and hits[0][0] >= config.AI_BYPASS_ANSWER_CONFIDENCE and hits[0][1] >= config.AI_BYPASS_ANSWER_MIN_TERMS:
+            return "catalog", [hits[0][2]]
+        context = [row for confidence, _, row in hits if confidence >= config.AI_BYPASS_CONTEXT_CONFIDENCE]
+        return ("grounded", context) if context else ("model", [])
+    
+    @traced("ai")
+    def stream_events(self, request: AIRequest, usage_key: Optional[str] = None) -> Generator[Tuple[str, Any], None, None]:
+        """Stream ``("source", name)``, then ``("token", text)`` deltas and ``("usage", dict)`` if reported.
+
+        Precomputed FAQ answers and questions the fact catalog answers confidently
+        never reach OpenAI; weaker catalog matches are passed to the model as
+        grounding context. OpenAI tokens are metered against ``usage_key``.
+        """
+        started = time.perf_counter()
+        answer = self.faq_store.lookup(request.question, self.fingerprint) if self.faq_store is not None else None
+        source, facts = ("faq", []) if answer is not None else self._route(request.question)
+        if config.AI_LOG_QUESTIONS:
+            # Mined by precompute_faq.py --from-logs
+            logger.info("AI question", extra={"question": request.question, "answer_source": source})
+        yield "source", source
+        
+        if source in ("faq", "catalog"):
+            if source == "catalog":
+                answer = CATALOG_ANSWER_TEMPLATE.format(fact=facts[0]["fact"])
+            first_token_ms = (time.perf_counter() - started) * 1000
+            yield "token", answer
+            self.stats.record(source, first_token_ms, (time.perf_counter() - started) * 1000)
+            return
+        
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if facts:
+            messages.append({
+                "role": "system",
+                "content": CATALOG_CONTEXT_PROMPT + "\n".join(f"- {row['fact']}" for row in facts)
+            })
+        messages.append({"role": "user", "content": request.question})
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        first_token_ms = None
+        usage = None
+        deltas = 0
+        try:
+            for chunk in response:
+                # The usage chunk that ends the stream has no choices
+                if chunk.choices:
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - started) * 1000
+                        deltas += 1
+                        yield "token", content
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                    yield "usage", usage.model_dump()
+        finally:
+            # Also reached when the client disconnects and the stream is closed early
+            response.close()
+            if self.meter is not None and usage_key is not None:
+                if usage is not None:
+                    self.meter.record(usage_key, self.model, usage.prompt_tokens, usage.completion_tokens)
+                else:
+                    # Cut short before the usage chunk: about one token per delta, ~4 characters per prompt token
+                    prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+                    self.meter.record(usage_key, self.model, prompt_tokens, deltas)
+        total_ms = (time.perf_counter() - started) * 1000
+        total_tokens = usage.total_tokens if usage is not None else None
+        self.stats.record(source, first_token_ms if first_token_ms is not None else total_ms, total_ms, total_tokens)
     
     def generate_response_stream(self, request: AIRequest) -> Generator[str, None, None]:
         """Generate a streaming response from OpenAI."""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": request.question}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                stream=True
-            )
-            
-            for chunk in response:
-                content = chunk.choices[0].delta.content
-                if content:
-                    yield content
-                    
+            for kind, value in self.stream_events(request):
+                if kind == "token":
+                    yield value
         except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
+            logger.error("Error generating AI response: %s", e)
             raise
     
+    @traced("ai")
     def generate_response(self, request: AIRequest) -> str:
         """Generate a non-streaming response from OpenAI."""
         try:
@@ -71,5 +174,5 @@ class AIService:
             return response.choices[0].message.content
             
         except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
+            logger.error("Error generating AI response: %s", e)
             raise 
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+Coalesced streaming of AI answers.
+
+OpenAI streams one delta per token, and forwarding each one as its own HTTP
+chunk means thousands of tiny writes per answer (plus the per-item threadpool
+hop of ``StreamingResponse`` over a blocking iterator). ``AnswerStream``
+instead pumps the blocking completion iterator on one worker thread into an
+``asyncio.Queue`` and flushes buffered text when either ``flush_bytes`` have
+accumulated or ``flush_seconds`` have passed since the oldest unsent token.
+The first token is always sent immediately, so time to first token is
+unchanged.
+
+Two wire formats share the coalescer:
+
+- ``sse()``: ``text/event-stream`` with typed events: ``token``
+  (``{"text"}``), ``done`` (answer source, usage and stream stats) and ``error``
+  (``{"message"}``), plus ``: keep-alive`` comments while the model is silent.
+- ``plain()``: the original ``text/plain`` body (errors appended in-band as
+  ``Error: ...``), for clients that do not ask for SSE.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = b": keep-alive\n\n"
+
+_END = object()
+
+
+def encode_sse(event_type: str, data: Dict[str, Any]) -> bytes:
+    """One SSE event without an ID (answers are not resumable)."""
+    payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return f"event: {event_type}\ndata: {payload}\n\n".encode()
+
+
+class AnswerStream:
+    """Coalesces ``("token", text)`` events (plus ``"usage"``/``"source"`` metadata) from a blocking iterator."""
+
+    def __init__(self, events: Iterator[Tuple[str, Any]], flush_bytes: int, flush_seconds: float,
+                 heartbeat_seconds: float):
+        self.events = events
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.usage: Optional[Dict[str, Any]] = None
+        self.source: Optional[str] = None
+        self.tokens = 0
+        self.chunks = 0
+        self._stopped = threading.Event()
+        self._pump_task: Optional[asyncio.Future] = None
+
+    def _pump(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        """Worker thread: move events onto the loop's queue until done, failed or cancelled."""
+        def put(item):
+            if not self._stopped.is_set():
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+                except RuntimeError:
+                    # The event loop is gone (shutdown mid-answer)
+                    self._stopped.set()
+
+        try:
+            for event in self.events:
+                if self._stopped.is_set():
+                    break
+                put(event)
+        except Exception as e:
+            put(("error", e))
+        finally:
+            self.events.close()
+            put(_END)
+
+    async def batches(self) -> AsyncIterator[Tuple[str, Any]]:
+        """``("text", str)`` flushes, ``("heartbeat", None)`` while idle, then ``("error", exc)`` if it failed."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        # to_thread (unlike run_in_executor) carries the request's deadline and trace context
+        self._pump_task = asyncio.ensure_future(asyncio.to_thread(self._pump, loop, queue))
+        pending: List[str] = []
+        pending_bytes = 0
+        oldest = 0.0
+        try:
+            while True:
+                if pending:
+                    timeout = max(0.0, oldest + self.flush_seconds - time.monotonic())
+                else:
+                    timeout = self.heartbeat_seconds
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    if pending:
+                        yield self._flush(pending)
+                        pending, pending_bytes = [], 0
+                    else:
+                        yield "heartbeat", None
+                    continue
+
+                if event is _END:
+                    break
+                kind, value = event
+                if kind == "token":
+                    self.tokens += 1
+                    if not pending:
+                        oldest = time.monotonic()
+                    pending.append(value)
+                    pending_bytes += len(value.encode())
+                    if self.chunks == 0 or pending_bytes >= self.flush_bytes:
+                        yield self._flush(pending)
+                        pending, pending_bytes = [], 0
+                elif kind == "usage":
+                    self.usage = value
+                elif kind == "source":
+                    self.source = value
+                elif kind == "error":
+                    if pending:
+                        yield self._flush(pending)
+                        pending = []
+                    yield "error", value
+                    return
+            if pending:
+                yield self._flush(pending)
+        finally:
+            # Client went away (or we are done): the pump stops pulling from OpenAI
+            # at its next event instead of draining the whole answer
+            self._stopped.set()
+
+    def _flush(self, pending: List[str]) -> Tuple[str, str]:
+        self.chunks += 1
+        return "text", "".join(pending)
+
+    async def sse(self) -> AsyncIterator[bytes]:
+        started = time.monotonic()
+        async for kind, value in self.batches():
+            if kind == "text":
+                yield encode_sse("token", {"text": value})
+            elif kind == "heartbeat":
+                yield HEARTBEAT
+            else:
+                logger.error("Error in AI streaming: %s", value)
+                yield encode_sse("error", {"message": str(value)})
+                return
+        yield encode_sse("done", {
+            "source": self.source,
+            "usage": self.usage,
+            "tokens": self.tokens,
+            "chunks": self.chunks,
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        })
+
+    async def plain(self) -> AsyncIterator[str]:
+        async for kind, value in self.batches():
+            if kind == "text":
+                yield value
+            elif kind == "error":
+                logger.error("Error in AI streaming: %s", value)
+                yield f"Error: {value}"
@@ -0,0 +1,78 @@
+"""
+Counters for how chat answers were produced.
+
+Every completed answer is recorded under its source: ``faq`` (precomputed
+answer), ``catalog`` (answered straight from the fact catalog), ``grounded``
+(LLM call with retrieved facts as context) or ``model`` (plain LLM call).
+The first two bypass the LLM. Savings are estimated per bypassed answer as
+the gap to the average ``model`` answer, both in latency and in tokens, so
+they are only reported once there is at least one ``model`` answer to
+compare against.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+SOURCES = ("faq", "catalog", "grounded", "model")
+BYPASS_SOURCES = ("faq", "catalog")
+
+
+class _SourceTotals:
+    __slots__ = ("count", "first_token_ms", "total_ms", "tokens", "token_answers")
+
+    def __init__(self):
+        self.count = 0
+        self.first_token_ms = 0.0
+        self.total_ms = 0.0
+        self.tokens = 0
+        self.token_answers = 0
+
+    def averages(self) -> Dict[str, Any]:
+        count = self.count or 1
+        return {
+            "count": self.count,
+            "avg_first_token_ms": round(self.first_token_ms / count, 1),
+            "avg_total_ms": round(self.total_ms / count, 1),
+            "avg_tokens": round(self.tokens / self.token_answers, 1) if self.token_answers else None,
+        }
+
+
+class AnswerStats:
+    """Thread-safe per-source answer counts and latencies for this worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {source: _SourceTotals() for source in SOURCES}
+
+    def record(self, source: str, first_token_ms: float, total_ms: float, tokens: Optional[int] = None):
+        with self._lock:
+            totals = self._totals[source]
+            totals.count += 1
+            totals.first_token_ms += first_token_ms
+            totals.total_ms += total_ms
+            if tokens is not None:
+                totals.tokens += tokens
+                totals.token_answers += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            sources = {source: totals.averages() for source, totals in self._totals.items()}
+        answers = sum(entry["count"] for entry in sources.values())
+        bypassed = sum(sources[source]["count"] for source in BYPASS_SOURCES)
+        model = sources["model"]
+
+        saved_ms = saved_tokens = None
+        if model["count"]:
+            saved_ms = round(sum(
+                sources[source]["count"] * max(0.0, model["avg_total_ms"] - sources[source]["avg_total_ms"])
+                for source in BYPASS_SOURCES
+            ), 1)
+            if model["avg_tokens"] is not None:
+                saved_tokens = round(bypassed * model["avg_tokens"])
+        return {
+            "answers": answers,
+            "bypass_rate": round(bypassed / answers, 4) if answers else 0.0,
+            "grounded_rate": round(sources["grounded"]["count"] / answers, 4) if answers else 0.0,
+            "estimated_saved_ms": saved_ms,
+            "estimated_saved_tokens": saved_tokens,
+            "sources": sources,
+        }
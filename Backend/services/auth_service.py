@@ -0,0 +1,78 @@
+"""
+Service layer for user authentication.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Set
+from database.supabase_db import SupabaseCatFactsDB
+from services.password_hasher import PasswordHashingService
+from services.token_service import TokenService
+
+logger = logging.getLogger(__name__)
+
+
+class AuthService:
+    """Service class for signup and login."""
+
+    def __init__(self, db: SupabaseCatFactsDB, hashing: PasswordHashingService, tokens: TokenService):
+        """Initialize the service with a database instance, password hasher and token issuer."""
+        self.db = db
+        self.hashing = hashing
+        self.tokens = tokens
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    async def signup(self, username: str, email: str, password: str) -> Dict[str, Any]:
+        """Hash the password off the event loop and create the user."""
+        password_hash = await self.hashing.hash_password(password)
+        result = self.db.create_user(username=username, email=email, password_hash=password_hash)
+        if result["success"]:
+            result["token"] = self.tokens.issue(result["data"])
+        return result
+
+    async def login(self, username: str, password: str) -> Dict[str, Any]:
+        """Authenticate a user with username/email and password."""
+        invalid = {
+            "success": False,
+            "message": "Invalid username or password",
+            "status": "invalid_credentials"
+        }
+
+        user = self.db.get_user_for_login(username)
+        if not user:
+            return invalid
+
+        password_hash = user.pop('password_hash', None)
+        valid, needs_rehash = await self.hashing.verify_password(password, password_hash)
+        if not valid:
+            return invalid
+
+        if needs_rehash:
+            # Upgrade legacy or under-strength hashes without delaying the response
+            task = asyncio.create_task(self._rehash(user['id'], password))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+        logger.info("Successfully authenticated user: %s", user['username'])
+        return {
+            "success": True,
+            "message": "Authentication successful",
+            "status": "success",
+            "data": user,
+            "token": self.tokens.issue(user)
+        }
+
+    def logout(self, claims: Dict[str, Any]) -> bool:
+        """Revoke the presented token everywhere."""
+        self.tokens.revoke(claims)
+        expires_at = datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+        return self.db.revoke_token(claims["jti"], expires_at)
+
+    async def _rehash(self, user_id: str, password: str):
+        """Store a fresh hash for a user whose hash used outdated parameters."""
+        try:
+            password_hash = await self.hashing.hash_password(password)
+            if self.db.update_password_hash(user_id, password_hash):
+                logger.info("Upgraded password hash for user: %s", user_id)
+        except Exception as e:
+            logger.warning(f"Failed to upgrade password hash for user {user_id}: {e}")
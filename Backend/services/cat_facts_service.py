@@ -1,12 +1,29 @@
 """
 Service layer for cat facts business logic.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
+import asyncio
 import logging
+import os
+import uuid
+import resilience
+from config import config
 from database.supabase_db import SupabaseCatFactsDB
-from Models.cat_facts_models import CatFactResponse, CatFactCreateResponse, CatFactLikeResponse, CatFactDeleteResponse
+from services.fact_catalog import FactCatalog
+from services.fact_search import FactIndex
+from services.catalog_sync import CatalogSync
+from services.leaderboard import Leaderboard
+from services.trending import TrendingFeed
+from services.no_repeat import NoRepeatSampler
+from services.liked_facts import LikedFactsCache
+from tracing import span, traced
+from Models.cat_facts_models import (
+    CatFactResponse, CatFactCreateResponse, CatFactLikeResponse, CatFactDeleteResponse,
+    CatFactBatchItem, CatFactBatchResponse, TrendingFactResponse
+)
 from constants import ERROR_MESSAGES, SUCCESS_MESSAGES
+from exceptions import DatabaseException, ValidationException
 
 logger = logging.getLogger(__name__)
 
@@ -14,52 +31,286 @@ logger = logging.getLogger(__name__)
 class CatFactsService:
     """Service class for cat facts operations."""
     
-    def __init__(self, db: SupabaseCatFactsDB):
-        """Initialize the service with a database instance."""
+    def __init__(self, db: SupabaseCatFactsDB, catalog: FactCatalog = None):
+        """Initialize the service with a database instance and an in-memory catalog."""
         self.db = db
+        self.catalog = catalog or FactCatalog()
+        self.sync = CatalogSync(db, self.catalog)
+        self.leaderboard = Leaderboard(max(config.LEADERBOARD_CAPACITY, config.LEADERBOARD_MAX_N))
+        self.trending = TrendingFeed(db)
+        self.no_repeat = NoRepeatSampler(config.RANDOM_NO_REPEAT_MAX_VIEWERS)
+        self.fact_index = FactIndex()
+        self.liked_facts = LikedFactsCache(
+            db.get_liked_fact_ids, config.LIKED_FACTS_CACHE_USERS, config.LIKED_FACTS_CACHE_TTL_SECONDS
+        )
+        self.sync.add_listener(self.apply_fact_events)
     
-    def get_all_facts(self) -> List[CatFactResponse]:
-        """Get all cat facts from the database."""
+    def warm_up(self):
+        """Load the catalog (including the random-sampling ID array) before serving."""
+        if self.catalog.is_fresh():
+            # Another worker already published a shared catalog
+            return
+        self.warm_up_from_db()
+    
+    def ensure_warm(self):
+        """Warm the catalog if it has never been loaded (used as a readiness probe)."""
+        if not self.catalog.is_loaded:
+            self.warm_up()
+    
+    def restore_snapshot(self, path: str) -> bool:
+        """Map the on-disk catalog snapshot so reads can be served before the database answers."""
+        return self.catalog.restore_snapshot(path)
+    
+    def save_snapshot(self, path: str):
+        """Write the current catalog to disk for the next cold start."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.catalog.save_snapshot(path)
+    
+    async def reconcile_in_background(self, retry_seconds: float = 5):
+        """Replace a restored snapshot with database state, retrying until Supabase answers."""
+        while True:
+            try:
+                await asyncio.to_thread(self.warm_up_from_db)
+                return
+            except Exception as e:
+                logger.warning(f"Catalog reconcile failed, retrying in {retry_seconds}s: {e}")
+                await asyncio.sleep(retry_seconds)
+    
+    def warm_up_from_db(self):
+        """Unconditionally reload the catalog from the database."""
+        self.sync.full_load()
+        logger.info(f"Catalog loaded from database ({len(self.catalog)} facts)")
+    
+    async def run_snapshot_writer(self, path: str, interval: float):
+        """Persist the catalog every ``interval`` seconds; run as a background task."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.save_snapshot, path)
+            except Exception as e:
+                logger.warning(f"Failed to write catalog snapshot to {path}: {e}")
+    
+    def reconcile_leaderboard(self):
+        """Reload the top-liked board from the database, correcting any drift."""
+        self.leaderboard.load(self.db.get_top_liked_facts(self.leaderboard.capacity))
+    
+    async def run_leaderboard_reconcile(self, interval: float):
+        """Reconcile the leaderboard every ``interval`` seconds; run as a background task."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reconcile_leaderboard)
+            except Exception as e:
+                logger.warning(f"Leaderboard reconcile failed: {e}")
+    
+    def apply_fact_events(self, events: List[Dict[str, Any]]):
+        """Keep derived views (leaderboard, trending) in step with changes from the feed."""
+        for event in events:
+            data = event["data"]
+            if event["type"] == "fact_deleted":
+                self.leaderboard.remove(data["id"])
+                self.trending.ranker.remove(data["id"])
+            elif event["type"] == "fact_added":
+                self.leaderboard.update(data)
+            elif event["type"] == "likes_changed":
+                row = self.catalog.get(data["id"])
+                if row is not None:
+                    self.leaderboard.update(dict(row, likes_count=data["likes_count"]))
+    
+    def _track_likes(self, fact_id: str):
+        """Push a locally changed like count into the leaderboard."""
+        row = self.catalog.get(fact_id)
+        if row is not None:
+            self.leaderboard.update(row)
+    
+    def _fresh_catalog(self) -> FactCatalog:
+        """Return the catalog, reloading it from the database if the change feed has fallen behind."""
+        if not self.catalog.is_fresh():
+            if self.catalog.is_loaded and resilience.is_open("supabase"):
+                # Supabase is known to be down; serve last-known-good without trying it
+                resilience.mark_stale(self.catalog.age_seconds())
+                return self.catalog
+            try:
+                self.sync.full_load()
+            except DatabaseException as e:
+                # Stale data beats an error page; the next read retries the reload
+                if not self.catalog.is_loaded:
+                    raise
+                logger.warning(f"Serving stale catalog: {e}")
+                resilience.mark_stale(self.catalog.age_seconds())
+        return self.catalog
+    
+    def _liked_set(self, user_id: Optional[str]) -> Optional[Set[str]]:
+        """The caller's liked fact IDs, or ``None`` for anonymous callers (no ``liked_by_me``)."""
+        if not user_id:
+            return None
         try:
-            facts_data = self.db.get_all_facts()
-            return [CatFactResponse(**fact) for fact in facts_data]
+            return self.liked_facts.liked(user_id)
+        except DatabaseException as e:
+            # The facts themselves can still be served; use the last set we saw, or omit liked_by_me
+            logger.warning(f"Serving stale liked facts for user {user_id}: {e}")
+            known = self.liked_facts.last_known(user_id)
+            if known is None:
+                return None
+            resilience.mark_stale(known[0])
+            return known[1]
+    
+    @staticmethod
+    def _response(row: Dict[str, Any], liked: Optional[Set[str]], model=CatFactResponse, **extra):
+        liked_by_me = str(row["id"]) in liked if liked is not None else None
+        return model.from_row(row, liked_by_me=liked_by_me, **extra)
+    
+    @traced("service")
+    def get_all_facts(self, user_id: Optional[str] = None) -> List[CatFactResponse]:
+        """Get all cat facts."""
+        try:
+            catalog = self._fresh_catalog()
+            with span("catalog.all_rows"):
+                facts_data = catalog.all_rows()
+            liked = self._liked_set(user_id)
+            with span("model.build", count=len(facts_data)):
+                return [self._response(fact, liked) for fact in facts_data]
         except Exception as e:
             logger.error(f"Error fetching all facts: {e}")
             raise
     
-    def get_random_fact(self) -> Optional[CatFactResponse]:
-        """Get a random cat fact from the database."""
+    @traced("service")
+    def get_random_fact(self, viewer: Optional[str] = None, user_id: Optional[str] = None) -> Optional[CatFactResponse]:
+        """Get a random cat fact; with a ``viewer`` key, one that viewer has not seen yet."""
         try:
-            fact_data = self.db.get_random_fact()
+            catalog = self._fresh_catalog()
+            fact_data = self.no_repeat.draw(viewer, catalog) if viewer else catalog.random_row()
             if fact_data:
-                return CatFactResponse(**fact_data)
+                return self._response(fact_data, self._liked_set(user_id))
             return None
         except Exception as e:
             logger.error(f"Error fetching random fact: {e}")
             raise
     
-    def get_fact_by_id(self, fact_id: str) -> Optional[CatFactResponse]:
+    @traced("service")
+    def get_fact_by_id(self, fact_id: str, user_id: Optional[str] = None) -> Optional[CatFactResponse]:
         """Get a specific cat fact by ID."""
         try:
-            fact_data = self.db.get_fact_by_id(fact_id)
+            # Facts created on other instances may not be cached yet, so fall back to the DB
+            fact_data = self._fresh_catalog().get(fact_id) or self.db.get_fact_by_id(fact_id)
             if fact_data:
-                return CatFactResponse(**fact_data)
+                return self._response(fact_data, self._liked_set(user_id))
             return None
         except Exception as e:
             logger.error(f"Error fetching fact by ID {fact_id}: {e}")
             raise
     
+    @traced("service")
+    def get_facts_by_ids(self, fact_ids: List[str], user_id: Optional[str] = None) -> CatFactBatchResponse:
+        """Resolve several IDs at once; results follow request order with explicit misses."""
+        if len(fact_ids) > config.BATCH_MAX_IDS:
+            raise ValidationException(f"Too many IDs. Maximum {config.BATCH_MAX_IDS} per request.")
+        try:
+            catalog = self._fresh_catalog()
+            canonical: Dict[str, Optional[str]] = {}
+            found: Dict[str, Dict[str, Any]] = {}
+            for fact_id in dict.fromkeys(fact_ids):
+                try:
+                    canonical[fact_id] = key = str(uuid.UUID(fact_id))
+                except ValueError:
+                    # Malformed IDs never reach the database
+                    canonical[fact_id] = None
+                    continue
+                row = catalog.get(key)
+                if row is not None:
+                    found[key] = row
+            
+            # Anything the catalog does not know yet is resolved with one IN query
+            missing = [key for key in canonical.values() if key is not None and key not in found]
+            if missing:
+                for row in self.db.get_facts_by_ids(missing):
+                    found[str(row["id"])] = row
+            
+            liked = self._liked_set(user_id)
+            results = []
+            for fact_id in fact_ids:
+                key = canonical[fact_id]
+                if key is None:
+                    results.append(CatFactBatchItem(id=fact_id, status="invalid_id"))
+                elif key in found:
+                    results.append(CatFactBatchItem(id=fact_id, status="found", fact=self._response(found[key], liked)))
+                else:
+                    results.append(CatFactBatchItem(id=fact_id, status="not_found"))
+            return CatFactBatchResponse(
+                results=results,
+                found_count=sum(1 for item in results if item.fact is not None)
+            )
+        except Exception as e:
+            logger.error(f"Error fetching {len(fact_ids)} facts by ID: {e}")
+            raise
+    
+    @traced("service")
+    def search_facts(self, question: str, k: int) -> List[Tuple[float, int, Dict[str, Any]]]:
+        """Catalog facts matching a free-text question as ``(confidence, matched terms, row)``, best first."""
+        try:
+            catalog = self._fresh_catalog()
+            with span("catalog.search"):
+                return self.fact_index.search(catalog, question, k)
+        except Exception as e:
+            logger.error(f"Error searching facts: {e}")
+            raise
+    
+    @traced("service")
+    def get_top_facts(self, n: int, user_id: Optional[str] = None) -> List[CatFactResponse]:
+        """The ``n`` most-liked facts, served from the in-memory leaderboard."""
+        if not 1 <= n <= config.LEADERBOARD_MAX_N:
+            raise ValidationException(f"n must be between 1 and {config.LEADERBOARD_MAX_N}")
+        try:
+            rows = self.leaderboard.top(n)
+            if rows is None:
+                # Not loaded yet, or too many entries dropped since the last reconcile
+                self.reconcile_leaderboard()
+                rows = self.leaderboard.top(n) or []
+            liked = self._liked_set(user_id)
+            with span("model.build", count=len(rows)):
+                return [self._response(row, liked) for row in rows]
+        except Exception as e:
+            logger.error(f"Error fetching top facts: {e}")
+            raise
+    
+    @traced("service")
+    def get_trending_facts(self, n: int, user_id: Optional[str] = None) -> List[TrendingFactResponse]:
+        """The ``n`` facts with the highest time-decayed like velocity."""
+        if not 1 <= n <= config.TRENDING_MAX_N:
+            raise ValidationException(f"n must be between 1 and {config.TRENDING_MAX_N}")
+        try:
+            catalog = self._fresh_catalog()
+            liked = self._liked_set(user_id)
+            facts = []
+            # Read past n so facts deleted since their likes were counted can be skipped
+            for fact_id, score in self.trending.ranker.top(self.trending.ranker.capacity):
+                row = catalog.get(fact_id)
+                if row is None:
+                    continue
+                facts.append(self._response(row, liked, TrendingFactResponse, trending_score=round(score, 4)))
+                if len(facts) == n:
+                    break
+            return facts
+        except Exception as e:
+            logger.error(f"Error fetching trending facts: {e}")
+            raise
+    
+    @traced("service")
     def create_fact(self, fact: str) -> CatFactCreateResponse:
         """Create a new cat fact."""
         try:
             result = self.db.insert_fact(fact)
             
             if result["success"]:
+                if result.get("data"):
+                    self.catalog.upsert(result["data"])
                 return CatFactCreateResponse(
                     success=True,
                     message=SUCCESS_MESSAGES["fact_added"],
                     status="success",
-                    data=CatFactResponse(**result["data"]) if result.get("data") else None
+                    data=CatFactResponse.from_row(result["data"]) if result.get("data") else None
                 )
             else:
                 return CatFactCreateResponse(
@@ -77,15 +328,26 @@ class CatFactsService:
                 data=None
             )
     
-    def like_fact(self, fact_id: str, user_id: str = None) -> CatFactLikeResponse:
-        """Like a cat fact."""
+    def _likes_count(self, fact_id: str) -> Optional[int]:
+        row = self.catalog.get(fact_id)
+        return row.get("likes_count") if row is not None else None
+    
+    @traced("service")
+    def like_fact(self, fact_id: str, user_id: str) -> CatFactLikeResponse:
+        """Like a cat fact as ``user_id``; liking an already-liked fact changes nothing."""
         try:
             result = self.db.like_fact(fact_id, user_id)
             
             if result["success"]:
+                if result.get("added"):
+                    self.catalog.adjust_likes(fact_id, 1)
+                    self._track_likes(fact_id)
+                self.liked_facts.record(user_id, fact_id, True)
                 return CatFactLikeResponse(
                     success=True,
-                    message=SUCCESS_MESSAGES["fact_liked"]
+                    message=SUCCESS_MESSAGES["fact_liked"],
+                    liked=True,
+                    likes_count=self._likes_count(fact_id)
                 )
             else:
                 return CatFactLikeResponse(
@@ -99,15 +361,22 @@ class CatFactsService:
                 message=ERROR_MESSAGES["failed_to_like_fact"]
             )
     
-    def unlike_fact(self, fact_id: str, user_id: str = None) -> CatFactLikeResponse:
-        """Unlike a cat fact."""
+    @traced("service")
+    def unlike_fact(self, fact_id: str, user_id: str) -> CatFactLikeResponse:
+        """Remove ``user_id``'s like; unliking a fact that is not liked changes nothing."""
         try:
             result = self.db.unlike_fact(fact_id, user_id)
             
             if result["success"]:
+                if result.get("removed"):
+                    self.catalog.adjust_likes(fact_id, -1)
+                    self._track_likes(fact_id)
+                self.liked_facts.record(user_id, fact_id, False)
                 return CatFactLikeResponse(
                     success=True,
-                    message=SUCCESS_MESSAGES["fact_unliked"]
+                    message=SUCCESS_MESSAGES["fact_unliked"],
+                    liked=False,
+                    likes_count=self._likes_count(fact_id)
                 )
             else:
                 return CatFactLikeResponse(
@@ -121,12 +390,16 @@ class CatFactsService:
                 message=ERROR_MESSAGES["failed_to_unlike_fact"]
             )
     
+    @traced("service")
     def delete_fact(self, fact_id: str) -> CatFactDeleteResponse:
         """Soft delete a cat fact."""
         try:
             result = self.db.delete_fact(fact_id)
             
             if result["success"]:
+                self.catalog.remove(fact_id)
+                self.leaderboard.remove(fact_id)
+                self.trending.ranker.remove(fact_id)
                 return CatFactDeleteResponse(
                     success=True,
                     message=SUCCESS_MESSAGES["fact_deleted"]
@@ -143,6 +416,7 @@ class CatFactsService:
                 message=ERROR_MESSAGES["failed_to_delete_fact"]
             )
     
+    @traced("service")
     def fact_exists(self, fact: str) -> bool:
         """Check if a fact already exists in the database."""
         try:
@@ -0,0 +1,207 @@
+"""
+Binary snapshot format for the fact catalog.
+
+Layout (little endian)::
+
+    header   magic "CATS", format version, record size, generation,
+             published_at, record count, strings size, index offset,
+             strings offset
+    records  fixed-size, newest first: id, text offset/length, created_at (us),
+             likes_count, flags
+    index    (id, record position) pairs sorted by id, for binary search
+    strings  UTF-8 fact text, concatenated
+
+A snapshot is read straight out of an ``mmap`` so any number of processes can
+share a single copy; nothing is decoded until a row is actually requested.
+``likes_count`` and ``flags`` are the only fields updated in place. The same
+file doubles as the on-disk snapshot a fresh instance maps at boot; the
+generation/published_at pair is its version stamp, and a file whose size does
+not match its header is rejected rather than partially served.
+"""
+import mmap
+import os
+import shutil
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+MAGIC = b"CATS"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHHQdIIQQ")
+RECORD = struct.Struct("<16sIIqiI")
+INDEX_ENTRY = struct.Struct("<16sI")
+
+FLAG_DELETED = 1
+
+_LIKES_OFFSET = 16 + 4 + 4 + 8
+_FLAGS_OFFSET = _LIKES_OFFSET + 4
+_GENERATION_OFFSET = 8
+_PUBLISHED_AT_OFFSET = 16
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_micros(value: Any) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def encode_catalog(rows: List[Dict[str, Any]], generation: int, published_at: float) -> bytes:
+    """Serialize catalog rows into the snapshot format."""
+    entries = sorted(
+        ((uuid.UUID(str(row["id"])).bytes, _to_micros(row["created_at"]), row) for row in rows),
+        key=lambda entry: entry[1],
+        reverse=True
+    )
+
+    count = len(entries)
+    index_offset = HEADER.size + count * RECORD.size
+    strings_offset = index_offset + count * INDEX_ENTRY.size
+
+    records = bytearray()
+    strings = bytearray()
+    for id_bytes, created_at, row in entries:
+        text = row["fact"].encode("utf-8")
+        records += RECORD.pack(id_bytes, len(strings), len(text), created_at, row.get("likes_count") or 0, 0)
+        strings += text
+
+    index = bytearray()
+    for position, (id_bytes, _, _) in sorted(enumerate(entries), key=lambda item: item[1][0]):
+        index += INDEX_ENTRY.pack(id_bytes, position)
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, RECORD.size, generation, published_at,
+        count, len(strings), index_offset, strings_offset
+    )
+    return bytes(header + records + index + strings)
+
+
+def write_snapshot(
+    path: str,
+    rows: List[Dict[str, Any]],
+    generation: int,
+    published_at: float,
+    durable: bool = False
+):
+    """Atomically replace the snapshot at ``path``; open mappings keep the old file alive."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_catalog(rows, generation, published_at))
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def copy_snapshot(src: str, dst: str, generation: int, published_at: float = None, durable: bool = False):
+    """Atomically copy a snapshot, restamping its generation (and optionally published_at)."""
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp_path)
+    with open(tmp_path, "r+b") as f:
+        f.seek(_GENERATION_OFFSET)
+        f.write(struct.pack("<Q", generation))
+        if published_at is not None:
+            f.seek(_PUBLISHED_AT_OFFSET)
+            f.write(struct.pack("<d", published_at))
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    CatalogSnapshot.open(tmp_path, writable=False)
+    os.replace(tmp_path, dst)
+
+
+class CatalogSnapshot:
+    """Read access (plus in-place like/flag updates) over a mapped snapshot."""
+
+    def __init__(self, buffer: mmap.mmap):
+        if len(buffer) < HEADER.size:
+            raise ValueError("Truncated catalog snapshot")
+        (magic, version, record_size, self.generation, self.published_at,
+         self.count, strings_size, self._index_offset, self._strings_offset) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+            raise ValueError("Unsupported catalog snapshot format")
+        if (self._index_offset != HEADER.size + self.count * RECORD.size
+                or self._strings_offset != self._index_offset + self.count * INDEX_ENTRY.size
+                or len(buffer) != self._strings_offset + strings_size):
+            raise ValueError("Corrupt catalog snapshot")
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+
+    @classmethod
+    def open(cls, path: str, writable: bool = True) -> "CatalogSnapshot":
+        """Map a snapshot file shared with every other process mapping it."""
+        with open(path, "r+b" if writable else "rb") as f:
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            return cls(mmap.mmap(f.fileno(), 0, access=access))
+
+    def _record_offset(self, position: int) -> int:
+        return HEADER.size + position * RECORD.size
+
+    def row(self, position: int) -> Dict[str, Any]:
+        """Decode a single record."""
+        id_bytes, text_offset, text_len, created_at, likes_count, _ = RECORD.unpack_from(
+            self._buffer, self._record_offset(position)
+        )
+        start = self._strings_offset + text_offset
+        return {
+            "id": str(uuid.UUID(bytes=id_bytes)),
+            "fact": str(self._view[start:start + text_len], "utf-8"),
+            "created_at": _from_micros(created_at),
+            "likes_count": likes_count
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Live records, newest first."""
+        for position in range(self.count):
+            if not self.is_deleted(position):
+                yield self.row(position)
+
+    def find(self, fact_id: str) -> Optional[int]:
+        """Binary search the ID index; returns the record position."""
+        try:
+            target = uuid.UUID(fact_id).bytes
+        except (ValueError, AttributeError, TypeError):
+            return None
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            offset = self._index_offset + mid * INDEX_ENTRY.size
+            key = self._buffer[offset:offset + 16]
+            if key < target:
+                low = mid + 1
+            elif key > target:
+                high = mid
+            else:
+                return INDEX_ENTRY.unpack_from(self._buffer, offset)[1]
+        return None
+
+    def likes(self, position: int) -> int:
+        return struct.unpack_from("<i", self._buffer, self._record_offset(position) + _LIKES_OFFSET)[0]
+
+    def set_likes(self, position: int, likes_count: int):
+        struct.pack_into("<i", self._buffer, self._record_offset(position) + _LIKES_OFFSET, likes_count)
+
+    def is_deleted(self, position: int) -> bool:
+        offset = self._record_offset(position) + _FLAGS_OFFSET
+        return bool(struct.unpack_from("<I", self._buffer, offset)[0] & FLAG_DELETED)
+
+    def mark_deleted(self, position: int):
+        offset = self._record_offset(position) + _FLAGS_OFFSET
+        flags = struct.unpack_from("<I", self._buffer, offset)[0]
+        struct.pack_into("<I", self._buffer, offset, flags | FLAG_DELETED)
+
+    def touch(self, published_at: float):
+        """Restamp the snapshot as current without rewriting it."""
+        struct.pack_into("<d", self._buffer, _PUBLISHED_AT_OFFSET, published_at)
+        self.published_at = published_at
+
+    def live_count(self) -> int:
+        return sum(1 for position in range(self.count) if not self.is_deleted(position))
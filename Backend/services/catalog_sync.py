@@ -0,0 +1,146 @@
+"""
+Incremental catalog sync driven by ``updated_at`` watermarks.
+
+Rather than re-downloading every fact on each refresh, the sync engine polls
+``cat_facts`` for rows whose ``updated_at`` is at or after the last one it has
+seen and applies just those deltas to the catalog. Likes are covered too: the
+``fact_likes`` trigger updates ``likes_count`` and the ``cat_facts`` trigger
+bumps ``updated_at`` with it; soft deletes arrive as rows with ``is_active``
+false.
+
+``updated_at`` is stamped with the writer's transaction start time, so a
+transaction that commits late can land behind a watermark we already passed.
+Each poll therefore starts ``overlap_seconds`` before the watermark; rows seen
+twice are applied idempotently. Pages are walked with an ``(updated_at, id)``
+keyset so a bulk update sharing one timestamp cannot stall the cursor.
+
+Every worker polls the feed, because every worker has live-update subscribers,
+but only the catalog owner (the shared catalog leader, or the sole worker)
+applies it. Each change is also turned into a compact fact event for
+listeners such as the SSE broadcaster.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Watermark used when the table is empty
+_EPOCH = "1970-01-01T00:00:00+00:00"
+
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def latest_update(rows: List[Dict[str, Any]]) -> Optional[str]:
+    """The newest ``updated_at`` among ``rows`` (``None`` if none carry one)."""
+    stamps = [row["updated_at"] for row in rows if row.get("updated_at")]
+    return max(stamps, key=_parse_timestamp) if stamps else None
+
+
+class CatalogSync:
+    """Keeps a ``FactCatalog``/``SharedFactCatalog`` in step with the database."""
+
+    def __init__(self, db, catalog, batch_size: int = None, overlap_seconds: float = None):
+        self.db = db
+        self.catalog = catalog
+        self.batch_size = batch_size or config.CATALOG_SYNC_BATCH_SIZE
+        self.overlap_seconds = overlap_seconds if overlap_seconds is not None else config.CATALOG_SYNC_OVERLAP_SECONDS
+        self.watermark: Optional[str] = None
+        self.listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        # fact ID -> updated_at already turned into an event (covers the overlap window)
+        self._emitted: Dict[str, str] = {}
+
+    @property
+    def owns_catalog(self) -> bool:
+        """Only the shared catalog leader applies changes; followers read its mapping."""
+        return getattr(self.catalog, "is_leader", True)
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        """Register a callback receiving each batch of fact events (called on the event loop)."""
+        self.listeners.append(listener)
+
+    def full_load(self):
+        """Reload every active fact and restart the watermark from them."""
+        rows = self.db.get_all_facts()
+        self.catalog.load(rows)
+        self.watermark = latest_update(rows) or self.watermark or _EPOCH
+
+    def sync_once(self) -> List[Dict[str, Any]]:
+        """Pull changes since the watermark, apply them if we own the catalog, and return them as events."""
+        owner = self.owns_catalog
+        if owner and (self.watermark is None or not self.catalog.is_loaded or self.catalog.from_snapshot):
+            self.full_load()
+            return []
+        if self.watermark is None:
+            self.watermark = self.db.get_latest_fact_change() or _EPOCH
+            return []
+
+        lower_bound = _parse_timestamp(self.watermark) - timedelta(seconds=self.overlap_seconds)
+        since, after_id = lower_bound.isoformat(), None
+        events: List[Dict[str, Any]] = []
+        applied = 0
+        while True:
+            page = self.db.get_fact_changes(since, after_id, self.batch_size)
+            if page:
+                if owner:
+                    applied += len(self.catalog.apply_changes(page))
+                events.extend(self._to_events(page, lower_bound))
+                last = page[-1]
+                since, after_id = last["updated_at"], str(last["id"])
+                self.watermark = latest_update([{"updated_at": self.watermark}, last])
+            if len(page) < self.batch_size:
+                break
+
+        if owner:
+            self.catalog.mark_synced()
+        self._emitted = {
+            fact_id: stamp for fact_id, stamp in self._emitted.items()
+            if _parse_timestamp(stamp) >= lower_bound
+        }
+        if applied:
+            logger.info(f"Catalog sync applied {applied} changes (watermark {self.watermark})")
+        return events
+
+    def _to_events(self, rows: List[Dict[str, Any]], lower_bound: datetime) -> List[Dict[str, Any]]:
+        """Compact fact events for rows not already reported."""
+        events = []
+        for row in rows:
+            fact_id = str(row["id"])
+            if self._emitted.get(fact_id) == row["updated_at"]:
+                continue
+            self._emitted[fact_id] = row["updated_at"]
+            if not row.get("is_active", True):
+                events.append({"type": "fact_deleted", "data": {"id": fact_id}})
+            elif _parse_timestamp(row["created_at"]) >= lower_bound:
+                # Created inside this poll window, so subscribers cannot have it yet
+                events.append({"type": "fact_added", "data": {
+                    "id": fact_id,
+                    "fact": row["fact"],
+                    "created_at": row["created_at"],
+                    "likes_count": row.get("likes_count") or 0
+                }})
+            else:
+                events.append({"type": "likes_changed", "data": {
+                    "id": fact_id, "likes_count": row.get("likes_count") or 0
+                }})
+        return events
+
+    async def run(self, interval: float = None):
+        """Poll for changes forever; run as a background task."""
+        interval = interval or config.CATALOG_SYNC_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                events = await asyncio.to_thread(self.sync_once)
+            except Exception as e:
+                logger.warning(f"Catalog sync failed, retrying in {interval}s: {e}")
+                continue
+            if events:
+                for listener in self.listeners:
+                    listener(events)
@@ -0,0 +1,218 @@
+"""
+In-process copy of the active cat fact catalog.
+
+Reads (list, by ID, random) are served from memory while the copy is fresh;
+writes made through this process are applied in place so the copy stays
+consistent without a full reload. Facts are also kept in a dense ID array so
+random sampling is O(1).
+
+Changes made elsewhere arrive as deltas from ``CatalogSync``; a full reload
+only happens when the sync falls behind by more than the TTL.
+
+At boot the catalog can instead be backed by a memory-mapped on-disk
+snapshot, served zero-copy until the first database load replaces it.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import config
+from services.catalog_snapshot import CatalogSnapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class FactCatalog:
+    """Thread-safe in-memory catalog of active facts."""
+
+    def __init__(self, ttl_seconds: float = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.CATALOG_TTL_SECONDS
+        self._lock = threading.Lock()
+        self._facts: Dict[str, Dict[str, Any]] = {}
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._ordered: Optional[List[Dict[str, Any]]] = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self.version = 0
+        # Bumped only when the set of facts changes (not for like counts)
+        self.membership_version = 0
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    @property
+    def from_snapshot(self) -> bool:
+        """Whether reads are still served from the boot snapshot."""
+        return self._snapshot is not None
+
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl_seconds
+
+    def age_seconds(self) -> float:
+        """Seconds since the catalog was last loaded or synced."""
+        return time.monotonic() - self.loaded_at if self.loaded_at is not None else 0.0
+
+    def __len__(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.live_count() if snapshot is not None else len(self._ids)
+
+    def restore_snapshot(self, path: str) -> bool:
+        """Serve reads from an on-disk snapshot until the database has been loaded."""
+        try:
+            snapshot = CatalogSnapshot.open(path, writable=False)
+        except (FileNotFoundError, ValueError) as e:
+            logger.info(f"No usable catalog snapshot at {path}: {e}")
+            return False
+        with self._lock:
+            self._snapshot = snapshot
+            self._facts, self._ids, self._positions, self._ordered = {}, [], {}, None
+            self.version = snapshot.generation
+            self.membership_version += 1
+            # Counted as fresh for one TTL; the background reconcile replaces it well before
+            self.loaded_at = time.monotonic()
+        logger.info(
+            f"Restored catalog snapshot generation {snapshot.generation} "
+            f"({snapshot.count} facts, {time.time() - snapshot.published_at:.0f}s old)"
+        )
+        return True
+
+    def save_snapshot(self, path: str):
+        """Persist the database-loaded catalog for the next cold start."""
+        with self._lock:
+            if self._snapshot is not None or not self.is_loaded:
+                return
+            # Copied under the lock: syncs resize the dict and likes edit rows in place
+            rows = [dict(row) for row in self._facts.values()]
+            version = self.version
+        write_snapshot(path, rows, version, time.time(), durable=True)
+
+    def _materialize(self):
+        """Decode the boot snapshot into mutable rows before the first local write (lock held)."""
+        snapshot, self._snapshot = self._snapshot, None
+        if snapshot is None:
+            return
+        self._facts = {row["id"]: row for row in snapshot.rows()}
+        self._ids = list(self._facts)
+        self._positions = {fact_id: i for i, fact_id in enumerate(self._ids)}
+
+    def load(self, rows: List[Dict[str, Any]]):
+        """Replace the catalog with a full set of rows."""
+        facts = {str(row["id"]): row for row in rows}
+        ids = list(facts)
+        with self._lock:
+            self._snapshot = None
+            self._facts = facts
+            self._ids = ids
+            self._positions = {fact_id: i for i, fact_id in enumerate(ids)}
+            self._ordered = None
+            self.version += 1
+            self.membership_version += 1
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Force the next read to reload from the database."""
+        self.loaded_at = None
+
+    def all_rows(self) -> List[Dict[str, Any]]:
+        """All active facts, newest first."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return list(snapshot.rows())
+        ordered = self._ordered
+        if ordered is None:
+            with self._lock:
+                if self._ordered is None:
+                    self._ordered = sorted(
+                        self._facts.values(), key=lambda row: row["created_at"], reverse=True
+                    )
+                ordered = self._ordered
+        return ordered
+
+    def get(self, fact_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            position = snapshot.find(fact_id)
+            return snapshot.row(position) if position is not None else None
+        return self._facts.get(fact_id)
+
+    def random_row(self) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.row(random.randrange(snapshot.count)) if snapshot.count else None
+        ids = self._ids
+        if not ids:
+            return None
+        return self._facts.get(ids[random.randrange(len(ids))])
+
+    def _upsert(self, fact_id: str, row: Dict[str, Any]):
+        if fact_id not in self._facts:
+            self._positions[fact_id] = len(self._ids)
+            self._ids.append(fact_id)
+            self.membership_version += 1
+        self._facts[fact_id] = row
+        self._ordered = None
+        self.version += 1
+
+    def _remove(self, fact_id: str) -> bool:
+        """Drop a fact, keeping the ID array dense by swapping in the last entry."""
+        if self._facts.pop(fact_id, None) is None:
+            return False
+        position = self._positions.pop(fact_id)
+        last = self._ids.pop()
+        if last != fact_id:
+            self._ids[position] = last
+            self._positions[last] = position
+        self._ordered = None
+        self.version += 1
+        self.membership_version += 1
+        return True
+
+    def upsert(self, row: Dict[str, Any]):
+        """Add or replace a single fact."""
+        with self._lock:
+            self._materialize()
+            self._upsert(str(row["id"]), row)
+
+    def remove(self, fact_id: str):
+        """Drop a single fact."""
+        with self._lock:
+            self._materialize()
+            self._remove(fact_id)
+
+    def apply_changes(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply changed rows from the sync feed; returns those that actually changed the catalog."""
+        applied = []
+        with self._lock:
+            self._materialize()
+            for row in rows:
+                fact_id = str(row["id"])
+                if not row.get("is_active", True):
+                    if self._remove(fact_id):
+                        applied.append(row)
+                    continue
+                current = self._facts.get(fact_id)
+                if (current is not None and current["fact"] == row["fact"]
+                        and current.get("likes_count") == row.get("likes_count")):
+                    continue
+                self._upsert(fact_id, {key: value for key, value in row.items() if key != "is_active"})
+                applied.append(row)
+        return applied
+
+    def mark_synced(self):
+        """Record that the catalog was just brought up to date incrementally."""
+        self.loaded_at = time.monotonic()
+
+    def adjust_likes(self, fact_id: str, delta: int):
+        """Apply a like/unlike to the cached like count."""
+        with self._lock:
+            self._materialize()
+            row = self._facts.get(fact_id)
+            if row is None:
+                return
+            # Updated in place: ordering is by created_at, so the sorted view stays valid
+            row["likes_count"] = max(0, (row.get("likes_count") or 0) + delta)
+            self.version += 1
@@ -0,0 +1,137 @@
+"""
+Server-Sent Events fan-out for live fact updates.
+
+Each event is encoded to its SSE wire form once and the same bytes are
+appended to every subscriber's buffer, so publishing costs one deque append
+per subscriber. An idle subscriber is just a coroutine parked on an
+``asyncio.Event``, which keeps thousands of them per worker cheap.
+
+Buffers are bounded: a subscriber that falls ``queue_size`` events behind is
+evicted (told to reconnect) instead of letting its backlog grow without limit.
+A short replay ring lets reconnecting clients resume from ``Last-Event-ID``.
+Event IDs are prefixed with a per-process stream token, so a client that
+reconnects to a different worker, or has missed more than the ring holds,
+gets a ``reset`` event and refetches the list instead.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import secrets
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from config import config
+from exceptions import ServiceOverloadedException
+
+logger = logging.getLogger(__name__)
+
+_HEARTBEAT = b": keep-alive\n\n"
+
+
+def encode_event(event_id: str, event_type: str, data: Dict[str, Any]) -> bytes:
+    """Encode one event in the SSE wire format."""
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+
+
+class Subscriber:
+    """A connected client's bounded outbound buffer."""
+
+    __slots__ = ("buffer", "wakeup", "evicted")
+
+    def __init__(self):
+        self.buffer: Deque[bytes] = deque()
+        self.wakeup = asyncio.Event()
+        self.evicted = False
+
+
+class FactEventBroadcaster:
+    """Publishes fact events to every connected SSE subscriber."""
+
+    def __init__(
+        self,
+        max_subscribers: int = None,
+        queue_size: int = None,
+        heartbeat_seconds: float = None,
+        replay_size: int = None
+    ):
+        self.max_subscribers = max_subscribers or config.SSE_MAX_SUBSCRIBERS
+        self.queue_size = queue_size or config.SSE_QUEUE_SIZE
+        self.heartbeat_seconds = heartbeat_seconds or config.SSE_HEARTBEAT_SECONDS
+        self._subscribers: Set[Subscriber] = set()
+        self._replay: Deque[Tuple[int, bytes]] = deque(maxlen=replay_size or config.SSE_REPLAY_SIZE)
+        self._stream = secrets.token_hex(4)
+        self._ids = itertools.count(1)
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, events: List[Dict[str, Any]]):
+        """Fan a batch of ``{"type", "data"}`` events out to all subscribers (event loop only)."""
+        for event in events:
+            event_id = next(self._ids)
+            chunk = encode_event(f"{self._stream}-{event_id}", event["type"], event["data"])
+            self._replay.append((event_id, chunk))
+            for subscriber in self._subscribers:
+                if subscriber.evicted:
+                    continue
+                if len(subscriber.buffer) >= self.queue_size:
+                    # Slow consumer: drop it rather than buffer without bound
+                    subscriber.evicted = True
+                    subscriber.buffer.clear()
+                    self.evictions += 1
+                else:
+                    subscriber.buffer.append(chunk)
+                subscriber.wakeup.set()
+
+    def _replay_since(self, last_event_id: Optional[str]) -> List[bytes]:
+        """Events after ``last_event_id``, or a reset if they are no longer buffered."""
+        if not last_event_id:
+            return []
+        stream, _, last = last_event_id.partition("-")
+        if stream != self._stream or not last.isdigit():
+            return [encode_event(self._latest_id(), "reset", {})]
+        last = int(last)
+        if not self._replay or last >= self._replay[-1][0]:
+            return []
+        if last < self._replay[0][0] - 1:
+            return [encode_event(self._latest_id(), "reset", {})]
+        return [chunk for event_id, chunk in self._replay if event_id > last]
+
+    def _latest_id(self) -> str:
+        return f"{self._stream}-{self._replay[-1][0] if self._replay else 0}"
+
+    def subscribe(self) -> Subscriber:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise ServiceOverloadedException("Too many live update subscribers")
+        subscriber = Subscriber()
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    async def stream(self, subscriber: Subscriber, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Yield SSE chunks for ``subscriber`` until it disconnects or is evicted."""
+        try:
+            yield f"retry: {config.SSE_RETRY_MS}\n\n".encode()
+            for chunk in self._replay_since(last_event_id):
+                yield chunk
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield _HEARTBEAT
+                    continue
+                subscriber.wakeup.clear()
+                if subscriber.evicted:
+                    # Deliberately not resumable: the reconnect gets a reset
+                    yield encode_event(f"{self._stream}-0", "evicted", {"reason": "slow_consumer"})
+                    return
+                if subscriber.buffer:
+                    chunks, subscriber.buffer = b"".join(subscriber.buffer), deque()
+                    yield chunks
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,149 @@
+"""
+Keyword search over the fact catalog, used to answer chat questions without the LLM.
+
+Facts are tokenized (lowercased, stop words and the ubiquitous "cat" dropped,
+a light suffix strip so "sleeps"/"sleeping" meet "sleep") into an inverted
+index ranked with BM25. The index is rebuilt when the catalog's
+``membership_version`` moves; hits are re-read through ``catalog.get`` so
+facts deleted in place never surface.
+
+Hits are ranked by BM25 but returned with a ``confidence`` in [0, 1] instead,
+since BM25 scores are not comparable across questions: the share of the
+question's IDF weight the fact covers times the share of the fact's IDF
+weight the question covers. A fact matching only the common words of a
+question scores low, and so does a fact that says much more than was asked
+("not eating" against "should not eat chocolate or onions"). Each hit also
+reports how many distinct question terms it matched, so a single shared word
+can be kept from deciding an answer on its own.
+
+Negations are content terms, not stop words: "n't" contractions and
+"no"/"never"/"without" all index as "not", so "not eating" and "eating" are
+different questions.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+_STOP_WORDS = frozenset("""
+    a about after all also am an and any are as at be because been before being
+    but by can could did do does doing for from had has have having he her his
+    how i if in into is it its just me more most my of on or our out over
+    she should so some such than that the their them then there these they this
+    those to too up us very was we were what when where which while who whom why
+    will with would you your tell know much many long each every often get make
+    cat cats kitty kitties kitten kittens feline felines
+""".split())
+
+# Indexed as "not"; the apostrophe splits "don't" into "don" and a dropped "t"
+_NEGATIONS = frozenset("""
+    no not never nor none nothing without cannot cant aren couldn didn doesn don
+    hadn hasn haven isn shouldn wasn weren won wouldn
+""".split())
+
+# BM25 parameters (the usual defaults)
+_K1 = 1.2
+_B = 0.75
+
+
+def _stem(word: str) -> str:
+    """Strip the most common English suffixes; only has to be consistent, not correct."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Content terms of ``text`` in order (duplicates kept)."""
+    return [
+        "not" if word in _NEGATIONS else _stem(word) for word in _WORD.findall(text.lower())
+        if word not in _STOP_WORDS and len(word) > 1
+    ]
+
+
+class FactIndex:
+    """BM25 index over a catalog's facts, rebuilt when its membership changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._membership_version: Optional[int] = None
+        self._ids: List[str] = []
+        self._lengths: List[int] = []
+        # Total IDF weight of each fact's distinct terms
+        self._weights: List[float] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._average_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _build(self, catalog):
+        """Index every fact currently in ``catalog`` (lock held)."""
+        ids: List[str] = []
+        lengths: List[int] = []
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        version = catalog.membership_version
+        for row in catalog.all_rows():
+            terms = tokenize(row.get("fact") or "")
+            position = len(ids)
+            ids.append(str(row["id"]))
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                postings[term].append((position, count))
+        self._ids, self._lengths, self._postings = ids, lengths, dict(postings)
+        self._average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        weights = [0.0] * len(ids)
+        for term, entries in self._postings.items():
+            idf = self._idf(term)
+            for position, _ in entries:
+                weights[position] += idf
+        self._weights = weights
+        self._membership_version = version
+
+    def _idf(self, term: str) -> float:
+        documents = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._ids) - documents + 0.5) / (documents + 0.5))
+
+    def search(self, catalog, question: str, k: int) -> List[Tuple[float, int, Dict[str, Any]]]:
+        """Up to ``k`` ``(confidence, matched terms, row)`` hits for ``question``, best BM25 first."""
+        with self._lock:
+            if self._membership_version != catalog.membership_version:
+                self._build(catalog)
+            ids, lengths, postings, fact_weights = self._ids, self._lengths, self._postings, self._weights
+            average_length = self._average_length or 1.0
+
+            terms = set(tokenize(question))
+            if not terms or not ids:
+                return []
+            weights = {term: self._idf(term) for term in terms}
+            total_weight = sum(weights.values())
+
+            scores: Dict[int, float] = defaultdict(float)
+            covered: Dict[int, float] = defaultdict(float)
+            matched: Dict[int, int] = defaultdict(int)
+            for term, weight in weights.items():
+                for position, count in postings.get(term, ()):
+                    norm = _K1 * (1 - _B + _B * lengths[position] / average_length)
+                    scores[position] += weight * count * (_K1 + 1) / (count + norm)
+                    covered[position] += weight
+                    matched[position] += 1
+
+        hits = []
+        for position in sorted(scores, key=scores.get, reverse=True):
+            row = catalog.get(ids[position])
+            if row is None:
+                continue
+            confidence = (covered[position] / total_weight) * (covered[position] / fact_weights[position])
+            hits.append((min(1.0, confidence), matched[position], row))
+            if len(hits) >= k:
+                break
+        return hits
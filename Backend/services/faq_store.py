@@ -0,0 +1,115 @@
+"""
+Precomputed answers to frequent chat questions.
+
+``precompute_faq.py`` fills a JSON file of answers keyed by normalized
+question; the API loads it and serves matching questions without calling
+OpenAI. Each entry records the fingerprint (model, system prompt and
+sampling settings) it was generated with, and entries whose fingerprint no
+longer matches the running configuration are ignored until the job
+regenerates them.
+
+The file is written atomically by the job and re-read by the API when its
+mtime changes (checked at most every ``reload_seconds``), so a fresh batch
+goes live without a restart.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive key for a question."""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", question.lower())).strip()
+
+
+def answer_fingerprint(model: str, system_prompt: str, max_tokens: int, temperature: float) -> str:
+    """Short hash of everything that shapes a generated answer."""
+    material = json.dumps([model, system_prompt, max_tokens, temperature])
+    return hashlib.sha256(material.encode()).hexdigest()[:16]
+
+
+class FAQStore:
+    """Normalized question -> precomputed answer entry, backed by a JSON file."""
+
+    def __init__(self, path: str, reload_seconds: float = 30):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self._entries, self._mtime = {}, None
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f).get("answers", {})
+        except (OSError, ValueError) as e:
+            # Keep serving what we had; the job replaces the file atomically
+            logger.warning("Could not read FAQ answers from %s: %s", self.path, e)
+            return
+        self._entries, self._mtime = entries, mtime
+        logger.info("Loaded %d precomputed FAQ answers from %s", len(entries), self.path)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_seconds:
+            return
+        with self._lock:
+            if now - self._checked_at >= self.reload_seconds:
+                self._checked_at = now
+                self._load()
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        return self._entries
+
+    def lookup(self, question: str, fingerprint: str) -> Optional[str]:
+        """The stored answer for ``question`` if it was generated with ``fingerprint``."""
+        self._maybe_reload()
+        entry = self._entries.get(normalize_question(question))
+        if entry is None or entry.get("fingerprint") != fingerprint:
+            return None
+        return entry["answer"]
+
+    def put(self, question: str, answer: str, fingerprint: str):
+        """Add or replace an entry in memory (call ``save`` to persist)."""
+        with self._lock:
+            self._entries[normalize_question(question)] = {
+                "question": question,
+                "answer": answer,
+                "fingerprint": fingerprint,
+                "generated_at": time.time(),
+            }
+
+    def save(self):
+        """Write all entries atomically."""
+        with self._lock:
+            payload = json.dumps({"answers": self._entries}, indent=2, ensure_ascii=False)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(temporary, self.path)
+            self._mtime = os.stat(self.path).st_mtime
@@ -0,0 +1,77 @@
+"""
+Service layer for liveness and readiness reporting.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyProbe:
+    """A blocking health check whose result is cached and refreshed at most once per ``ttl``."""
+
+    def __init__(self, name: str, check: Callable[[], Any], ttl_seconds: float, required: bool = True):
+        self.name = name
+        self.check = check
+        self.ttl_seconds = ttl_seconds
+        self.required = required
+        self.healthy: Optional[bool] = None
+        self.detail = "not checked"
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def status(self) -> bool:
+        """Return the cached result, re-probing (once, for all waiters) when it is stale."""
+        if self.healthy is not None and time.monotonic() - self.checked_at < self.ttl_seconds:
+            return self.healthy
+        async with self._lock:
+            if self.healthy is None or time.monotonic() - self.checked_at >= self.ttl_seconds:
+                try:
+                    await asyncio.to_thread(self.check)
+                    self.healthy, self.detail = True, "connected"
+                except Exception as e:
+                    logger.warning(f"Readiness probe '{self.name}' failed: {e}")
+                    self.healthy, self.detail = False, "unreachable"
+                self.checked_at = time.monotonic()
+        return self.healthy
+
+
+class HealthService:
+    """Tracks startup progress and dependency health."""
+
+    def __init__(self):
+        self.started = False
+        self.startup_error: Optional[str] = None
+        self.probes: Dict[str, DependencyProbe] = {}
+
+    def add_probe(self, name: str, check: Callable[[], Any], ttl_seconds: float, required: bool = True):
+        self.probes[name] = DependencyProbe(name, check, ttl_seconds, required)
+
+    def mark_started(self):
+        """Called once warm-up has finished."""
+        self.started = True
+
+    def mark_failed(self, reason: str):
+        self.startup_error = reason
+
+    async def readiness(self) -> Dict[str, Any]:
+        """Whether this instance can serve traffic, with per-dependency details."""
+        checks: Dict[str, str] = {}
+        ready = self.started and self.startup_error is None
+
+        if self.startup_error:
+            checks["startup"] = self.startup_error
+        else:
+            checks["startup"] = "complete" if self.started else "warming_up"
+
+        if self.started:
+            results = await asyncio.gather(*(probe.status() for probe in self.probes.values()))
+            for probe, healthy in zip(self.probes.values(), results):
+                checks[probe.name] = probe.detail
+                if probe.required and not healthy:
+                    ready = False
+
+        return {"ready": ready, "checks": checks}
+
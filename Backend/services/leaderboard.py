@@ -0,0 +1,104 @@
+"""
+Incrementally maintained top-liked leaderboard.
+
+Holds the ``capacity`` most-liked facts in a list kept sorted by
+``(-likes_count, id)``, so a page of the top ``n`` is a slice. Each like or
+unlike moves one entry (a bisect plus a short list shift), independent of
+catalog size.
+
+Invariant: every fact that is *not* on the board has no more likes than the
+last entry. A like can promote an outside fact past the tail safely, but an
+entry that falls below the tail could be overtaken by facts we are not
+tracking, so it is dropped instead. ``capacity`` carries some slack beyond the
+largest page served so those drops rarely matter, and a periodic reconcile
+(one indexed ``ORDER BY likes_count DESC LIMIT capacity`` query) refills the
+board and corrects any drift.
+"""
+import bisect
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, str]
+
+
+def _key(row: Dict[str, Any]) -> Key:
+    return -(row.get("likes_count") or 0), str(row["id"])
+
+
+class Leaderboard:
+    """Bounded, ordered top-liked facts."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._keys: List[Key] = []
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        # True when the board holds every liked fact, so it can grow past its tail freely
+        self.exhaustive = False
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: List[Dict[str, Any]]):
+        """Replace the board with the database's current top facts."""
+        liked = [row for row in rows if (row.get("likes_count") or 0) > 0][:self.capacity]
+        with self._lock:
+            self._rows = {str(row["id"]): self._entry(row) for row in liked}
+            self._keys = sorted(_key(row) for row in self._rows.values())
+            self.exhaustive = len(rows) < self.capacity
+            self.loaded = True
+
+    @staticmethod
+    def _entry(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": str(row["id"]),
+            "fact": row["fact"],
+            "created_at": row["created_at"],
+            "likes_count": row.get("likes_count") or 0
+        }
+
+    def _discard(self, fact_id: str) -> Optional[Key]:
+        row = self._rows.pop(fact_id, None)
+        if row is None:
+            return None
+        key = _key(row)
+        del self._keys[bisect.bisect_left(self._keys, key)]
+        return key
+
+    def update(self, row: Dict[str, Any]):
+        """Apply a fact's new absolute like count."""
+        if not self.loaded:
+            return
+        fact_id = str(row["id"])
+        key = _key(row)
+        with self._lock:
+            tail = self._keys[-1] if self._keys else None
+            was_on_board = self._discard(fact_id) is not None
+            if key[0] == 0:
+                return
+            position = bisect.bisect_left(self._keys, key)
+            if position == len(self._keys) and not self.exhaustive:
+                # Past the tail: only safe if it was already the tail (or ties it)
+                if tail is None or key > tail or not was_on_board:
+                    return
+            self._keys.insert(position, key)
+            self._rows[fact_id] = self._entry(row)
+            if len(self._keys) > self.capacity:
+                _, dropped = self._keys.pop()
+                self._rows.pop(dropped, None)
+                self.exhaustive = False
+
+    def remove(self, fact_id: str):
+        with self._lock:
+            self._discard(fact_id)
+
+    def top(self, n: int) -> Optional[List[Dict[str, Any]]]:
+        """The ``n`` most-liked facts, or ``None`` if the board cannot answer without a reconcile."""
+        with self._lock:
+            if not self.loaded or (len(self._keys) < n and not self.exhaustive):
+                return None
+            return [self._rows[fact_id] for _, fact_id in self._keys[:n]]
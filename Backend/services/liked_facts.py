@@ -0,0 +1,56 @@
+"""
+Per-user liked-fact sets for rendering ``liked_by_me``.
+
+A user's liked fact IDs are fetched with one query the first time they are
+needed, then kept in an LRU (bounded by ``max_users``) so flagging a whole
+page is a set lookup per fact. This worker's own like/unlike calls update
+the set in place; ``ttl_seconds`` bounds how stale it can get after likes
+made through other workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Set, Tuple
+
+
+class LikedFactsCache:
+    """LRU of user ID -> set of liked fact IDs."""
+
+    def __init__(self, loader: Callable[[str], Iterable[str]], max_users: int, ttl_seconds: float):
+        self.loader = loader
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sets: "OrderedDict[str, Tuple[float, Set[str]]]" = OrderedDict()
+
+    def liked(self, user_id: str) -> Set[str]:
+        """The fact IDs ``user_id`` has liked (loaded once per TTL)."""
+        with self._lock:
+            entry = self._sets.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._sets.move_to_end(user_id)
+                return entry[1]
+        liked = {str(fact_id) for fact_id in self.loader(user_id)}
+        with self._lock:
+            self._sets[user_id] = (time.monotonic(), liked)
+            self._sets.move_to_end(user_id)
+            if len(self._sets) > self.max_users:
+                self._sets.popitem(last=False)
+        return liked
+
+    def last_known(self, user_id: str) -> Optional[Tuple[float, Set[str]]]:
+        """``(age in seconds, liked IDs)`` of the cached set, even if expired, for when loading fails."""
+        with self._lock:
+            entry = self._sets.get(user_id)
+        return (time.monotonic() - entry[0], entry[1]) if entry is not None else None
+
+    def record(self, user_id: str, fact_id: str, liked: bool):
+        """Apply this worker's own like/unlike to a cached set, if present."""
+        with self._lock:
+            entry = self._sets.get(user_id)
+            if entry is None:
+                return
+            if liked:
+                entry[1].add(fact_id)
+            else:
+                entry[1].discard(fact_id)
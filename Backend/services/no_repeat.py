@@ -0,0 +1,145 @@
+"""
+Per-viewer no-repeat random facts.
+
+Every fact gets a stable ordinal (append-only; deleted facts leave a
+tombstone) and each viewer's seen facts are a bitmap over those ordinals, so
+a viewer costs about one bit per fact rather than a list of IDs.
+
+Draws are uniform over the unseen facts. While at least a quarter of the
+catalog is unseen, rejection sampling needs at most four tries on average.
+Past that point the viewer gets an explicit list of its unseen ordinals
+(built once, O(n), then popped in O(1)). When nothing is left the viewer's
+bitmap is reset. Viewers are kept in an LRU of bounded size.
+"""
+import random
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Rejection sampling is used while at least 1/_DENSE_FACTOR of the facts are unseen
+_DENSE_FACTOR = 4
+_MAX_REJECTIONS = 32
+
+
+class SeenFacts:
+    """Bitmap of the ordinals a viewer has already been shown."""
+
+    __slots__ = ("bits", "count", "remaining", "remaining_version")
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.count = 0
+        self.remaining: Optional[array] = None
+        self.remaining_version = -1
+
+    def has(self, ordinal: int) -> bool:
+        index = ordinal >> 3
+        return index < len(self.bits) and bool(self.bits[index] >> (ordinal & 7) & 1)
+
+    def add(self, ordinal: int):
+        index = ordinal >> 3
+        if index >= len(self.bits):
+            self.bits.extend(bytes(index + 1 - len(self.bits)))
+        self.bits[index] |= 1 << (ordinal & 7)
+        self.count += 1
+
+    def clear(self):
+        self.bits = bytearray()
+        self.count = 0
+        self.remaining = None
+
+
+class NoRepeatSampler:
+    """Draws random facts a viewer has not seen yet."""
+
+    def __init__(self, max_viewers: int):
+        self.max_viewers = max_viewers
+        self._lock = threading.Lock()
+        self._viewers: "OrderedDict[str, SeenFacts]" = OrderedDict()
+        self._ids: List[Optional[str]] = []
+        self._ordinals: Dict[str, int] = {}
+        self._live = 0
+        self._membership_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._viewers)
+
+    def _sync(self, catalog):
+        """Assign ordinals to new facts and tombstone removed ones (lock held)."""
+        current = {str(row["id"]) for row in catalog.all_rows()}
+        for fact_id, ordinal in self._ordinals.items():
+            if fact_id not in current and self._ids[ordinal] is not None:
+                self._ids[ordinal] = None
+        for fact_id in current:
+            ordinal = self._ordinals.get(fact_id)
+            if ordinal is None:
+                self._ordinals[fact_id] = len(self._ids)
+                self._ids.append(fact_id)
+            elif self._ids[ordinal] is None:
+                self._ids[ordinal] = fact_id
+        self._live = len(current)
+        self._membership_version = catalog.membership_version
+
+    def _viewer(self, key: str) -> SeenFacts:
+        seen = self._viewers.get(key)
+        if seen is None:
+            seen = self._viewers[key] = SeenFacts()
+            if len(self._viewers) > self.max_viewers:
+                self._viewers.popitem(last=False)
+        else:
+            self._viewers.move_to_end(key)
+        return seen
+
+    def _take(self, seen: SeenFacts, ordinal: int, catalog) -> Optional[Dict[str, Any]]:
+        fact_id = self._ids[ordinal]
+        if fact_id is None or seen.has(ordinal):
+            return None
+        row = catalog.get(fact_id)
+        if row is None:
+            # Deleted in place (shared catalog); tombstone it for everyone
+            self._ids[ordinal] = None
+            self._live -= 1
+            return None
+        seen.add(ordinal)
+        return row
+
+    def _draw_unseen(self, seen: SeenFacts, catalog) -> Optional[Dict[str, Any]]:
+        total = len(self._ids)
+        if total and (self._live - seen.count) * _DENSE_FACTOR >= self._live:
+            for _ in range(_MAX_REJECTIONS):
+                row = self._take(seen, random.randrange(total), catalog)
+                if row is not None:
+                    return row
+
+        for _ in range(2):
+            if seen.remaining is None or seen.remaining_version != self._membership_version:
+                seen.remaining = array("I", (
+                    ordinal for ordinal in range(total)
+                    if self._ids[ordinal] is not None and not seen.has(ordinal)
+                ))
+                seen.remaining_version = self._membership_version
+            remaining = seen.remaining
+            while remaining:
+                index = random.randrange(len(remaining))
+                ordinal = remaining[index]
+                remaining[index] = remaining[-1]
+                remaining.pop()
+                row = self._take(seen, ordinal, catalog)
+                if row is not None:
+                    return row
+            # Rebuild once in case facts were added since the list was built
+            seen.remaining = None
+        return None
+
+    def draw(self, key: str, catalog) -> Optional[Dict[str, Any]]:
+        """A uniformly random fact ``key`` has not seen; starts over once all have been seen."""
+        with self._lock:
+            if self._membership_version != catalog.membership_version:
+                self._sync(catalog)
+            seen = self._viewer(key)
+            row = self._draw_unseen(seen, catalog)
+            if row is None and seen.count:
+                seen.clear()
+                row = self._draw_unseen(seen, catalog)
+            return row
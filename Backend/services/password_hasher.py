@@ -0,0 +1,271 @@
+"""
+Password hashing subsystem.
+
+Hashers are small picklable objects so the expensive key derivation can run in
+a process pool instead of on the event loop. ``PasswordHashingService`` owns
+that pool, caps how many hashes may be in flight at once and tunes the work
+factor of the preferred hasher against a target latency at startup.
+"""
+import abc
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from config import config
+from exceptions import ServiceOverloadedException
+
+logger = logging.getLogger(__name__)
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+class PasswordHasher(abc.ABC):
+    """Base class for password hashers."""
+
+    algorithm: str = ""
+
+    @abc.abstractmethod
+    def hash(self, password: str) -> str:
+        """Hash ``password`` with a fresh salt into a self-describing string."""
+
+    @abc.abstractmethod
+    def verify(self, password: str, encoded: str) -> bool:
+        """Whether ``password`` matches ``encoded``; ``False`` for malformed input."""
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """Whether ``encoded`` was produced with weaker parameters than ours."""
+        return False
+
+    def tuned(self, target_seconds: float) -> "PasswordHasher":
+        """Return a copy whose work factor takes roughly ``target_seconds``."""
+        return self
+
+
+class PBKDF2Hasher(PasswordHasher):
+    """PBKDF2-HMAC-SHA256 hasher (``pbkdf2_sha256$iterations$salt$hash``)."""
+
+    algorithm = "pbkdf2_sha256"
+    min_iterations = 100_000
+    max_iterations = 5_000_000
+
+    def __init__(self, iterations: int = 600_000):
+        self.iterations = iterations
+
+    def _derive(self, password: str, salt: bytes, iterations: int) -> bytes:
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        digest = self._derive(password, salt, self.iterations)
+        return f"{self.algorithm}${self.iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            _, iterations, salt, digest = encoded.split("$", 3)
+            candidate = self._derive(password, _b64decode(salt), int(iterations))
+            return hmac.compare_digest(candidate, _b64decode(digest))
+        except (ValueError, TypeError):
+            return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        try:
+            return int(encoded.split("$", 2)[1]) < self.iterations
+        except (IndexError, ValueError):
+            return True
+
+    def tuned(self, target_seconds: float) -> "PBKDF2Hasher":
+        sample = 20_000
+        start = time.perf_counter()
+        self._derive("calibration", b"0" * 16, sample)
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        iterations = int(sample * target_seconds / elapsed)
+        iterations = max(self.min_iterations, min(self.max_iterations, iterations))
+        return PBKDF2Hasher(iterations=iterations)
+
+
+class ScryptHasher(PasswordHasher):
+    """scrypt hasher (``scrypt$n$r$p$salt$hash``)."""
+
+    algorithm = "scrypt"
+    min_log_n = 14
+    max_log_n = 20
+
+    def __init__(self, n: int = 2 ** 15, r: int = 8, p: int = 1):
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r + 1024 * 1024, dklen=32
+        )
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{self.algorithm}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            _, n, r, p, salt, digest = encoded.split("$", 5)
+            candidate = self._derive(password, _b64decode(salt), int(n), int(r), int(p))
+            return hmac.compare_digest(candidate, _b64decode(digest))
+        except (ValueError, TypeError):
+            return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        try:
+            _, n, r, p = encoded.split("$", 4)[:4]
+            return (int(n), int(r), int(p)) < (self.n, self.r, self.p)
+        except ValueError:
+            return True
+
+    def tuned(self, target_seconds: float) -> "ScryptHasher":
+        start = time.perf_counter()
+        self._derive("calibration", b"0" * 16, 2 ** self.min_log_n, self.r, self.p)
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        log_n = self.min_log_n
+        # scrypt cost is linear in n, so double n while we stay under target
+        while log_n < self.max_log_n and elapsed * 2 <= target_seconds:
+            elapsed *= 2
+            log_n += 1
+        return ScryptHasher(n=2 ** log_n, r=self.r, p=self.p)
+
+
+class LegacySHA256Hasher(PasswordHasher):
+    """Verifier for the original single-round ``salt$sha256(password + salt)`` hashes."""
+
+    algorithm = "legacy_sha256"
+
+    def hash(self, password: str) -> str:
+        raise ValueError("Legacy SHA-256 hashes must not be created")
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            salt, hash_value = encoded.split("$", 1)
+        except ValueError:
+            return False
+        digest = hashlib.sha256((password + salt).encode("utf-8")).hexdigest()
+        return hmac.compare_digest(digest, hash_value)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return True
+
+
+HASHERS: Dict[str, type] = {
+    PBKDF2Hasher.algorithm: PBKDF2Hasher,
+    ScryptHasher.algorithm: ScryptHasher,
+}
+
+
+def identify_hasher(encoded: str, preferred: PasswordHasher) -> PasswordHasher:
+    """Pick the hasher able to verify ``encoded``."""
+    algorithm = encoded.split("$", 1)[0]
+    if algorithm == preferred.algorithm:
+        return preferred
+    if algorithm in HASHERS:
+        return HASHERS[algorithm]()
+    return LegacySHA256Hasher()
+
+
+def _hash_in_worker(hasher: PasswordHasher, password: str) -> str:
+    return hasher.hash(password)
+
+
+def _verify_in_worker(hasher: PasswordHasher, password: str, encoded: str) -> bool:
+    return hasher.verify(password, encoded)
+
+
+def _tune_in_worker(hasher: PasswordHasher, target_seconds: float) -> PasswordHasher:
+    return hasher.tuned(target_seconds)
+
+
+class PasswordHashingService:
+    """Runs password hashing in a bounded process pool off the event loop."""
+
+    def __init__(
+        self,
+        algorithm: str = None,
+        workers: int = None,
+        max_concurrency: int = None,
+        queue_timeout: float = None,
+        target_ms: int = None
+    ):
+        algorithm = algorithm or config.PASSWORD_HASH_ALGORITHM
+        if algorithm not in HASHERS:
+            raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+        self.hasher: PasswordHasher = HASHERS[algorithm]()
+        self.workers = workers or config.PASSWORD_HASH_WORKERS
+        self.queue_timeout = queue_timeout or config.PASSWORD_HASH_QUEUE_TIMEOUT
+        self.target_seconds = (target_ms or config.PASSWORD_HASH_TARGET_MS) / 1000
+        self._semaphore = asyncio.Semaphore(max_concurrency or config.PASSWORD_HASH_MAX_CONCURRENCY)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        """Run ``func`` in the pool, waiting at most ``queue_timeout`` for a slot."""
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ServiceOverloadedException("Too many concurrent authentication requests")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        except BrokenProcessPool:
+            # A crashed worker poisons the pool; start a fresh one next time
+            self._executor = None
+            raise
+        finally:
+            self._semaphore.release()
+
+    async def calibrate(self):
+        """Tune the preferred hasher's work factor against the target latency."""
+        try:
+            self.hasher = await self._run(_tune_in_worker, self.hasher, self.target_seconds)
+            logger.info("Password hasher calibrated: %s", vars(self.hasher))
+        except Exception as e:
+            logger.warning(f"Password hasher calibration failed, using defaults: {e}")
+
+    async def hash_password(self, password: str) -> str:
+        """Hash a password with the preferred hasher."""
+        return await self._run(_hash_in_worker, self.hasher, password)
+
+    async def verify_password(self, password: str, encoded: str) -> Tuple[bool, bool]:
+        """Verify a password, returning ``(valid, needs_rehash)``."""
+        if not encoded:
+            return False, False
+        hasher = identify_hasher(encoded, self.hasher)
+        valid = await self._run(_verify_in_worker, hasher, password, encoded)
+        if not valid:
+            return False, False
+        return True, hasher is not self.hasher or self.hasher.needs_rehash(encoded)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
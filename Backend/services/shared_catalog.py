@@ -0,0 +1,277 @@
+"""
+Catalog shared between pre-forked workers through a memory-mapped snapshot.
+
+All workers map the same ``catalog.bin`` (under ``SHARED_CATALOG_DIR``,
+normally ``/dev/shm``), so the catalog exists once per container rather than
+once per worker. Coordination uses a tiny ``control.bin`` block holding the
+published generation and an invalidation counter:
+
+* one worker holds ``leader.lock`` and is the only one that refreshes the
+  snapshot from Supabase on the normal TTL; followers only reload themselves
+  if the snapshot gets much older than that (e.g. the leader died);
+* like counts and deletes are written straight into the shared mapping;
+* inserts bump the invalidation counter, and the leader republishes;
+* the leader also applies the incremental change feed (``CatalogSync``),
+  patching in place where it can and republishing only for new facts.
+"""
+import contextlib
+import fcntl
+import glob
+import logging
+import mmap
+import os
+import random
+import struct
+import time
+from typing import Any, Dict, List, Optional
+
+from config import config
+from services.catalog_snapshot import CatalogSnapshot, copy_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+CONTROL = struct.Struct("<QQ")
+
+SNAPSHOT_FILE = "catalog.bin"
+CONTROL_FILE = "control.bin"
+LEADER_FILE = "leader.lock"
+
+# Followers only refresh on their own once the snapshot is this many TTLs old
+FOLLOWER_STALENESS_FACTOR = 3
+
+
+def reset_shared_files(directory: str):
+    """Remove the files a previous run left in ``directory`` (and nothing else there)."""
+    os.makedirs(directory, exist_ok=True)
+    names = [SNAPSHOT_FILE, CONTROL_FILE, LEADER_FILE]
+    # Temporary snapshots from a writer that died mid-publish
+    leftovers = glob.glob(os.path.join(glob.escape(directory), f"{SNAPSHOT_FILE}.*.tmp"))
+    names += [os.path.basename(path) for path in leftovers]
+    for name in names:
+        try:
+            os.unlink(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+class SharedFactCatalog:
+    """Drop-in replacement for ``FactCatalog`` backed by a shared snapshot."""
+
+    def __init__(self, directory: str = None, ttl_seconds: float = None):
+        self.directory = directory or config.SHARED_CATALOG_DIR
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.CATALOG_TTL_SECONDS
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, SNAPSHOT_FILE)
+
+        self._control_fd = os.open(os.path.join(self.directory, CONTROL_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._control_fd).st_size < CONTROL.size:
+                os.ftruncate(self._control_fd, CONTROL.size)
+        self._control = mmap.mmap(self._control_fd, CONTROL.size)
+
+        self._leader_fd = os.open(os.path.join(self.directory, LEADER_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        self.is_leader = False
+        self._last_election = 0.0
+        self._try_lead()
+
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._handled_invalidations = 0
+        self._seen_invalidations = 0
+        self._restored_generation: Optional[int] = None
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Serialize generation bumps and in-place writes across workers."""
+        fcntl.flock(self._control_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._control_fd, fcntl.LOCK_UN)
+
+    def _try_lead(self):
+        self._last_election = time.monotonic()
+        if self.is_leader:
+            return
+        try:
+            fcntl.flock(self._leader_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        self.is_leader = True
+        logger.info(f"Worker {os.getpid()} is the shared catalog leader")
+
+    def _read_control(self):
+        return CONTROL.unpack_from(self._control, 0)
+
+    def _current(self) -> Optional[CatalogSnapshot]:
+        """The mapped snapshot, remapped whenever a newer generation is published."""
+        generation, _ = self._read_control()
+        snapshot = self._snapshot
+        if generation and (snapshot is None or snapshot.generation != generation):
+            try:
+                snapshot = self._snapshot = CatalogSnapshot.open(self.path)
+            except (FileNotFoundError, ValueError) as e:
+                logger.warning(f"Failed to map shared catalog: {e}")
+        return snapshot
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._current() is not None
+
+    @property
+    def version(self) -> int:
+        snapshot = self._current()
+        return snapshot.generation if snapshot else 0
+
+    @property
+    def membership_version(self) -> int:
+        """Changes whenever facts are added (deletes are flagged in place and seen via ``get``)."""
+        return self.version
+
+    def is_fresh(self) -> bool:
+        snapshot = self._current()
+        if snapshot is None:
+            return False
+        if not self.is_leader and time.monotonic() - self._last_election > self.ttl_seconds:
+            self._try_lead()
+
+        age = time.time() - snapshot.published_at
+        if not self.is_leader:
+            return age < self.ttl_seconds * FOLLOWER_STALENESS_FACTOR
+
+        _, invalidations = self._read_control()
+        self._seen_invalidations = invalidations
+        return age < self.ttl_seconds and invalidations == self._handled_invalidations
+
+    def age_seconds(self) -> float:
+        """Seconds since the shared catalog was last published."""
+        snapshot = self._current()
+        return time.time() - snapshot.published_at if snapshot is not None else 0.0
+
+    def load(self, rows: List[Dict[str, Any]]):
+        """Publish a full set of rows as the next generation."""
+        with self._locked():
+            generation, invalidations = self._read_control()
+            write_snapshot(self.path, rows, generation + 1, time.time())
+            CONTROL.pack_into(self._control, 0, generation + 1, invalidations)
+        self._handled_invalidations = self._seen_invalidations
+        logger.info(f"Published shared catalog generation {generation + 1} ({len(rows)} facts)")
+
+    @property
+    def from_snapshot(self) -> bool:
+        return self._restored_generation is not None and self._restored_generation == self.version
+
+    def restore_snapshot(self, path: str) -> bool:
+        """Seed the shared catalog from an on-disk snapshot if nothing is published yet."""
+        with self._locked():
+            generation, invalidations = self._read_control()
+            if generation:
+                return False
+            try:
+                # Restamped as just published so workers serve it while the leader reconciles
+                copy_snapshot(path, self.path, generation + 1, published_at=time.time())
+            except (FileNotFoundError, ValueError) as e:
+                logger.info(f"No usable catalog snapshot at {path}: {e}")
+                return False
+            CONTROL.pack_into(self._control, 0, generation + 1, invalidations)
+        self._restored_generation = generation + 1
+        logger.info(f"Restored shared catalog from snapshot {path}")
+        return True
+
+    def save_snapshot(self, path: str):
+        """Persist the shared catalog (including in-place like counts); leader only."""
+        if not self.is_leader or self.from_snapshot or self._current() is None:
+            return
+        with self._locked():
+            generation, _ = self._read_control()
+            copy_snapshot(self.path, path, generation, durable=True)
+
+    def invalidate(self):
+        """Ask the leader to republish from the database."""
+        with self._locked():
+            generation, invalidations = self._read_control()
+            CONTROL.pack_into(self._control, 0, generation, invalidations + 1)
+
+    def apply_changes(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply changed rows from the sync feed; returns those that actually changed the catalog."""
+        snapshot = self._current()
+        if snapshot is None:
+            return []
+        applied, inserts = [], []
+        with self._locked():
+            for row in rows:
+                position = snapshot.find(str(row["id"]))
+                if not row.get("is_active", True):
+                    if position is not None and not snapshot.is_deleted(position):
+                        snapshot.mark_deleted(position)
+                        applied.append(row)
+                elif position is None or snapshot.is_deleted(position) or snapshot.row(position)["fact"] != row["fact"]:
+                    inserts.append(row)
+                elif snapshot.likes(position) != (row.get("likes_count") or 0):
+                    snapshot.set_likes(position, row.get("likes_count") or 0)
+                    applied.append(row)
+        if inserts:
+            merged = {row["id"]: row for row in snapshot.rows()}
+            merged.update((str(row["id"]), row) for row in inserts)
+            self.load(list(merged.values()))
+            applied.extend(inserts)
+        return applied
+
+    def mark_synced(self):
+        """Restamp the published snapshot so followers keep treating it as fresh."""
+        snapshot = self._current()
+        if snapshot is not None and self.is_leader:
+            with self._locked():
+                snapshot.touch(time.time())
+                # Facts other workers inserted are picked up by the feed rather than a republish
+                self._handled_invalidations = self._read_control()[1]
+
+    def __len__(self) -> int:
+        snapshot = self._current()
+        return snapshot.live_count() if snapshot else 0
+
+    def all_rows(self) -> List[Dict[str, Any]]:
+        snapshot = self._current()
+        return list(snapshot.rows()) if snapshot else []
+
+    def get(self, fact_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        position = snapshot.find(fact_id)
+        if position is None or snapshot.is_deleted(position):
+            return None
+        return snapshot.row(position)
+
+    def random_row(self) -> Optional[Dict[str, Any]]:
+        snapshot = self._current()
+        if snapshot is None or not snapshot.count:
+            return None
+        for _ in range(8):
+            position = random.randrange(snapshot.count)
+            if not snapshot.is_deleted(position):
+                return snapshot.row(position)
+        return next(snapshot.rows(), None)
+
+    def upsert(self, row: Dict[str, Any]):
+        """New facts need a republish; existing ones only carry a like count we can patch."""
+        snapshot = self._current()
+        position = snapshot.find(str(row["id"])) if snapshot else None
+        if position is None:
+            self.invalidate()
+            return
+        with self._locked():
+            snapshot.set_likes(position, row.get("likes_count") or 0)
+
+    def remove(self, fact_id: str):
+        snapshot = self._current()
+        position = snapshot.find(fact_id) if snapshot else None
+        if position is not None:
+            with self._locked():
+                snapshot.mark_deleted(position)
+
+    def adjust_likes(self, fact_id: str, delta: int):
+        snapshot = self._current()
+        position = snapshot.find(fact_id) if snapshot else None
+        if position is not None:
+            with self._locked():
+                snapshot.set_likes(position, max(0, snapshot.likes(position) + delta))
@@ -0,0 +1,146 @@
+"""
+Stateless signed access tokens.
+
+Tokens are HS256 JWTs signed with ``AUTH_TOKEN_SECRET`` so they can be verified
+locally without touching the ``users`` table. Recently verified tokens are kept
+in a small LRU cache and revoked token IDs are refreshed from the database on
+an interval.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from config import config
+from constants import ERROR_MESSAGES
+from exceptions import AuthenticationException
+
+logger = logging.getLogger(__name__)
+
+_HEADER = base64.urlsafe_b64encode(
+    json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode()
+).rstrip(b"=")
+
+
+def _b64url_encode(raw: bytes) -> bytes:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _b64url_decode(value: bytes) -> bytes:
+    return base64.urlsafe_b64decode(value + b"=" * (-len(value) % 4))
+
+
+class TokenService:
+    """Issues and verifies signed access tokens."""
+
+    def __init__(
+        self,
+        secret: str = None,
+        ttl_seconds: int = None,
+        cache_size: int = None,
+        revocation_loader: Callable[[], Iterable[str]] = None
+    ):
+        secret = secret or config.AUTH_TOKEN_SECRET
+        if not secret:
+            if not config.AUTH_ALLOW_RANDOM_SECRET:
+                raise ValueError(ERROR_MESSAGES["auth_secret_missing"])
+            # Development only: tokens will not survive a restart or validate across workers
+            logger.warning("AUTH_TOKEN_SECRET not set - using a random per-process secret (AUTH_ALLOW_RANDOM_SECRET)")
+            secret = secrets.token_urlsafe(32)
+
+        self._key = secret.encode("utf-8")
+        self.ttl_seconds = ttl_seconds or config.AUTH_TOKEN_TTL_SECONDS
+        self.cache_size = cache_size or config.AUTH_TOKEN_CACHE_SIZE
+        self.revocation_loader = revocation_loader
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._revoked: Set[str] = set()
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        return _b64url_encode(hmac.new(self._key, signing_input, hashlib.sha256).digest())
+
+    def issue(self, user: Dict[str, Any]) -> str:
+        """Issue a token for a user row."""
+        now = int(time.time())
+        payload = {
+            "sub": str(user["id"]),
+            "username": user.get("username"),
+            "iat": now,
+            "exp": now + self.ttl_seconds,
+            "jti": secrets.token_hex(8)
+        }
+        signing_input = _HEADER + b"." + _b64url_encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        )
+        return (signing_input + b"." + self._sign(signing_input)).decode("ascii")
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Verify a token and return its claims."""
+        claims = self._cache.get(token)
+        if claims is not None:
+            self._cache.move_to_end(token)
+        else:
+            claims = self._decode(token)
+            self._cache[token] = claims
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if claims["exp"] < time.time():
+            self._cache.pop(token, None)
+            raise AuthenticationException("Token expired")
+        if claims["jti"] in self._revoked:
+            raise AuthenticationException("Token revoked")
+        return claims
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        try:
+            signing_input, signature = token.encode("ascii").rsplit(b".", 1)
+            header, payload = signing_input.split(b".", 1)
+        except (UnicodeEncodeError, ValueError):
+            raise AuthenticationException("Malformed token")
+
+        if header != _HEADER or not hmac.compare_digest(signature, self._sign(signing_input)):
+            raise AuthenticationException("Invalid token signature")
+
+        try:
+            claims = json.loads(_b64url_decode(payload))
+            claims["exp"], claims["jti"], claims["sub"]
+        except (ValueError, KeyError, TypeError):
+            raise AuthenticationException("Malformed token")
+        return claims
+
+    def revoke(self, claims: Dict[str, Any]):
+        """Revoke a token locally; persisting it is up to the caller."""
+        self._revoked.add(claims["jti"])
+
+    def refresh_revocations(self):
+        """Reload the revocation list."""
+        if self.revocation_loader is None:
+            return
+        try:
+            self._revoked = set(self.revocation_loader())
+            logger.debug("Loaded %d revoked tokens", len(self._revoked))
+        except Exception as e:
+            logger.warning(f"Failed to refresh token revocation list: {e}")
+
+    async def run_revocation_refresh(self, interval: float = None):
+        """Refresh the revocation list forever; run as a background task."""
+        interval = interval or config.AUTH_REVOCATION_REFRESH_SECONDS
+        while True:
+            await asyncio.to_thread(self.refresh_revocations)
+            await asyncio.sleep(interval)
+
+
+def extract_bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Return the token from an ``Authorization: Bearer`` header value."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
@@ -0,0 +1,179 @@
+"""
+Trending facts ranked by exponentially time-decayed like velocity.
+
+A fact's trending score is the sum over its likes of ``exp(-λ·age)``, with
+``λ = ln 2 / half-life``. Decaying every score on every tick would be O(N);
+instead each like adds ``exp(λ·(t - t0))`` for a fixed reference time ``t0``.
+Every score is then the true decayed score times the same factor
+``exp(λ·(now - t0))``, so the ranking is identical and a like is an O(1)
+update. When the exponent grows large the scores are rebased onto a new
+``t0`` (a rare O(N) pass).
+
+Because stored scores only ever increase, a bounded top-k list stays exact:
+a fact that is not on the board can only join it by overtaking the tail.
+Deleted facts are removed and the board is refilled from the score table.
+
+Likes come from the ``fact_likes`` insert stream (by ``created_at``). At
+startup the scores are rebuilt from recent history in one streaming pass;
+after that new likes are polled with the same overlap/keyset scheme as the
+catalog change feed.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Rebase once stored scores reach about e^600 (float64 tops out near e^709)
+_MAX_EXPONENT = 600.0
+
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class DecayedTopK:
+    """Lazily decayed scores with an exact top-k board."""
+
+    def __init__(self, half_life_seconds: float, capacity: int, t0: float = None):
+        self.decay = math.log(2) / half_life_seconds
+        self.capacity = capacity
+        self.t0 = time.time() if t0 is None else t0
+        self._lock = threading.Lock()
+        self._scores: Dict[str, float] = {}
+        # (-score, fact_id), ascending == best first
+        self._board: List[Tuple[float, str]] = []
+        self._on_board: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def clear(self):
+        with self._lock:
+            self._scores, self._board, self._on_board = {}, [], {}
+
+    def add(self, fact_id: str, at: float, weight: float = 1.0):
+        """Record one like at unix time ``at``."""
+        with self._lock:
+            exponent = self.decay * (at - self.t0)
+            if exponent > _MAX_EXPONENT:
+                self._rebase(at)
+                exponent = 0.0
+            score = self._scores.get(fact_id, 0.0) + weight * math.exp(exponent)
+            self._scores[fact_id] = score
+            self._promote(fact_id, score)
+
+    def _promote(self, fact_id: str, score: float):
+        old = self._on_board.pop(fact_id, None)
+        if old is not None:
+            del self._board[bisect.bisect_left(self._board, (-old, fact_id))]
+        key = (-score, fact_id)
+        if len(self._board) < self.capacity or key < self._board[-1]:
+            bisect.insort(self._board, key)
+            self._on_board[fact_id] = score
+            if len(self._board) > self.capacity:
+                _, dropped = self._board.pop()
+                del self._on_board[dropped]
+
+    def _rebase(self, t0: float):
+        """Move the reference time forward, rescaling every stored score (lock held)."""
+        factor = math.exp(-self.decay * (t0 - self.t0))
+        self.t0 = t0
+        self._scores = {fact_id: score * factor for fact_id, score in self._scores.items() if score * factor > 0}
+        self._refill()
+
+    def _refill(self):
+        self._board = heapq.nsmallest(self.capacity, ((-score, fact_id) for fact_id, score in self._scores.items()))
+        self._on_board = {fact_id: -neg for neg, fact_id in self._board}
+
+    def remove(self, fact_id: str):
+        with self._lock:
+            if self._scores.pop(fact_id, None) is not None and fact_id in self._on_board:
+                self._refill()
+
+    def top(self, n: int, now: float = None) -> List[Tuple[str, float]]:
+        """The ``n`` best ``(fact_id, decayed score)`` pairs, best first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            scale = math.exp(-self.decay * (now - self.t0))
+            return [(fact_id, -neg * scale) for neg, fact_id in self._board[:n]]
+
+
+class TrendingFeed:
+    """Feeds ``fact_likes`` inserts into a ``DecayedTopK``."""
+
+    def __init__(self, db, ranker: DecayedTopK = None, batch_size: int = None, overlap_seconds: float = None):
+        self.db = db
+        self.ranker = ranker or DecayedTopK(config.TRENDING_HALF_LIFE_HOURS * 3600, config.TRENDING_CAPACITY)
+        self.batch_size = batch_size or config.CATALOG_SYNC_BATCH_SIZE
+        self.overlap_seconds = overlap_seconds if overlap_seconds is not None else config.CATALOG_SYNC_OVERLAP_SECONDS
+        self.watermark: Optional[datetime] = None
+        # like ID -> created_at for likes already counted (covers the overlap window)
+        self._seen: Dict[str, datetime] = {}
+
+    def _consume(self, since: datetime) -> int:
+        """Stream likes created at or after ``since`` into the ranker; returns how many were new."""
+        cursor, after_id = since.isoformat(), None
+        added = 0
+        while True:
+            page = self.db.get_likes_since(cursor, after_id, self.batch_size)
+            for like in page:
+                like_id = str(like["id"])
+                created_at = _parse_timestamp(like["created_at"])
+                if like_id in self._seen:
+                    continue
+                self._seen[like_id] = created_at
+                self.ranker.add(str(like["fact_id"]), created_at.timestamp())
+                if self.watermark is None or created_at > self.watermark:
+                    self.watermark = created_at
+                added += 1
+            if page:
+                cursor, after_id = page[-1]["created_at"], str(page[-1]["id"])
+            if len(page) < self.batch_size:
+                break
+        return added
+
+    def rebuild(self):
+        """Recompute every score from recent like history in one streaming pass."""
+        horizon = timedelta(hours=config.TRENDING_HALF_LIFE_HOURS * config.TRENDING_HISTORY_HALF_LIVES)
+        self.ranker.clear()
+        self._seen = {}
+        since = datetime.now(timezone.utc) - horizon
+        self.watermark = None
+        added = self._consume(since)
+        # Later polls follow the database clock (newest like seen), not ours
+        self.watermark = self.watermark or since
+        self._prune()
+        logger.info(f"Trending scores rebuilt from {added} likes ({len(self.ranker)} facts)")
+
+    def poll_once(self) -> int:
+        """Count likes inserted since the last poll."""
+        if self.watermark is None:
+            self.rebuild()
+            return 0
+        added = self._consume(self.watermark - timedelta(seconds=self.overlap_seconds))
+        self._prune()
+        return added
+
+    def _prune(self):
+        cutoff = self.watermark - timedelta(seconds=self.overlap_seconds)
+        self._seen = {like_id: at for like_id, at in self._seen.items() if at >= cutoff}
+
+    async def run(self, interval: float = None):
+        """Poll for new likes forever; run as a background task."""
+        interval = interval or config.TRENDING_POLL_SECONDS
+        while True:
+            try:
+                await asyncio.to_thread(self.poll_once)
+            except Exception as e:
+                logger.warning(f"Trending poll failed, retrying in {interval}s: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,293 @@
+"""
+Per-user OpenAI token metering and daily quotas.
+
+Each answer adds its prompt/completion tokens to in-memory counters keyed by
+``(UTC day, user key, model)``. That is one dict update under a lock, so it
+costs nothing measurable on the request path. ``run_flusher`` periodically
+writes the counters as one JSON line per key, appended to local files shared
+by all workers (append under ``flock``). There is one file per UTC day,
+named after ``path`` (``ai_usage.jsonl`` -> ``ai_usage-2024-05-01.jsonl``).
+
+After appending, each worker reads the lines added since its last read,
+its own included, into running totals. Totals therefore cover every
+worker, and quota checks compare a user's totals plus this worker's
+unflushed counts against the limit in memory, with no database or file
+access per request. Other workers' usage shows up within one flush
+interval, so a user can overshoot by about that much.
+
+Days older than ``retention_days`` are dropped from memory and their files
+deleted, so a worker starting up reads at most ``retention_days`` files and
+disk use stays bounded.
+"""
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# prompt tokens, completion tokens, requests
+_FIELDS = 3
+
+Key = Tuple[str, str, str]
+
+
+# (current UTC day, epoch second it ends); formatting a date per request is most of record()'s cost
+_day: Tuple[str, float] = ("", 0.0)
+
+
+def today() -> str:
+    """The current UTC day (``YYYY-MM-DD``), as used in usage keys."""
+    global _day
+    now = time.time()
+    if now >= _day[1]:
+        # Epoch time has no leap seconds, so UTC days are exactly 86400s
+        _day = (time.strftime("%Y-%m-%d", time.gmtime(now)), (now // 86400 + 1) * 86400)
+    return _day[0]
+
+
+def seconds_until_reset() -> int:
+    """Seconds until the daily quotas reset (UTC midnight)."""
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def _merge(target: Dict[Key, List[int]], user_day: Dict[Tuple[str, str], int], key: Key, counts: List[int]):
+    totals = target.get(key)
+    if totals is None:
+        totals = target[key] = [0] * _FIELDS
+    for i in range(_FIELDS):
+        totals[i] += counts[i]
+    user_day[key[:2]] = user_day.get(key[:2], 0) + counts[0] + counts[1]
+
+
+class UsageMeter:
+    """In-memory token counters with batched flushes to a shared JSONL store."""
+
+    def __init__(self, path: str, daily_quota: int = 0, retention_days: int = 31):
+        self.path = path
+        self.daily_quota = daily_quota
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        # Recorded here and not yet written
+        self._pending: Dict[Key, List[int]] = {}
+        self._pending_user_day: Dict[Tuple[str, str], int] = {}
+        # Written but not yet read back into the totals
+        self._in_flight: Dict[Key, List[int]] = {}
+        self._in_flight_user_day: Dict[Tuple[str, str], int] = {}
+        # Everything read from the store (all workers)
+        self._totals: Dict[Key, List[int]] = {}
+        self._totals_user_day: Dict[Tuple[str, str], int] = {}
+        # UTC day -> bytes of that day's file read so far
+        self._offsets: Dict[str, int] = {}
+        self.flushed_at: Optional[float] = None
+
+    def record(self, user: str, model: str, prompt_tokens: int, completion_tokens: int):
+        """Count one OpenAI request for ``user``."""
+        key = (today(), user, model)
+        with self._lock:
+            _merge(self._pending, self._pending_user_day, key, [prompt_tokens, completion_tokens, 1])
+
+    def used_today(self, user: str) -> int:
+        """Tokens ``user`` has used today across all workers (as of the last flush) plus here."""
+        user_day = (today(), user)
+        with self._lock:
+            return (self._totals_user_day.get(user_day, 0) + self._in_flight_user_day.get(user_day, 0)
+                    + self._pending_user_day.get(user_day, 0))
+
+    def remaining_today(self, user: str) -> Optional[int]:
+        """Tokens left in ``user``'s daily quota, or ``None`` without a quota."""
+        if self.daily_quota <= 0:
+            return None
+        return max(0, self.daily_quota - self.used_today(user))
+
+    def over_quota(self, user: str) -> bool:
+        return self.daily_quota > 0 and self.used_today(user) >= self.daily_quota
+
+    # -- Flushing -------------------------------------------------------------
+
+    def flush(self):
+        """Append pending counts to the store, then read back everything new in it."""
+        with self._io_lock:
+            with self._lock:
+                batch, self._pending, self._pending_user_day = self._pending, {}, {}
+                for key, counts in batch.items():
+                    _merge(self._in_flight, self._in_flight_user_day, key, counts)
+            if batch:
+                try:
+                    self._append(batch)
+                except OSError as e:
+                    logger.warning("Could not flush token usage to %s: %s", self.path, e)
+                    with self._lock:
+                        # Back into pending for the next attempt
+                        for key, counts in batch.items():
+                            _merge(self._in_flight, self._in_flight_user_day, key, [-count for count in counts])
+                            _merge(self._pending, self._pending_user_day, key, counts)
+                    return
+            cutoff = self._cutoff()
+            try:
+                lines = self._read_new(cutoff)
+            except OSError as e:
+                # The batch is in the store; it stays counted as in flight until read back
+                logger.warning("Could not read token usage from %s: %s", self.path, e)
+                return
+            with self._lock:
+                for key, counts in lines:
+                    _merge(self._totals, self._totals_user_day, key, counts)
+                self._in_flight, self._in_flight_user_day = {}, {}
+                self._prune(cutoff)
+            self._remove_expired(cutoff)
+            self.flushed_at = time.time()
+
+    def _cutoff(self) -> str:
+        """The oldest UTC day still kept."""
+        return (datetime.now(timezone.utc) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+
+    def _day_path(self, day: str) -> str:
+        root, ext = os.path.splitext(self.path)
+        return f"{root}-{day}{ext}"
+
+    def _day_files(self) -> Dict[str, str]:
+        """UTC day -> path of every day file on disk."""
+        root, ext = os.path.splitext(self.path)
+        files = {}
+        for path in glob.glob(f"{glob.escape(root)}-*{glob.escape(ext)}"):
+            day = path[len(root) + 1:len(path) - len(ext)]
+            if len(day) == 10 and path == self._day_path(day):
+                files[day] = path
+        return files
+
+    def _append(self, batch: Dict[Key, List[int]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A batch flushed just after midnight can hold two days
+        payloads: Dict[str, List[str]] = defaultdict(list)
+        for (day, user, model), counts in batch.items():
+            payloads[day].append(json.dumps({
+                "day": day, "user": user, "model": model,
+                "prompt_tokens": counts[0], "completion_tokens": counts[1], "requests": counts[2],
+            }, separators=(",", ":")) + "\n")
+        for day, lines in payloads.items():
+            with open(self._day_path(day), "a", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.write("".join(lines))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_new(self, cutoff: str) -> List[Tuple[Key, List[int]]]:
+        """Complete lines appended since the last read (by any worker) to files still kept."""
+        lines = []
+        for day, path in sorted(self._day_files().items()):
+            if day < cutoff:
+                continue
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                try:
+                    f.seek(self._offsets.get(day, 0))
+                    data = f.read()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            end = data.rfind(b"\n") + 1
+            self._offsets[day] = self._offsets.get(day, 0) + end
+            for line in data[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                    lines.append((
+                        (entry["day"], entry["user"], entry["model"]),
+                        [int(entry["prompt_tokens"]), int(entry["completion_tokens"]), int(entry["requests"])]
+                    ))
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Skipping malformed usage line in %s", path)
+        return lines
+
+    def _prune(self, cutoff: str):
+        """Drop days past retention from memory (lock held)."""
+        for key in [key for key in self._totals if key[0] < cutoff]:
+            del self._totals[key]
+        for key in [key for key in self._totals_user_day if key[0] < cutoff]:
+            del self._totals_user_day[key]
+        for day in [day for day in self._offsets if day < cutoff]:
+            del self._offsets[day]
+
+    def _remove_expired(self, cutoff: str):
+        """Delete day files past retention (any worker may get there first)."""
+        for day, path in self._day_files().items():
+            if day >= cutoff:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Could not remove expired token usage file %s: %s", path, e)
+
+    async def run_flusher(self, interval: float):
+        """Flush forever; run as a background task."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.flush)
+
+    # -- Reporting ------------------------------------------------------------
+
+    def _all_counts(self) -> Dict[Key, List[int]]:
+        """Store totals plus this worker's unflushed counts (lock held)."""
+        combined = {key: list(counts) for key, counts in self._totals.items()}
+        scratch: Dict[Tuple[str, str], int] = {}
+        for source in (self._in_flight, self._pending):
+            for key, counts in source.items():
+                _merge(combined, scratch, key, counts)
+        return combined
+
+    def summary(self, days: int, top: int) -> Dict[str, Any]:
+        """Aggregates over the last ``days`` UTC days: totals, per day, per model and top users."""
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        with self._lock:
+            counts = self._all_counts()
+
+        def bucket():
+            return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "requests": 0}
+
+        def add(target: Dict[str, int], values: List[int]):
+            target["prompt_tokens"] += values[0]
+            target["completion_tokens"] += values[1]
+            target["total_tokens"] += values[0] + values[1]
+            target["requests"] += values[2]
+
+        totals = bucket()
+        by_day: Dict[str, Dict[str, int]] = defaultdict(bucket)
+        by_model: Dict[str, Dict[str, int]] = defaultdict(bucket)
+        by_user: Dict[str, Dict[str, int]] = defaultdict(bucket)
+        for (day, user, model), values in counts.items():
+            if day < since:
+                continue
+            add(totals, values)
+            add(by_day[day], values)
+            add(by_model[model], values)
+            add(by_user[user], values)
+
+        top_users = sorted(by_user.items(), key=lambda item: item[1]["total_tokens"], reverse=True)[:top]
+        return {
+            "since": since,
+            "totals": totals,
+            "by_day": dict(sorted(by_day.items())),
+            "by_model": dict(by_model),
+            "top_users": [{"user": user, **values} for user, values in top_users],
+            "users": len(by_user),
+            "flushed_at": self.flushed_at,
+        }
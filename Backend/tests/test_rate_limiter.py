@@ -0,0 +1,55 @@
+"""
+Rate limit settings and token bucket behaviour in ``middleware/rate_limiter.py``.
+
+Run from ``Backend/``: python -m pytest tests
+"""
+import unittest
+
+from middleware.rate_limiter import TokenBucketLimiter, parse_limit
+
+
+class ParseLimitTests(unittest.TestCase):
+    def test_rate_and_burst(self):
+        self.assertEqual(parse_limit("0.2,5"), (0.2, 5.0))
+
+    def test_burst_defaults_to_rate(self):
+        self.assertEqual(parse_limit("10"), (10.0, 10.0))
+        self.assertEqual(parse_limit("0.5"), (0.5, 1.0))
+
+    def test_non_positive_rates_are_rejected(self):
+        for value in ("0", "0,5", "-1,5", "nan,5"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_limit(value)
+
+    def test_burst_below_one_is_rejected(self):
+        for value in ("1,0", "1,0.5", "1,-3"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_limit(value)
+
+    def test_malformed_values_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_limit("ten/minute")
+
+
+class TokenBucketLimiterTests(unittest.TestCase):
+    def test_burst_then_retry_after(self):
+        limiter = TokenBucketLimiter(*parse_limit("2,3"))
+        self.assertEqual([limiter.acquire("a", now=0.0) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.acquire("a", now=0.0), 0.5)
+        self.assertEqual(limiter.acquire("a", now=0.5), 0.0)
+
+    def test_least_recently_seen_client_is_evicted(self):
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+        limiter.acquire("a", now=0.0)
+        limiter.acquire("b", now=0.0)
+        limiter.acquire("a", now=0.0)
+        limiter.acquire("c", now=0.0)
+        self.assertEqual(len(limiter), 2)
+        # "b" was evicted, so it starts again from a full bucket
+        self.assertEqual(limiter.acquire("b", now=0.0), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
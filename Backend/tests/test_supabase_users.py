@@ -0,0 +1,174 @@
+"""
+Round trips and duplicate handling of the user queries in ``database/supabase_db.py``.
+
+The Supabase client is replaced by a stub that records the query chain and
+counts ``execute()`` calls, so no network or credentials are needed.
+
+Run from ``Backend/``: python -m pytest tests
+"""
+import unittest
+from typing import Any, Dict, List, Optional
+
+from database.supabase_db import SupabaseCatFactsDB
+
+
+class StubAPIError(Exception):
+    """Shaped like ``postgrest.exceptions.APIError``."""
+
+    def __init__(self, code: str, message: str, details: str = ""):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = details
+
+
+class StubResult:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class StubQuery:
+    """Accepts any builder call and records it; ``execute()`` is the round trip."""
+
+    def __init__(self, client: "StubClient", table: str):
+        self.client = client
+        self.table = table
+        self.calls: List[tuple] = []
+
+    def __getattr__(self, name: str):
+        def builder(*args, **kwargs):
+            self.calls.append((name, args))
+            return self
+        return builder
+
+    def execute(self) -> StubResult:
+        self.client.executions += 1
+        if self.client.error is not None:
+            raise self.client.error
+        return StubResult(self.client.rows)
+
+
+class StubClient:
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None, error: Optional[Exception] = None):
+        self.rows = rows or []
+        self.error = error
+        self.executions = 0
+        self.queries: List[StubQuery] = []
+
+    def table(self, name: str) -> StubQuery:
+        query = StubQuery(self, name)
+        self.queries.append(query)
+        return query
+
+
+def make_db(client: StubClient) -> SupabaseCatFactsDB:
+    # Skip __init__: it connects to Supabase
+    db = SupabaseCatFactsDB.__new__(SupabaseCatFactsDB)
+    db.client = client
+    return db
+
+
+def user_row(username: str, email: str) -> Dict[str, Any]:
+    return {
+        "id": f"id-{username}",
+        "username": username,
+        "email": email,
+        "auth_provider": "local",
+        "password_hash": "hash",
+    }
+
+
+class CreateUserTests(unittest.TestCase):
+    def test_signup_is_one_round_trip(self):
+        client = StubClient(rows=[user_row("whiskers", "whiskers@example.com")])
+        result = make_db(client).create_user("whiskers", "Whiskers@Example.com", "hash")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(client.executions, 1)
+        self.assertNotIn("password_hash", result["data"])
+        inserted = client.queries[0].calls[0]
+        self.assertEqual(inserted[0], "insert")
+        self.assertEqual(inserted[1][0]["email"], "whiskers@example.com")
+
+    def test_duplicate_username_constraint(self):
+        client = StubClient(error=StubAPIError(
+            "23505",
+            'duplicate key value violates unique constraint "users_username_key"',
+            "Key (username)=(whiskers) already exists.",
+        ))
+        result = make_db(client).create_user("whiskers", "whiskers@example.com", "hash")
+
+        self.assertEqual(result["status"], "duplicate_username")
+        self.assertEqual(client.executions, 1)
+
+    def test_duplicate_email_constraint(self):
+        client = StubClient(error=StubAPIError(
+            "23505",
+            'duplicate key value violates unique constraint "users_email_key"',
+            "Key (email)=(whiskers@example.com) already exists.",
+        ))
+        result = make_db(client).create_user("whiskers", "whiskers@example.com", "hash")
+
+        self.assertEqual(result["status"], "duplicate_email")
+        self.assertEqual(client.executions, 1)
+
+    def test_constraint_name_wins_over_user_supplied_values(self):
+        # A username that looks like the email constraint must not confuse the mapping
+        client = StubClient(error=StubAPIError(
+            "23505",
+            'duplicate key value violates unique constraint "users_username_key"',
+            "Key (username)=(users_email_key) already exists.",
+        ))
+        result = make_db(client).create_user("users_email_key", "whiskers@example.com", "hash")
+
+        self.assertEqual(result["status"], "duplicate_username")
+
+    def test_other_errors_are_not_duplicates(self):
+        client = StubClient(error=StubAPIError("23502", 'null value in column "email"'))
+        result = make_db(client).create_user("whiskers", "whiskers@example.com", "hash")
+
+        self.assertEqual(result["status"], "error")
+
+
+class GetUserForLoginTests(unittest.TestCase):
+    def test_login_by_username_is_one_round_trip(self):
+        client = StubClient(rows=[user_row("whiskers", "whiskers@example.com")])
+        user = make_db(client).get_user_for_login("whiskers")
+
+        self.assertEqual(user["username"], "whiskers")
+        self.assertEqual(user["password_hash"], "hash")
+        self.assertEqual(client.executions, 1)
+        calls = dict(client.queries[0].calls)
+        self.assertEqual(calls["limit"], (2,))
+        self.assertIn('username.eq."whiskers"', calls["or_"][0])
+
+    def test_login_by_email_is_one_round_trip(self):
+        client = StubClient(rows=[user_row("whiskers", "whiskers@example.com")])
+        user = make_db(client).get_user_for_login("Whiskers@Example.com")
+
+        self.assertEqual(user["email"], "whiskers@example.com")
+        self.assertEqual(client.executions, 1)
+        # Emails are stored lowercased, so the email branch is lowercased too
+        self.assertIn('email.eq."whiskers@example.com"', dict(client.queries[0].calls)["or_"][0])
+
+    def test_username_match_wins_over_email_match(self):
+        # Someone registered the username "mittens@example.com"; another user has that email
+        email_owner = user_row("mittens", "mittens@example.com")
+        username_owner = user_row("mittens@example.com", "other@example.com")
+        for rows in ([email_owner, username_owner], [username_owner, email_owner]):
+            with self.subTest(order=[row["username"] for row in rows]):
+                client = StubClient(rows=rows)
+                user = make_db(client).get_user_for_login("mittens@example.com")
+
+                self.assertEqual(user["id"], username_owner["id"])
+                self.assertEqual(client.executions, 1)
+
+    def test_unknown_user(self):
+        client = StubClient(rows=[])
+
+        self.assertIsNone(make_db(client).get_user_for_login("nobody"))
+        self.assertEqual(client.executions, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,382 @@
+"""
+Lightweight in-process request tracing.
+
+A ``Trace`` is started per sampled request (see ``middleware/tracing.py``) and
+held in a context variable, so ``span()`` blocks and ``@traced`` functions in
+handlers, services and the database layer attach to it without any plumbing.
+Context variables follow ``asyncio.to_thread`` and the threadpool, so spans
+recorded off the event loop land in the right trace. Outside a sampled request
+a span is a single context-variable lookup.
+
+Span names are ``<category>.<operation>`` (``db.get_all_facts``,
+``model.build``); the category is what the ``Server-Timing`` header sums.
+
+Finished traces go to an exporter on a background thread: JSON lines in a
+local file, or OTLP/HTTP JSON to a collector (``/v1/traces``).
+"""
+import abc
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed operation inside a trace."""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error = False
+
+    @property
+    def category(self) -> str:
+        return self.name.partition(".")[0]
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self, name: str, trace_id: str = None, parent_id: str = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        # Wall-clock anchor so monotonic span times can be exported as unix nanoseconds
+        self.wall_ns = time.time_ns()
+        self.root = Span(name, parent_id)
+        self.spans: List[Span] = [self.root]
+        # Derived entries for Server-Timing that are not spans (e.g. "serialize")
+        self.timings: Dict[str, float] = {}
+        self._tokens = None
+
+    def finish(self):
+        self.root.end_ns = time.perf_counter_ns()
+
+    def unix_ns(self, perf_ns: int) -> int:
+        return self.wall_ns + (perf_ns - self.root.start_ns)
+
+    def breakdown(self) -> Dict[str, float]:
+        """Milliseconds per span category; nested spans of the same category are not double counted."""
+        by_id = {span.span_id: span for span in self.spans}
+        totals: Dict[str, float] = {}
+        for span in self.spans[1:]:
+            if not span.end_ns:
+                continue
+            parent = by_id.get(span.parent_id)
+            if parent is not None and parent.category == span.category:
+                continue
+            totals[span.category] = totals.get(span.category, 0.0) + span.duration_ms
+        return totals
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_trace(name: str, trace_id: str = None, parent_id: str = None) -> Trace:
+    """Begin a trace in the current context; pair with ``end_trace``."""
+    trace = Trace(name, trace_id, parent_id)
+    trace._tokens = (_current_trace.set(trace), _current_span.set(trace.root))
+    return trace
+
+
+def end_trace(trace: Trace):
+    trace.finish()
+    trace_token, span_token = trace._tokens
+    _current_span.reset(span_token)
+    _current_trace.reset(trace_token)
+    if exporter is not None:
+        exporter.submit(trace)
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attributes: Optional[Dict[str, Any]]):
+        self.trace = trace
+        parent = _current_span.get()
+        self.span = Span(name, parent.span_id if parent else trace.root.span_id, attributes)
+
+    def __enter__(self) -> Span:
+        self.trace.spans.append(self.span)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end_ns = time.perf_counter_ns()
+        self.span.error = exc_type is not None
+        _current_span.reset(self.token)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Time a block as a child of the current span (a no-op outside a sampled request)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return _SpanContext(trace, name, attributes or None)
+
+
+def traced(category: str, name: str = None):
+    """Decorator recording each call as a ``<category>.<function name>`` span.
+
+    Generator functions are timed from the call until exhaustion. Their span is
+    recorded directly rather than made current, because a generator can be
+    resumed in a different context (e.g. a streaming response's threadpool).
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = f"{category}.{name or func.__name__}"
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                trace = _current_trace.get()
+                if trace is None:
+                    return func(*args, **kwargs)
+                parent = _current_span.get() or trace.root
+                return _timed_generator(trace, Span(span_name, parent.span_id), func(*args, **kwargs))
+            return generator_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_trace.get() is None:
+                    return await func(*args, **kwargs)
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _timed_generator(trace: Trace, generator_span: Span, generator):
+    trace.spans.append(generator_span)
+    try:
+        yield from generator
+    except BaseException:
+        generator_span.error = True
+        raise
+    finally:
+        generator_span.end_ns = time.perf_counter_ns()
+
+
+def should_sample(rate: float) -> bool:
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def parse_traceparent(value: Optional[str]):
+    """``(trace_id, parent_span_id, sampled)`` from a W3C ``traceparent`` header, or ``None``."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def server_timing(trace: Trace, extra: Dict[str, float] = None) -> str:
+    """Format a trace's breakdown as a ``Server-Timing`` header value."""
+    entries = trace.breakdown()
+    entries.update(trace.timings)
+    if extra:
+        entries.update(extra)
+    entries["total"] = (time.perf_counter_ns() - trace.root.start_ns) / 1e6
+    return ", ".join(f"{name};dur={duration:.2f}" for name, duration in entries.items())
+
+
+# -- Event loop lag -----------------------------------------------------------
+
+loop_lag_ms = 0.0
+
+
+async def run_loop_lag_monitor(interval: float = 0.25):
+    """Measure how late the event loop wakes a sleeping task; run as a background task."""
+    global loop_lag_ms
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        loop_lag_ms = max(0.0, (loop.time() - started - interval) * 1000)
+
+
+# -- Export -------------------------------------------------------------------
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def otlp_spans(trace: Trace) -> List[Dict[str, Any]]:
+    """A trace's spans in the OTLP/JSON span shape."""
+    spans = []
+    for span in trace.spans:
+        entry = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 2 if span is trace.root else 1,
+            "startTimeUnixNano": str(trace.unix_ns(span.start_ns)),
+            "endTimeUnixNano": str(trace.unix_ns(span.end_ns or trace.root.end_ns)),
+            "attributes": [_attribute(k, v) for k, v in (span.attributes or {}).items()],
+            "status": {"code": 2 if span.error else 0},
+        }
+        if span.parent_id:
+            entry["parentSpanId"] = span.parent_id
+        spans.append(entry)
+    return spans
+
+
+class TraceExporter(abc.ABC):
+    """Batches finished traces on a background thread."""
+
+    def __init__(self, service_name: str, batch_size: int = 512, interval: float = 5.0, max_queue: int = 10000):
+        self.resource = {"attributes": [_attribute("service.name", service_name)]}
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: "queue.SimpleQueue[Optional[Trace]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Trace):
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.put_nowait(trace)
+
+    def _run(self):
+        while True:
+            batch, deadline = [], time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    trace = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if trace is None:
+                    self._flush(batch)
+                    return
+                batch.append(trace)
+            self._flush(batch)
+
+    def _flush(self, batch: List[Trace]):
+        if not batch:
+            return
+        payload = {"resourceSpans": [{
+            "resource": self.resource,
+            "scopeSpans": [{
+                "scope": {"name": "meowlogy"},
+                "spans": [span for trace in batch for span in otlp_spans(trace)],
+            }],
+        }]}
+        try:
+            self.write(payload)
+        except Exception as e:
+            logger.warning("Trace export failed, dropped %d traces: %s", len(batch), e)
+
+    @abc.abstractmethod
+    def write(self, payload: Dict[str, Any]):
+        """Send one OTLP/JSON ``ExportTraceServiceRequest`` (runs on the exporter thread)."""
+
+    def shutdown(self):
+        self._queue.put_nowait(None)
+        self._thread.join(timeout=self.interval + 1)
+
+
+class FileTraceExporter(TraceExporter):
+    """Appends one OTLP/JSON ``ExportTraceServiceRequest`` per batch as a JSON line."""
+
+    def __init__(self, path: str, **kwargs):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        super().__init__(**kwargs)
+
+    def write(self, payload: Dict[str, Any]):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OTLPTraceExporter(TraceExporter):
+    """POSTs OTLP/HTTP JSON to a collector."""
+
+    def __init__(self, endpoint: str, **kwargs):
+        from http_client import http_clients
+
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.client = http_clients.get("otlp")
+        super().__init__(**kwargs)
+
+    def write(self, payload: Dict[str, Any]):
+        self.client.post(self.url, json=payload).raise_for_status()
+
+
+exporter: Optional[TraceExporter] = None
+
+
+def configure_exporter(kind: str, service_name: str, file_path: str, otlp_endpoint: str,
+                       batch_size: int, interval: float) -> Optional[TraceExporter]:
+    """Install the global exporter (``"file"``, ``"otlp"`` or ``"none"``)."""
+    global exporter
+    kind = kind.lower()
+    options = dict(service_name=service_name, batch_size=batch_size, interval=interval)
+    if kind == "file":
+        exporter = FileTraceExporter(file_path, **options)
+    elif kind == "otlp":
+        exporter = OTLPTraceExporter(otlp_endpoint, **options)
+    else:
+        exporter = None
+    return exporter
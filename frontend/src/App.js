@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { motion } from 'framer-motion';
 import './App.css';
-import { FaPaw, FaRandom, FaPlus, FaSyncAlt, FaSignOutAlt } from 'react-icons/fa';
+import { FaPaw, FaRandom, FaPlus, FaSyncAlt, FaSignOutAlt, FaHeart, FaRegHeart } from 'react-icons/fa';
 import CatCareChatBubble from './pages/CatCareChatBubble';
 import Login from './pages/Login';
 import Signup from './pages/Signup';
@@ -30,11 +30,17 @@ function App() {
 
   const clearMessage = () => setMessage('');
 
+  // Bearer header for the signed-in user, so responses include liked_by_me
+  const authHeaders = () => {
+    const token = localStorage.getItem('authToken');
+    return token ? { Authorization: `Bearer ${token}` } : {};
+  };
+
   // API functions
   const fetchAllFacts = useCallback(async () => {
     try {
       setLoading(true);
-      const response = await fetch(`${API_BASE_URL}/catfacts`);
+      const response = await fetch(`${API_BASE_URL}/catfacts`, { headers: authHeaders() });
       
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -66,10 +72,45 @@ function App() {
     }
   }, []);
 
+  // Live updates: merge a single fact into the list (newest first), ignoring duplicates
+  const upsertFact = useCallback((fact) => {
+    setFacts((current) => {
+      const index = current.findIndex((item) => item.id === fact.id);
+      if (index === -1) {
+        return [fact, ...current];
+      }
+      const next = [...current];
+      next[index] = { ...next[index], ...fact };
+      return next;
+    });
+  }, []);
+
+  const toggleLike = async (fact) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/catfacts/${fact.id}/like`, {
+        method: fact.liked_by_me ? 'DELETE' : 'POST',
+        headers: authHeaders()
+      });
+      const data = await response.json();
+      if (!response.ok || !data.success) {
+        throw new Error(data.detail || data.message || 'Failed to update like');
+      }
+      upsertFact({
+        id: fact.id,
+        liked_by_me: data.liked,
+        likes_count: data.likes_count ?? fact.likes_count
+      });
+    } catch (error) {
+      console.error('Like error:', error);
+      showMessage(error.message, true);
+    }
+  };
+
   const fetchRandomFact = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`${API_BASE_URL}/catfacts/random`);
+      // Authenticated users get facts they have not seen yet
+      const response = await fetch(`${API_BASE_URL}/catfacts/random`, { headers: authHeaders() });
       
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -109,7 +150,12 @@ function App() {
       if (response.ok && (data.status === 'success' || data.success)) {
         showMessage(data.message || SUCCESS_MESSAGES.FACT_ADDED);
         setNewFact('');
-        await fetchAllFacts(); // Refresh the facts list
+        if (data.data) {
+          // Insert the new fact locally; other clients receive it over the live stream
+          upsertFact(data.data);
+        } else {
+          await fetchAllFacts();
+        }
       } else {
         throw new Error(data.detail || data.message || ERROR_MESSAGES.ADD_FACT_ERROR);
       }
@@ -148,6 +194,15 @@ function App() {
   };
 
   const handleLogout = () => {
+    const token = localStorage.getItem('authToken');
+    if (token) {
+      // Fire and forget: the token is dropped locally either way
+      fetch(`${API_BASE_URL}/auth/logout`, {
+        method: 'POST',
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch(() => {});
+    }
+    localStorage.removeItem('authToken');
     localStorage.removeItem('isAuthenticated');
     localStorage.removeItem('username');
     localStorage.removeItem('userId');
@@ -202,6 +257,36 @@ function App() {
     }
   }, [isAuthenticated, fetchAllFacts]);
 
+  useEffect(() => {
+    // Subscribe to live fact updates while authenticated
+    if (!isAuthenticated || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    const source = new EventSource(`${API_BASE_URL}/catfacts/stream`);
+
+    source.addEventListener('fact_added', (event) => {
+      upsertFact(JSON.parse(event.data));
+    });
+    source.addEventListener('fact_deleted', (event) => {
+      const { id } = JSON.parse(event.data);
+      setFacts((current) => current.filter((fact) => fact.id !== id));
+    });
+    source.addEventListener('likes_changed', (event) => {
+      const { id, likes_count } = JSON.parse(event.data);
+      setFacts((current) => current.map((fact) => (
+        fact.id === id ? { ...fact, likes_count } : fact
+      )));
+    });
+    // The server could not replay what we missed while disconnected
+    source.addEventListener('reset', () => {
+      fetchAllFacts();
+    });
+
+    return () => {
+      source.close();
+    };
+  }, [isAuthenticated, fetchAllFacts, upsertFact]);
+
   // Animation variants
   const cursorVariants = {
     default: {
@@ -307,8 +392,16 @@ function App() {
             </div>
             <div className="facts-grid">
               {facts.map((fact, index) => (
-                <div key={index} className="fact-card">
+                <div key={fact.id || index} className="fact-card">
                   <p>{fact.fact}</p>
+                  <button
+                    className={`like-btn${fact.liked_by_me ? ' liked' : ''}`}
+                    onClick={() => toggleLike(fact)}
+                    aria-pressed={!!fact.liked_by_me}
+                  >
+                    {fact.liked_by_me ? <FaHeart /> : <FaRegHeart />}
+                    <span>{fact.likes_count || 0}</span>
+                  </button>
                   <div className="fact-paw"></div>
                 </div>
               ))}
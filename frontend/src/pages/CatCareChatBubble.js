@@ -13,6 +13,11 @@ const CatCareChatBubble = () => {
   const messageEndRef = useRef(null);
 
   // Utility functions
+  const authHeaders = () => {
+    const token = localStorage.getItem('authToken');
+    return token ? { Authorization: `Bearer ${token}` } : {};
+  };
+
   const validateQuestion = (question) => {
     const trimmedQuestion = question.trim();
     
@@ -89,7 +94,7 @@ const CatCareChatBubble = () => {
 
       const response = await fetch(`${API_BASE_URL}/api/ask-ai`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream', ...authHeaders() },
         body: JSON.stringify({ question })
       });
 
@@ -103,17 +108,40 @@ const CatCareChatBubble = () => {
 
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
+      let buffer = '';
+      let finished = false;
 
       try {
-        while (true) {
+        while (!finished) {
           const { done, value } = await reader.read();
           
           if (done) break;
           
-          if (value) {
-            const chunk = decoder.decode(value);
-            aiMessage += chunk;
-            updateLastAIMessage(aiMessage);
+          buffer += decoder.decode(value, { stream: true });
+          // SSE events end with a blank line; keep any partial event for the next read
+          const events = buffer.split('\n\n');
+          buffer = events.pop();
+
+          for (const raw of events) {
+            let type = 'message';
+            let data = '';
+            for (const line of raw.split('\n')) {
+              if (line.startsWith('event:')) type = line.slice(6).trim();
+              else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            // Comment-only frames are keep-alive heartbeats
+            if (!data) continue;
+
+            const payload = JSON.parse(data);
+            if (type === 'token') {
+              aiMessage += payload.text;
+              updateLastAIMessage(aiMessage);
+            } else if (type === 'error') {
+              throw new Error(payload.message);
+            } else if (type === 'done') {
+              finished = true;
+              break;
+            }
           }
         }
       } finally {
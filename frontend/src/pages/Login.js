@@ -118,6 +118,9 @@ function Login({ onLogin, onShowSignup }) {
         localStorage.setItem('isAuthenticated', 'true');
         localStorage.setItem('username', data.user.username);
         localStorage.setItem('userId', data.user.id);
+        if (data.token) {
+          localStorage.setItem('authToken', data.token);
+        }
         
         onLogin();
       } else {
@@ -160,6 +160,9 @@ function Signup({ onSignupSuccess, onBackToLogin }) {
         localStorage.setItem('isAuthenticated', 'true');
         localStorage.setItem('username', data.user.username);
         localStorage.setItem('userId', data.user.id);
+        if (data.token) {
+          localStorage.setItem('authToken', data.token);
+        }
         
         onSignupSuccess();
       } else {